@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark JSON files from benchmarks/run.py.
+
+    python benchmarks/compare.py base.json new.json [--threshold 1.2]
+
+Prints the median per-call time of every case found in both files and the
+new/base ratio, and exits with status 1 if any case got slower than the
+threshold ratio.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["name"], r["param"]): r for r in report["results"]}, report.get("meta", {})
+
+def compare(base: dict, new: dict, threshold: float = 1.2) -> list:
+    """
+    Rows of (name, param, unit, base_s, new_s, ratio, flag) for cases in both runs.
+    """
+    rows = []
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[0], k[1])):
+        b, n = base[key]["median"], new[key]["median"]
+        ratio = n / b if b > 0 else float("inf")
+        flag = "SLOWER" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+        rows.append((key[0], key[1], base[key]["unit"], b, n, ratio, flag))
+    return rows
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compare benchmark runs")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=1.2, help="new/base ratio counted as a regression")
+    args = ap.parse_args(argv)
+
+    base, base_meta = load(args.base)
+    new, new_meta = load(args.new)
+    print(f"base: {base_meta.get('commit')} ({base_meta.get('timestamp')})")
+    print(f"new:  {new_meta.get('commit')} ({new_meta.get('timestamp')})")
+    rows = compare(base, new, args.threshold)
+    print(f"{'benchmark':<22} {'size':>12} {'base (s)':>11} {'new (s)':>11} {'ratio':>7}")
+    for name, param, unit, b, n, ratio, flag in rows:
+        print(f"{name:<22} {param:>12,} {b:>11.3e} {n:>11.3e} {ratio:>7.2f} {flag}")
+    missing = sorted((base.keys() ^ new.keys()))
+    if missing:
+        print(f"{len(missing)} case(s) only in one file: {missing}")
+    return 1 if any(r[-1] == "SLOWER" for r in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the package, the CLI and its heavy dependencies.
+
+    python benchmarks/import_time.py                  # print a table
+    python benchmarks/import_time.py --out imports.json
+    python benchmarks/compare.py before.json imports.json
+
+Every case runs in a fresh interpreter (`repeat` times; the median is
+reported) so nothing is already in sys.modules. The JSON has the same
+layout as benchmarks/run.py output, with param 0 for every case.
+"""
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).parent
+ROOT = HERE.parent
+
+sys.path.insert(0, str(HERE))
+from run import _meta
+
+HEAVY = ["pandas", "scipy", "statsmodels", "numba", "matplotlib", "yfinance"]
+
+# name -> python code run in a fresh interpreter (cwd = repo root)
+CASES = {
+    "python": "pass",
+    "import_numpy": "import numpy",
+    "import_pandas": "import pandas",
+    "import_scipy_special": "import scipy.special",
+    "import_statsmodels": "import statsmodels.api",
+    "import_numba": "import numba",
+    "import_matplotlib_pyplot": "import matplotlib.pyplot",
+    "import_src": "import src",
+    "import_src_engle_granger": "import src; src.engle_granger",
+    "cli_help": ("import sys, runpy\nsys.argv = ['main.py', '--help']\n"
+                 "try:\n    runpy.run_path('src/main.py', run_name='__main__')\nexcept SystemExit:\n    pass"),
+}
+
+def time_subprocess(code: str, repeat: int = 5) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True)
+        samples.append(time.perf_counter() - t0)
+    return {
+        "number": 1, "repeat": repeat,
+        "min": min(samples), "median": statistics.median(samples), "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+def loaded_modules(code: str) -> list:
+    # which HEAVY modules the snippet leaves in sys.modules
+    probe = f"{code}\nimport sys; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True).stdout
+    return [m for m in out.strip().splitlines()[-1].split(",") if m] if out.strip() else []
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Import-time benchmarks")
+    ap.add_argument("--only", nargs="+", choices=sorted(CASES), help="Subset of cases")
+    ap.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per case")
+    ap.add_argument("--out", help="Also write the results as JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name in args.only or list(CASES):
+        res = time_subprocess(CASES[name], repeat=args.repeat)
+        results.append({"name": name, "param": 0, "unit": "process", **res})
+        loaded = ""
+        if name.startswith(("import_src", "cli")):
+            loaded = f"  loads: {', '.join(loaded_modules(CASES[name])) or '-'}"
+        print(f"{name:<26} median {res['median']:.3f}s{loaded}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": _meta(), "results": results, "scaling": {}}, f, indent=1)
+        print(f"Wrote {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
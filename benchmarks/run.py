@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark every pipeline stage over synthetic data of growing size.
+
+    python benchmarks/run.py                 # full sizes (up to 10M bars / 500 tickers)
+    python benchmarks/run.py --quick         # small sizes, for a fast check
+    python benchmarks/run.py --only zscore simulate --out before.json
+
+Each case is timed asv-style: one warm-up call, then `repeat` samples of
+`number` calls, with `number` raised until a sample takes >= --min-time.
+One more call is traced with tracemalloc for its peak memory. Results
+(per-call seconds and peak bytes plus run metadata and log-log scaling
+slopes) are written as JSON for benchmarks/compare.py.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent / "src"))
+sys.path.insert(0, str(HERE))
+
+from coint_test import adf_test, engle_granger, scan_pairs_for_coint
+from basket import basket_search
+from signal_generator import compute_spread, zscore, generate_signals
+from backtester import PairsBacktester
+from metrics import sharpe_ratio, sortino_ratio, max_drawdown, annual_return, hit_rate, MetricsAccumulator
+from bootstrap import bootstrap_metrics
+from synthetic import cointegrated_pair, price_panel, signal_series
+
+BARS = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+def _engle_granger(n: int) -> Callable[[], object]:
+    df = cointegrated_pair(n)
+    return lambda: engle_granger(df)
+
+def _adf(n: int) -> Callable[[], object]:
+    x = compute_spread(cointegrated_pair(n), 1.5).to_numpy()
+    return lambda: adf_test(x)
+
+def _adfuller(n: int) -> Callable[[], object]:
+    # statsmodels reference for the adf_test case
+    from statsmodels.tsa.stattools import adfuller
+
+    x = compute_spread(cointegrated_pair(n), 1.5).to_numpy()
+    return lambda: adfuller(x, regression="c", autolag="AIC")
+
+def _scan(n: int) -> Callable[[], object]:
+    px = price_panel(500, n)
+    return lambda: scan_pairs_for_coint(px, method="batch")
+
+def _scan_prefiltered(n: int) -> Callable[[], object]:
+    px = price_panel(500, n)
+    return lambda: scan_pairs_for_coint(px, method="batch", prefilter={"min_corr": 0.5, "top_k": 20})
+
+def _basket_search(n: int) -> Callable[[], object]:
+    px = price_panel(500, n)
+    return lambda: basket_search(px, size=3)
+
+def _zscore(n: int) -> Callable[[], object]:
+    spread = compute_spread(cointegrated_pair(n), 1.5)
+    return lambda: zscore(spread, 60)
+
+def _signals(n: int) -> Callable[[], object]:
+    z = zscore(compute_spread(cointegrated_pair(n), 1.5), 60)
+    return lambda: generate_signals(z, entry=2.0, exit=0.0, max_abs_z=4.0, cooldown=2)
+
+def _simulate(n: int) -> Callable[[], object]:
+    df = cointegrated_pair(n)
+    sig = signal_series(n)
+    bt = PairsBacktester()
+    return lambda: bt.simulate(df, sig, 1.5)
+
+def _simulate_compact(n: int) -> Callable[[], object]:
+    df = cointegrated_pair(n)
+    sig = signal_series(n)
+    bt = PairsBacktester()
+    return lambda: bt.simulate(df, sig, 1.5, compact=True)
+
+def _pipeline(n: int, dtype=np.float64) -> Callable[[], object]:
+    # zscore -> generate_signals -> simulate in the given price dtype (float32: low-memory mode)
+    df = cointegrated_pair(n).astype(dtype)
+    bt = PairsBacktester(dtype=dtype)
+
+    def fn():
+        z = zscore(compute_spread(df, 1.5), 60)
+        return bt.simulate(df, generate_signals(z, entry=2.0, exit=0.0, max_abs_z=4.0, cooldown=2), 1.5)
+    return fn
+
+def _pipeline_float32(n: int) -> Callable[[], object]:
+    return _pipeline(n, np.float32)
+
+def _metrics(n: int) -> Callable[[], object]:
+    pnl = pd.Series(np.random.default_rng(0).normal(0, 1000, n))
+    equity = pnl.cumsum()
+    return lambda: (sharpe_ratio(pnl), sortino_ratio(pnl), annual_return(pnl), max_drawdown(equity), hit_rate(pnl))
+
+def _metrics_accumulator(n: int) -> Callable[[], object]:
+    pnl = np.random.default_rng(0).normal(0, 1000, n)
+    return lambda: MetricsAccumulator().update(pnl).result()
+
+def _bootstrap(n: int) -> Callable[[], object]:
+    pnl = np.random.default_rng(0).normal(0, 1000, 2_520)
+    return lambda: bootstrap_metrics(pnl, n_resamples=n, seed=0)
+
+# name -> (setup(size) -> callable, unit, full sizes, quick sizes)
+SUITE: Dict[str, tuple] = {
+    "engle_granger": (_engle_granger, "bars", [1_000, 10_000, 100_000], [1_000, 10_000]),
+    "adf_test": (_adf, "bars", [1_000, 3_000, 10_000], [1_000, 3_000]),
+    "adfuller": (_adfuller, "bars", [1_000, 3_000, 10_000], [1_000, 3_000]),
+    "scan_pairs_for_coint": (_scan, "tickers", [10, 50, 100, 250, 500], [10, 50]),
+    "scan_prefiltered": (_scan_prefiltered, "tickers", [10, 50, 100, 250, 500], [10, 50]),
+    "basket_search": (_basket_search, "tickers", [10, 25, 50, 100], [10, 25]),
+    "zscore": (_zscore, "bars", BARS, BARS[:3]),
+    "generate_signals": (_signals, "bars", BARS, BARS[:3]),
+    "simulate": (_simulate, "bars", BARS, BARS[:3]),
+    "simulate_compact": (_simulate_compact, "bars", BARS, BARS[:3]),
+    "pipeline": (_pipeline, "bars", BARS, BARS[:3]),
+    "pipeline_float32": (_pipeline_float32, "bars", BARS, BARS[:3]),
+    "metrics": (_metrics, "bars", BARS, BARS[:3]),
+    "metrics_accumulator": (_metrics_accumulator, "bars", BARS, BARS[:3]),
+    "bootstrap": (_bootstrap, "resamples", [1_000, 10_000, 100_000], [1_000]),
+}
+
+def time_call(fn: Callable[[], object], min_time: float = 0.2, repeat: int = 3) -> dict:
+    """
+    Per-call timings of fn: warm up once, calibrate `number`, take `repeat` samples.
+    """
+    fn()  # warm-up: JIT compilation, caches
+    t0 = time.perf_counter()
+    fn()
+    once = time.perf_counter() - t0
+    number = 1 if once >= min_time else max(1, int(min_time / max(once, 1e-9)))
+    if once >= 5 * min_time:
+        repeat = max(1, min(repeat, 2))  # large cases: keep the suite's wall time sane
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "number": number, "repeat": repeat,
+        "min": min(samples), "median": statistics.median(samples), "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+def peak_memory(fn: Callable[[], object]) -> int:
+    """
+    Peak bytes allocated (tracemalloc) during one call of fn, result included.
+    """
+    tracemalloc.start()
+    try:
+        out = fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        out = None
+
+def scaling_slope(params: List[float], seconds: List[float]) -> float | None:
+    """
+    Least-squares slope of log(time) vs log(size): ~1 for linear stages.
+    """
+    if len(params) < 2:
+        return None
+    return float(np.polyfit(np.log(params), np.log(seconds), 1)[0])
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import numba
+        numba_version = numba.__version__
+    except ImportError:
+        numba_version = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "numba": numba_version,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def run(names: List[str], quick: bool = False, min_time: float = 0.2, repeat: int = 3,
+        log: Callable[[str], None] = print) -> dict:
+    results, slopes = [], {}
+    for name in names:
+        setup, unit, full, small = SUITE[name]
+        params, medians = [], []
+        for size in (small if quick else full):
+            fn = setup(size)
+            res = time_call(fn, min_time=min_time, repeat=repeat)
+            res["peak_bytes"] = peak_memory(fn)
+            results.append({"name": name, "param": size, "unit": unit, **res})
+            params.append(size)
+            medians.append(res["median"])
+            log(f"{name:<22} {unit}={size:<10,} median {res['median']:.3e}s  peak {res['peak_bytes'] / 2**20:.1f} MiB"
+                f"  (x{res['number']}, {res['repeat']} samples)")
+            del fn
+        slopes[name] = scaling_slope(params, medians)
+    return {"meta": _meta(), "results": results, "scaling": slopes}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Pipeline benchmarks")
+    ap.add_argument("--quick", action="store_true", help="Small sizes only")
+    ap.add_argument("--only", nargs="+", choices=sorted(SUITE), help="Subset of benchmarks")
+    ap.add_argument("--out", help="JSON output path (default benchmarks/results/<commit>.json)")
+    ap.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per sample")
+    ap.add_argument("--repeat", type=int, default=3, help="Samples per case")
+    args = ap.parse_args(argv)
+
+    warnings.simplefilter("ignore")  # library deprecation chatter would swamp the table
+    report = run(args.only or list(SUITE), quick=args.quick, min_time=args.min_time, repeat=args.repeat)
+    for name, slope in report["scaling"].items():
+        if slope is not None:
+            print(f"{name:<22} scaling exponent {slope:.2f}")
+    medians = {(r["name"], r["param"]): r["median"] for r in report["results"]}
+    for (name, size), t in medians.items():
+        if name == "adf_test" and medians.get(("adfuller", size)):
+            print(f"adf_test speedup over statsmodels adfuller at {size:,} bars: {medians[('adfuller', size)] / t:.1f}x")
+    peaks = {(r["name"], r["param"]): r["peak_bytes"] for r in report["results"]}
+    for (name, size), peak in peaks.items():
+        if name == "pipeline_float32" and peaks.get(("pipeline", size)):
+            print(f"float32 pipeline peak memory at {size:,} bars: {peak / peaks[('pipeline', size)]:.2f}x float64")
+    out = Path(args.out) if args.out else HERE / "results" / f"{report['meta']['commit'] or 'local'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Wrote {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
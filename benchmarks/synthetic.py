@@ -0,0 +1,40 @@
+# Synthetic cointegrated prices for benchmarks
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+def cointegrated_pair(n: int, beta: float = 1.5, phi: float = 0.9, noise: float = 0.5, seed: int = 0) -> pd.DataFrame:
+    """
+    A/B bars where B is a random walk and A = 10 + beta*B + AR(1) spread.
+    """
+    rng = np.random.default_rng(seed)
+    B = 100 + np.cumsum(rng.normal(0, 1, n))
+    spread = lfilter([1.0], [1.0, -phi], rng.normal(0, noise, n))
+    idx = pd.date_range("2000-01-03", periods=n, freq="min")
+    return pd.DataFrame({"A": 10 + beta * B + spread, "B": B}, index=idx)
+
+def price_panel(n_bars: int, n_tickers: int, n_factors: int = 5, phi: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """
+    Wide panel where each ticker loads on one of n_factors random-walk
+    factors plus its own AR(1) noise, so tickers sharing a factor are
+    cointegrated and the rest are not.
+    """
+    rng = np.random.default_rng(seed)
+    factors = 100 + np.cumsum(rng.normal(0, 1, (n_bars, n_factors)), axis=0)
+    which = rng.integers(0, n_factors, n_tickers)
+    load = rng.uniform(0.5, 2.0, n_tickers)
+    noise = lfilter([1.0], [1.0, -phi], rng.normal(0, 0.5, (n_bars, n_tickers)), axis=0)
+    values = factors[:, which] * load + noise
+    idx = pd.date_range("2015-01-01", periods=n_bars, freq="B")
+    return pd.DataFrame(values, index=idx, columns=[f"T{i:03d}" for i in range(n_tickers)])
+
+def signal_series(n: int, seed: int = 0) -> pd.Series:
+    """
+    {-1, 0, +1} positions held for random stretches.
+    """
+    rng = np.random.default_rng(seed)
+    flips = rng.random(n) < 0.02
+    level = rng.choice([-1.0, 0.0, 1.0], size=n)
+    held = level[np.maximum.accumulate(np.where(flips, np.arange(n), 0))]
+    return pd.Series(held, index=pd.date_range("2000-01-03", periods=n, freq="min"), name="signal")
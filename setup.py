@@ -15,6 +15,9 @@ setup(
     packages=find_packages(),
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "parquet": ["pyarrow>=10.0"],  # iter_parquet_blocks, Parquet batch output
+    },
     entry_points={
         "console_scripts": [
             "pairs-trading=src.main:main",
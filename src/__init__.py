@@ -1,12 +1,60 @@
-from .data_loader import get_prices
-from .coint_test import engle_granger, hedge_ratio_ols, CointResult
-from .signal_generator import compute_spread, zscore, generate_signals
-from .backtester import PairsBacktester
-from .metrics import sharpe_ratio, sortino_ratio, max_drawdown, annual_return, hit_rate
-
-__all__ = [
-    "get_prices", "engle_granger", "hedge_ratio_ols", "CointResult",
-    "compute_spread", "zscore", "generate_signals",
-    "PairsBacktester",
-    "sharpe_ratio", "sortino_ratio", "max_drawdown", "annual_return", "hit_rate",
-]
+# Public API. Submodules load on first attribute access (PEP 562), so
+# `import src` stays cheap and statsmodels/scipy/numba/matplotlib are only
+# imported by the code paths that use them.
+from __future__ import annotations
+import importlib
+from typing import TYPE_CHECKING
+
+# public name -> submodule defining it
+_EXPORTS = {
+    "get_prices": "data_loader", "get_price_panel": "data_loader",
+    "engle_granger": "coint_test", "hedge_ratio_ols": "coint_test", "CointResult": "coint_test",
+    "rolling_coint": "coint_test", "coint_gate": "coint_test", "CointCache": "coint_cache",
+    "adf_test": "coint_test", "candidate_pairs": "pair_filter",
+    "johansen": "basket", "JohansenResult": "basket", "basket_search": "basket",
+    "basket_spread": "signal_generator",
+    "compute_spread": "signal_generator", "zscore": "signal_generator",
+    "generate_signals": "signal_generator", "generate_signals_array": "signal_generator",
+    "PairsBacktester": "backtester", "TradeLedger": "ledger", "PortfolioBacktester": "portfolio",
+    "bootstrap_metrics": "bootstrap", "BootstrapResult": "bootstrap",
+    "probabilistic_sharpe_ratio": "bootstrap", "deflated_sharpe_ratio": "bootstrap",
+    "sharpe_ratio": "metrics", "sortino_ratio": "metrics", "max_drawdown": "metrics",
+    "annual_return": "metrics", "hit_rate": "metrics", "MetricsAccumulator": "metrics",
+    "sweep": "sweep", "walk_forward": "walk_forward", "WalkForwardResult": "walk_forward",
+    "RollingZScore": "streaming", "StreamingSignal": "streaming",
+    "rolling_hedge_ratio": "hedge_ratio", "kalman_hedge_ratio": "hedge_ratio",
+    "Profiler": "profiling", "ChunkedBacktest": "chunked",
+    "iter_npy_blocks": "chunked", "iter_parquet_blocks": "chunked",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    mod = _EXPORTS.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+if TYPE_CHECKING:
+    from .data_loader import get_prices, get_price_panel
+    from .coint_test import engle_granger, hedge_ratio_ols, CointResult, rolling_coint, coint_gate, adf_test
+    from .coint_cache import CointCache
+    from .pair_filter import candidate_pairs
+    from .basket import johansen, JohansenResult, basket_search
+    from .signal_generator import compute_spread, basket_spread, zscore, generate_signals, generate_signals_array
+    from .backtester import PairsBacktester
+    from .ledger import TradeLedger
+    from .portfolio import PortfolioBacktester
+    from .metrics import sharpe_ratio, sortino_ratio, max_drawdown, annual_return, hit_rate, MetricsAccumulator
+    from .bootstrap import bootstrap_metrics, BootstrapResult, probabilistic_sharpe_ratio, deflated_sharpe_ratio
+    from .sweep import sweep
+    from .walk_forward import walk_forward, WalkForwardResult
+    from .streaming import RollingZScore, StreamingSignal
+    from .hedge_ratio import rolling_hedge_ratio, kalman_hedge_ratio
+    from .profiling import Profiler
+    from .chunked import ChunkedBacktest, iter_npy_blocks, iter_parquet_blocks
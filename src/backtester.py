@@ -4,6 +4,11 @@ from typing import Dict, Optional
 import numpy as np
 import pandas as pd
 
+try:
+    from .ledger import TradeLedger, round_trips
+except ImportError:
+    from ledger import TradeLedger, round_trips
+
 class PairsBacktester:
     def __init__(
         self,
@@ -14,6 +19,7 @@ class PairsBacktester:
         signal_delay: int = 1,
         periods_per_year: int = 252,
         max_gross: Optional[float] = None,  # cap on gross exposure in dollars
+        dtype=np.float64,  # prices/shares/trades; PnL, costs and equity stay float64
     ):
         self.tc_bps = float(tc_bps)
         self.slippage_bps = float(slippage_bps)
@@ -22,60 +28,201 @@ class PairsBacktester:
         self.signal_delay = int(signal_delay)
         self.ppy = int(periods_per_year)
         self.max_gross = max_gross
+        self.dtype = np.dtype(dtype)
+
+    def _charges(self, traded: np.ndarray, short: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # transaction costs on traded notional and borrow fee on short notional, in dollars per bar
+        return (traded * ((self.tc_bps + self.slippage_bps) / 10_000.0),
+                short * (self.short_borrow_apr / self.ppy))
+
+    def _arrays(self, prices: pd.DataFrame, signal: pd.Series, beta: float | pd.Series):
+        # simulate's inputs on the NaN-free bars as arrays for _simulate_arrays
+        pa = prices["A"].to_numpy(dtype=self.dtype)
+        pb = prices["B"].to_numpy(dtype=self.dtype)
+        sig = signal.reindex(prices.index).fillna(0.0).to_numpy(dtype=self.dtype)[:, None]
+        if isinstance(beta, pd.Series):
+            # time-varying hedge ratio: NaN keeps the pair flat until it is available
+            beta = beta.reindex(prices.index).to_numpy(dtype=self.dtype)[:, None]
+        return pa, pb, sig, beta
 
-    def _shares(self, prices: pd.DataFrame, signal: pd.Series, beta: float) -> pd.DataFrame:
-        prices = prices[["A", "B"]].copy()
+    def simulate(self, prices: pd.DataFrame, signal: pd.Series, beta: float | pd.Series,
+                 compact: bool = False) -> Dict[str, pd.Series] | TradeLedger:
+        """
+        Bar-by-bar PnL of trading `signal` on the A/B spread. Returns
+        full-length Series, or with compact=True a TradeLedger of round trips
+        whose Series are only built when asked for. Shares and trades have
+        the backtester's dtype; pnl, equity, costs and borrow are float64.
+        """
+        prices = prices.dropna()
+        pa, pb, sig, b = self._arrays(prices, signal, beta)
+        out = self._simulate_arrays(pa, pb, sig, b)
+        if compact:
+            trades = round_trips(out, pa, pb, (self.tc_bps + self.slippage_bps) / 10_000.0, prices.index)
+            return TradeLedger(trades, len(prices), _inputs=(self, prices, signal, beta))
+        names = {"borrow": "borrow_fee"}
+        return {k: pd.Series(v[:, 0], index=prices.index, name=names.get(k, k)) for k, v in out.items()}
+
+    def simulate_basket(self, prices: pd.DataFrame, signal: pd.Series, weights) -> Dict[str, pd.Series | pd.DataFrame]:
+        """
+        simulate for an N-leg basket whose spread is prices @ weights (e.g.
+        basket.johansen(prices).weights), one column per leg. signal +1 holds
+        k * weights shares (short where a weight is negative), -1 the reverse,
+        with k reset each bar so gross exposure equals capital. Costs, borrow
+        (on every short leg), delay and max_gross work as in simulate.
+        pnl/equity/costs/borrow are Series; shares and trades are DataFrames
+        with one column per leg.
+        """
+        prices = prices.dropna()
+        P = prices.to_numpy(dtype=np.float64)
+        w = np.asarray(weights, dtype=np.float64)
+        if w.shape != (P.shape[1],):
+            raise ValueError(f"Need one weight per leg: {P.shape[1]} legs, weights shape {w.shape}")
         sig = signal.reindex(prices.index).fillna(0.0)
         if self.signal_delay > 0:
             sig = sig.shift(self.signal_delay).fillna(0.0)
 
-        gross_leg = self.capital * 0.5  # dollars per leg
-        A_shares = (gross_leg / prices["A"]) * sig
-        B_shares = -(gross_leg / prices["B"]) * beta * sig
+        k = self.capital / (P @ np.abs(w))  # basket units per unit of signal
+        shares = (k * sig.to_numpy(dtype=np.float64))[:, None] * w
+        if self.max_gross is not None:
+            gross_now = (np.abs(shares) * P).sum(axis=1)
+            shares *= np.minimum(1.0, self.max_gross / np.maximum(gross_now, 1e-9))[:, None]
+
+        trades = np.zeros_like(shares)
+        trades[1:] = shares[1:] - shares[:-1]
+        dP = np.zeros_like(P)
+        dP[1:] = P[1:] - P[:-1]
+        prev = np.zeros_like(shares)
+        prev[1:] = shares[:-1]
+
+        pnl_pos = (prev * dP).sum(axis=1)
+        costs, borrow = self._charges((np.abs(trades) * P).sum(axis=1), (np.abs(np.minimum(prev, 0.0)) * P).sum(axis=1))
+        pnl = pnl_pos - costs - borrow
+
+        idx, legs = prices.index, prices.columns
+        return {
+            "pnl": pd.Series(pnl, index=idx, name="pnl"),
+            "equity": pd.Series(np.cumsum(pnl), index=idx, name="equity"),
+            "costs": pd.Series(costs, index=idx, name="costs"),
+            "borrow": pd.Series(borrow, index=idx, name="borrow_fee"),
+            "shares": pd.DataFrame(shares, index=idx, columns=legs),
+            "trades": pd.DataFrame(trades, index=idx, columns=legs),
+        }
 
-        shares = pd.DataFrame({"A_shares": A_shares, "B_shares": B_shares})
-        # optional gross cap
+    def simulate_many(self, prices, signals, betas) -> Dict[str, pd.DataFrame]:
+        """
+        simulate for N pairs at once on a shared, NaN-free bar index.
+        prices: (T, N, 2) array of [A, B] legs, or DataFrame with (pair, "A"/"B") columns.
+        signals: (T, N) array or DataFrame with one column per pair.
+        betas: length-N hedge ratios, or a (T, N) array/DataFrame of time-varying ones.
+        Returns the same keys as simulate, each a (T, N) DataFrame (one column per pair).
+        """
+        if isinstance(prices, pd.DataFrame):
+            pairs = list(dict.fromkeys(prices.columns.get_level_values(0)))
+            index = prices.index
+            pa = prices.xs("A", axis=1, level=1)[pairs].to_numpy(dtype=np.float64)
+            pb = prices.xs("B", axis=1, level=1)[pairs].to_numpy(dtype=np.float64)
+        else:
+            arr = np.asarray(prices, dtype=np.float64)
+            pa, pb = np.ascontiguousarray(arr[..., 0]), np.ascontiguousarray(arr[..., 1])
+            index, pairs = None, None
+        if np.isnan(pa).any() or np.isnan(pb).any():
+            raise ValueError("simulate_many needs NaN-free prices on one index; use simulate for ragged pairs.")
+
+        if isinstance(signals, pd.DataFrame):
+            if index is not None:
+                signals = signals.reindex(index=index, columns=pairs)
+            index = signals.index if index is None else index
+            pairs = list(signals.columns) if pairs is None else pairs
+            sig = signals.fillna(0.0).to_numpy(dtype=np.float64)
+        else:
+            sig = np.nan_to_num(np.asarray(signals, dtype=np.float64), nan=0.0)
+        if isinstance(betas, pd.DataFrame):
+            betas = betas.reindex(index=index, columns=pairs)
+        betas = np.asarray(betas, dtype=np.float64)
+        if not (pa.shape == pb.shape == sig.shape) or betas.shape not in ((pa.shape[1],), pa.shape):
+            raise ValueError(f"Shape mismatch: prices {pa.shape}, signals {sig.shape}, betas {betas.shape}")
+
+        out = self._simulate_arrays(pa, pb, sig, betas)
+        return {k: pd.DataFrame(v, index=index, columns=pairs, copy=False) for k, v in out.items()}
+
+    def _simulate_arrays(self, pa: np.ndarray, pb: np.ndarray, sig: np.ndarray, beta,
+                         carry: Optional[dict] = None) -> Dict[str, np.ndarray]:
+        """
+        NumPy core of simulate for many columns at once.
+        pa, pb: (T,) or (T, K) prices; sig: (T, K) undelayed signals (all cast to self.dtype);
+        beta: scalar, (K,) or (T, K) / (T, 1) time-varying (NaN = no position).
+        Follows simulate step for step; returns (T, K) arrays keyed like simulate.
+
+        carry holds the boundary state (pending signals, last prices, shares
+        and equity) between consecutive blocks of bars: pass the same dict,
+        initially empty, with each block to get the full-history result piecewise.
+        """
+        dt, f64 = self.dtype, np.float64
+        pa = np.asarray(pa, dtype=dt)
+        pb = np.asarray(pb, dtype=dt)
+        if pa.ndim == 1:
+            pa, pb = pa[:, None], pb[:, None]
+        sig = np.asarray(sig, dtype=dt)
+        n = sig.shape[0]
+        carry = {} if carry is None else carry
+        first = "equity" not in carry
+        if self.signal_delay > 0:
+            d = self.signal_delay
+            pending = carry.get("sig", np.zeros((d, sig.shape[1]), dtype=dt))
+            ext = np.concatenate([pending, sig])
+            carry["sig"] = ext[len(ext) - d:].copy()
+            sig = ext[:n]
+        beta = np.asarray(beta, dtype=dt)
+        if beta.ndim == 2 and np.isnan(beta).any():
+            sig = np.where(np.isnan(beta), 0.0, sig)
+            beta = np.nan_to_num(beta, nan=0.0)
+
+        gross_leg = self.capital * 0.5
+        A_sh = (gross_leg / pa) * sig
+        B_sh = -(gross_leg / pb) * beta * sig
         if self.max_gross is not None:
-            gross_now = (shares.abs() * prices.to_frame()).sum(axis=1)
+            gross_now = np.abs(A_sh) * pa + np.abs(B_sh) * pb
             scale = np.minimum(1.0, self.max_gross / np.maximum(gross_now, 1e-9))
-            shares = shares.mul(scale, axis=0)
-        return shares
-
-    def simulate(self, prices: pd.DataFrame, signal: pd.Series, beta: float) -> Dict[str, pd.Series]:
-        prices = prices.dropna().copy()
-        shares = self._shares(prices, signal, beta)
-        trades = shares.diff().fillna(0.0).rename(columns={"A_shares": "A_trades", "B_shares": "B_trades"})
-
-        dA = prices["A"].diff().fillna(0.0)
-        dB = prices["B"].diff().fillna(0.0)
-
-        # position PnL uses previous-day shares
-        pos_prev = shares.shift(1).fillna(0.0)
-        pnl_pos = pos_prev["A_shares"] * dA + pos_prev["B_shares"] * dB
-
-        # trading costs on traded notional
-        traded_notional = (trades.abs().assign(
-            A=lambda x: x["A_trades"] * prices["A"],
-            B=lambda x: x["B_trades"] * prices["B"]
-        )[["A", "B"]].sum(axis=1))
-        cost_rate = (self.tc_bps + self.slippage_bps) / 10_000.0
-        costs = traded_notional * cost_rate
-
-        # borrow fee on short leg notional (assume B is short when signal>0)
-        short_notional = (pos_prev["B_shares"].clip(upper=0).abs() * prices["B"])
-        borrow_daily = short_notional * (self.short_borrow_apr / self.ppy)
-
-        pnl = pnl_pos - costs - borrow_daily
-        equity = pnl.cumsum()
-
-        out = {
-            "pnl": pnl.rename("pnl"),
-            "equity": equity.rename("equity"),
-            "costs": costs.rename("costs"),
-            "borrow": borrow_daily.rename("borrow_fee"),
-            "A_shares": shares["A_shares"],
-            "B_shares": shares["B_shares"],
-            "A_trades": trades["A_trades"],
-            "B_trades": trades["B_trades"],
+            A_sh *= scale
+            B_sh *= scale
+
+        A_tr = np.zeros_like(A_sh)
+        B_tr = np.zeros_like(B_sh)
+        A_tr[1:] = A_sh[1:] - A_sh[:-1]
+        B_tr[1:] = B_sh[1:] - B_sh[:-1]
+        dA = np.zeros_like(pa)
+        dB = np.zeros_like(pb)
+        dA[1:] = pa[1:] - pa[:-1]
+        dB[1:] = pb[1:] - pb[:-1]
+        A_prev = np.zeros_like(A_sh)
+        B_prev = np.zeros_like(B_sh)
+        A_prev[1:] = A_sh[:-1]
+        B_prev[1:] = B_sh[:-1]
+        if n and not first:
+            # first bar of a later block continues from the previous one
+            A_tr[0] = A_sh[0] - carry["A_shares"]
+            B_tr[0] = B_sh[0] - carry["B_shares"]
+            dA[0] = pa[0] - carry["A"]
+            dB[0] = pb[0] - carry["B"]
+            A_prev[0] = carry["A_shares"]
+            B_prev[0] = carry["B_shares"]
+
+        # money is accumulated in float64 whatever the price/share dtype
+        pnl_pos = np.multiply(A_prev, dA, dtype=f64) + np.multiply(B_prev, dB, dtype=f64)
+        costs, borrow = self._charges(
+            np.multiply(np.abs(A_tr), pa, dtype=f64) + np.multiply(np.abs(B_tr), pb, dtype=f64),
+            np.multiply(np.abs(np.minimum(B_prev, 0.0)), pb, dtype=f64),
+        )
+        pnl = pnl_pos - costs - borrow
+        if first:
+            equity = np.cumsum(pnl, axis=0)
+        else:
+            # same running sum as one cumsum over the whole history
+            equity = np.cumsum(np.concatenate([carry["equity"][None, :], pnl]), axis=0)[1:]
+        if n:
+            carry.update({k: v[-1].copy() for k, v in
+                          (("A", pa), ("B", pb), ("A_shares", A_sh), ("B_shares", B_sh), ("equity", equity))})
+        return {
+            "pnl": pnl, "equity": equity, "costs": costs, "borrow": borrow,
+            "A_shares": A_sh, "B_shares": B_sh, "A_trades": A_tr, "B_trades": B_tr,
         }
-        return out
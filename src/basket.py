@@ -0,0 +1,220 @@
+# Johansen cointegration test and search over multi-leg baskets
+from __future__ import annotations
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Iterable, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+try:
+    from .pair_filter import _candidate_index
+except ImportError:
+    from pair_filter import _candidate_index
+
+# critical values come from statsmodels' Johansen tables, loaded on first use
+
+@dataclass
+class JohansenResult:
+    weights: np.ndarray       # cointegrating vector of the largest eigenvalue, weights[0] == 1
+    eig: np.ndarray           # eigenvalues, largest first
+    trace_stat: np.ndarray    # trace statistic of H0: rank <= r, r = 0..N-1
+    max_eig_stat: np.ndarray  # maximum-eigenvalue statistic of H0: rank == r
+    trace_crit: np.ndarray    # (N, 3) 90/95/99% critical values of trace_stat
+    max_eig_crit: np.ndarray  # (N, 3) same for max_eig_stat
+    rank: int                 # first r whose trace_stat is below its 95% value
+    nobs: int
+
+def _detrend(y: np.ndarray, order: int) -> np.ndarray:
+    # residual of a per-column polynomial fit of `order` (-1: untouched)
+    if order == -1:
+        return y
+    if order == 0:
+        return y - y.mean(axis=0)
+    X = np.vander(np.linspace(-1, 1, len(y)), order + 1)
+    return y - X @ np.linalg.lstsq(X, y, rcond=None)[0]
+
+def _moment_matrix(values: np.ndarray, det_order: int, k_ar_diff: int) -> tuple[np.ndarray, int]:
+    """
+    (M, nobs): cross-product matrix / nobs of the stacked regressors
+    [lagged levels | differences | k_ar_diff lagged differences] of every
+    column, laid out as statsmodels' coint_johansen builds them. Every
+    regressor is detrended column by column, so the moments of any subset
+    of tickers are a sub-block of M.
+    """
+    T, N = values.shape
+    k = k_ar_diff
+    x = _detrend(values, det_order)
+    dx = np.diff(x, axis=0)
+    parts = [x[1:T - k], dx[k:]] + [dx[k - j:len(dx) - j] for j in range(1, k + 1)]
+    W = np.hstack(parts)
+    if det_order > -1:
+        W = W - W.mean(axis=0)
+    return (W.T @ W) / len(W), len(W)
+
+def _group_columns(groups: np.ndarray, N: int, k_ar_diff: int) -> np.ndarray:
+    # (G, m * (2 + k)) positions of each group's regressors in the moment matrix
+    return np.concatenate([groups + N * j for j in range(2 + k_ar_diff)], axis=1)
+
+def _johansen_moments(Mg: np.ndarray, m: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Eigenvalues (G, m) largest first and cointegrating vectors (G, m, m),
+    columns normalized to v' S11 v = 1, from (G, q, q) group moment blocks.
+    """
+    if Mg.shape[1] > 2 * m:
+        # partial out the lagged differences
+        Szz, Sz = Mg[:, 2 * m:, 2 * m:], Mg[:, 2 * m:, :2 * m]
+        R = Mg[:, :2 * m, :2 * m] - np.swapaxes(Sz, 1, 2) @ np.linalg.solve(Szz, Sz)
+    else:
+        R = Mg
+    skk, sk0, s00 = R[:, :m, :m], R[:, :m, m:], R[:, m:, m:]
+    Ci = np.linalg.inv(np.linalg.cholesky(skk))
+    A = Ci @ sk0 @ np.linalg.solve(s00, np.swapaxes(sk0, 1, 2)) @ np.swapaxes(Ci, 1, 2)
+    lam, U = np.linalg.eigh((A + np.swapaxes(A, 1, 2)) / 2)
+    return lam[:, ::-1], (np.swapaxes(Ci, 1, 2) @ U)[:, :, ::-1]
+
+def _johansen_groups(M: np.ndarray, groups: np.ndarray, N: int, k_ar_diff: int) -> tuple[np.ndarray, np.ndarray]:
+    # _johansen_moments for groups of one size; a singular group only fails itself
+    cols = _group_columns(groups, N, k_ar_diff)
+    Mg = M[cols[:, :, None], cols[:, None, :]]
+    m = groups.shape[1]
+    try:
+        return _johansen_moments(Mg, m)
+    except np.linalg.LinAlgError:
+        lam = np.full((len(groups), m), np.nan)
+        vec = np.full((len(groups), m, m), np.nan)
+        for g in range(len(groups)):
+            try:
+                lam[g], vec[g] = (a[0] for a in _johansen_moments(Mg[g:g + 1], m))
+            except np.linalg.LinAlgError:
+                pass
+        return lam, vec
+
+def _crit_values(m: int, det_order: int) -> tuple[np.ndarray, np.ndarray]:
+    # (m, 3) trace and max-eigenvalue critical values for H0: rank <= r, r = 0..m-1
+    from statsmodels.tsa.coint_tables import c_sja, c_sjt
+
+    trace = np.array([c_sjt(m - r, det_order) for r in range(m)], dtype=float)
+    max_eig = np.array([c_sja(m - r, det_order) for r in range(m)], dtype=float)
+    return trace, max_eig
+
+def _stats(lam: np.ndarray, nobs: int) -> tuple[np.ndarray, np.ndarray]:
+    # trace and max-eigenvalue statistics from (G, m) eigenvalues
+    with np.errstate(divide="ignore", invalid="ignore"):
+        l1 = -nobs * np.log1p(-lam)
+    return np.cumsum(l1[:, ::-1], axis=1)[:, ::-1], l1
+
+def _rank(trace: np.ndarray, crit95: np.ndarray) -> np.ndarray:
+    below = trace <= crit95
+    return np.where(below.any(axis=1), below.argmax(axis=1), trace.shape[1])
+
+def johansen(prices, det_order: int = 0, k_ar_diff: int = 1) -> JohansenResult:
+    """
+    Johansen cointegration test of the columns of `prices` (DataFrame or
+    (T, N) array; rows with a missing price are dropped), with the same
+    statistics as statsmodels' coint_johansen(prices, det_order, k_ar_diff).
+    det_order: -1 no deterministic terms, 0 constant, 1 linear trend.
+    weights is the most stationary combination: spread = prices @ weights.
+    """
+    values = np.asarray(pd.DataFrame(prices).dropna(), dtype=np.float64)
+    T, N = values.shape
+    if N < 2:
+        raise ValueError(f"need at least 2 legs, got {N}")
+    if T <= N * (k_ar_diff + 2):
+        raise ValueError(f"too few bars ({T}) for {N} legs and k_ar_diff={k_ar_diff}")
+    M, nobs = _moment_matrix(values, det_order, k_ar_diff)
+    lam, vec = _johansen_moments(M[None], N)
+    lam, vec = lam[0], vec[0]
+    trace, max_eig = (s[0] for s in _stats(lam[None], nobs))
+    trace_crit, max_eig_crit = _crit_values(N, det_order)
+    return JohansenResult(
+        weights=vec[:, 0] / vec[0, 0], eig=lam, trace_stat=trace, max_eig_stat=max_eig,
+        trace_crit=trace_crit, max_eig_crit=max_eig_crit,
+        rank=int(_rank(trace[None], trace_crit[None, :, 1])[0]), nobs=nobs,
+    )
+
+def _cliques(keep: np.ndarray, size: int) -> np.ndarray:
+    # (G, size) index groups, ascending, in which every pair is kept
+    n = len(keep)
+    groups = np.arange(n)[:, None]
+    for _ in range(size - 1):
+        ok = keep[groups].all(axis=1) & (np.arange(n)[None, :] > groups[:, -1:])
+        g, k = np.nonzero(ok)
+        groups = np.column_stack([groups[g], k])
+    return groups
+
+def basket_search(
+    prices_wide: pd.DataFrame,
+    size: int = 3,
+    groups: Optional[Iterable[Sequence[str]]] = None,
+    det_order: int = 0,
+    k_ar_diff: int = 1,
+    prefilter: Optional[dict] = None,
+    batch_size: int = 50_000,
+) -> pd.DataFrame:
+    """
+    Johansen test of many baskets of tickers from a wide price frame.
+
+    Tests every `size`-ticker combination, or only `groups` (lists of
+    tickers, any sizes). prefilter takes pair_filter.candidate_pairs
+    keyword arguments; a basket is kept only if each of its pairs survives.
+    The cross-product matrix of every ticker's levels, differences and
+    lagged differences is computed once; each basket's moments are a
+    sub-block of it, so a basket costs a few size x size matrix operations,
+    batched over up to batch_size baskets, instead of a pass over the bars.
+    Bars where any used ticker is missing are dropped.
+
+    Returns legs, weights (spread = prices[legs] @ weights, first weight 1),
+    eig (largest eigenvalue), trace_stat / trace_crit and max_eig_stat /
+    max_eig_crit (rank 0 vs more, 95% level), rank and trace_ratio
+    (trace_stat / trace_crit), strongest baskets first.
+    """
+    cols = list(prices_wide.columns)
+    pos = {c: i for i, c in enumerate(cols)}
+    if groups is not None:
+        idx_groups = [np.array(sorted(pos[c] for c in g)) for g in groups]
+    elif prefilter is not None:
+        values = prices_wide.to_numpy(dtype=np.float64)
+        pairs, _, _ = _candidate_index(values, cols, **prefilter)
+        keep = np.zeros((len(cols), len(cols)), dtype=bool)
+        keep[pairs[:, 0], pairs[:, 1]] = keep[pairs[:, 1], pairs[:, 0]] = True
+        idx_groups = list(_cliques(keep, size))
+    else:
+        idx_groups = list(np.array(list(combinations(range(len(cols)), size)), dtype=int).reshape(-1, size))
+
+    used = sorted({int(i) for g in idx_groups for i in g})
+    remap = np.full(len(cols), -1)
+    remap[used] = np.arange(len(used))
+    values = prices_wide.iloc[:, used].dropna().to_numpy(dtype=np.float64)
+    N = len(used)
+    M, nobs = _moment_matrix(values, det_order, k_ar_diff) if N else (None, 0)
+
+    by_size: dict = {}
+    for g in idx_groups:
+        by_size.setdefault(len(g), []).append(g)
+    frames = []
+    names = np.asarray(cols, dtype=object)
+    for m, gs in sorted(by_size.items()):
+        G = np.array(gs, dtype=int)
+        trace_crit, max_eig_crit = _crit_values(m, det_order)
+        for lo in range(0, len(G), batch_size):
+            part = G[lo:lo + batch_size]
+            lam, vec = _johansen_groups(M, remap[part], N, k_ar_diff)
+            trace, max_eig = _stats(lam, nobs)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                w = vec[:, :, 0] / vec[:, :1, 0]
+            frames.append(pd.DataFrame({
+                "legs": [tuple(names[g]) for g in part],
+                "weights": [tuple(r) for r in w],
+                "eig": lam[:, 0],
+                "trace_stat": trace[:, 0], "trace_crit": trace_crit[0, 1],
+                "max_eig_stat": max_eig[:, 0], "max_eig_crit": max_eig_crit[0, 1],
+                "rank": _rank(trace, trace_crit[None, :, 1]),
+                "trace_ratio": trace[:, 0] / trace_crit[0, 1],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["legs", "weights", "eig", "trace_stat", "trace_crit", "max_eig_stat",
+                                     "max_eig_crit", "rank", "trace_ratio"])
+    out = pd.concat(frames, ignore_index=True)
+    out = out.sort_values("trace_ratio", ascending=False, kind="stable").reset_index(drop=True)
+    out.attrs["nobs"] = nobs
+    return out
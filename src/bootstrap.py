@@ -0,0 +1,161 @@
+# Bootstrap confidence intervals and deflated Sharpe for backtest PnL
+from __future__ import annotations
+import math
+import os
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+try:
+    from .metrics import MetricsAccumulator
+except ImportError:
+    from metrics import MetricsAccumulator
+
+_METRICS = ("sharpe", "sortino", "annual_return", "max_drawdown", "hit_rate")
+_EULER_GAMMA = 0.5772156649015329
+
+def resample_indices(n: int, n_resamples: int, block: float, method: str = "stationary",
+                     rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    (n, n_resamples) bar indices, one column per resample, wrapping around
+    the end of the series. method="block": circular blocks of fixed length
+    `block`; method="stationary" (Politis–Romano): blocks of geometric
+    length with mean `block`.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    pos = np.arange(n, dtype=np.int32)
+    if method == "block":
+        L = max(1, int(round(block)))
+        starts = rng.integers(0, n, (-(-n // L), n_resamples), dtype=np.int32)
+        idx = starts[pos // L] + (pos % L)[:, None]
+    elif method == "stationary":
+        # built as (resamples, bars) so the running block start scans contiguous rows
+        new = rng.random((n_resamples, n), dtype=np.float32) < 1.0 / max(block, 1.0)
+        new[:, 0] = True
+        last = np.maximum.accumulate(np.where(new, pos, np.int32(0)), axis=1)
+        start = np.zeros((n_resamples, n), dtype=np.int32)
+        start[new] = rng.integers(0, n, np.count_nonzero(new), dtype=np.int32)
+        idx = np.take_along_axis(start, last, axis=1)
+        idx += pos - last
+        idx = idx.T
+    else:
+        raise ValueError(f"Unknown bootstrap method: {method!r} (expected stationary or block)")
+    idx[idx >= n] -= n
+    return idx
+
+def _resample_chunk(pnl: np.ndarray, n_resamples: int, block: float, method: str, seed: np.random.SeedSequence,
+                    capital: float, periods_per_year: int) -> dict:
+    # worker: metrics of n_resamples resampled PnL paths, all at once
+    idx = resample_indices(len(pnl), n_resamples, block, method, np.random.default_rng(seed))
+    return MetricsAccumulator(capital, periods_per_year).update(pnl[idx]).result()
+
+@dataclass
+class BootstrapResult:
+    estimate: Dict[str, float]  # metrics of the original series
+    samples: pd.DataFrame       # one row of metrics per resample
+    method: str
+    block: float
+    seed: int                   # SeedSequence entropy; rerun with it to reproduce
+
+    def ci(self, level: float = 0.95) -> pd.DataFrame:
+        """
+        Percentile intervals: estimate, lo, hi and bootstrap std per metric.
+        Resamples where a metric is undefined (NaN) are left out.
+        """
+        a = (1.0 - level) / 2.0
+        s = self.samples
+        return pd.DataFrame({
+            "estimate": pd.Series(self.estimate),
+            "lo": s.quantile(a), "hi": s.quantile(1.0 - a), "std": s.std(ddof=1),
+        }).loc[list(s.columns)]
+
+def bootstrap_metrics(
+    pnl,
+    n_resamples: int = 10_000,
+    method: str = "stationary",
+    block: Optional[float] = None,
+    capital: float = 1_000_000.0,
+    periods_per_year: int = 252,
+    seed: Optional[int] = None,
+    n_jobs: int = 1,
+    batch_bytes: int = 32 * 2**20,
+) -> BootstrapResult:
+    """
+    Bootstrap distribution of sharpe, sortino, annual_return, max_drawdown
+    and hit_rate for a PnL series (e.g. PairsBacktester.simulate()["pnl"]).
+
+    Resamples keep serial dependence by drawing blocks (see resample_indices;
+    block defaults to n ** (1/3) bars). Indices and metrics are computed for
+    a batch of resamples at a time (about batch_bytes of indices), each
+    batch seeded from SeedSequence(seed).spawn(), so the samples depend only
+    on seed and batch_bytes, not on n_jobs. n_jobs > 1 (<= 0: all cores)
+    runs batches in a process pool. NaN bars count as zero PnL.
+    """
+    x = np.asarray(pnl, dtype=np.float64)
+    x = np.where(np.isnan(x), 0.0, x)
+    n = len(x)
+    if n < 2:
+        raise ValueError("need at least 2 bars to bootstrap")
+    block = float(block) if block is not None else max(1.0, n ** (1.0 / 3.0))
+    ss = np.random.SeedSequence(seed)
+    per = max(1, batch_bytes // (8 * n))
+    sizes = [min(per, n_resamples - lo) for lo in range(0, n_resamples, per)]
+    seeds = ss.spawn(len(sizes))
+    args = (block, method)
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+
+    if n_jobs == 1 or len(sizes) == 1:
+        parts = [_resample_chunk(x, k, *args, s, capital, periods_per_year) for k, s in zip(sizes, seeds)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            futs = [ex.submit(_resample_chunk, x, k, *args, s, capital, periods_per_year) for k, s in zip(sizes, seeds)]
+            parts = [f.result() for f in futs]
+
+    samples = pd.DataFrame({m: np.concatenate([p[m] for p in parts]) for m in _METRICS})
+    estimate = MetricsAccumulator(capital, periods_per_year).update(x).result()
+    return BootstrapResult(estimate=estimate, samples=samples, method=method, block=block, seed=ss.entropy)
+
+def probabilistic_sharpe_ratio(pnl, sr_benchmark: float = 0.0, capital: float = 1_000_000.0,
+                               periods_per_year: int = 252) -> float:
+    """
+    Probability that the true Sharpe exceeds sr_benchmark (annualized),
+    given the sample Sharpe, skewness, kurtosis and length of the PnL
+    (Bailey & López de Prado, 2012).
+    """
+    r = np.nan_to_num(np.asarray(pnl, dtype=np.float64), nan=0.0) / capital
+    n = len(r)
+    sd = r.std(ddof=1)
+    if n < 3 or not sd > 0:
+        return float("nan")
+    sr = r.mean() / sd  # per bar
+    z = (r - r.mean()) / r.std(ddof=0)
+    skew, kurt = float((z ** 3).mean()), float((z ** 4).mean())
+    sr0 = sr_benchmark / math.sqrt(periods_per_year)
+    denom = 1.0 - skew * sr + (kurt - 1.0) / 4.0 * sr * sr
+    if not denom > 0:
+        return float("nan")
+    return NormalDist().cdf((sr - sr0) * math.sqrt(n - 1) / math.sqrt(denom))
+
+def deflated_sharpe_ratio(pnl, trial_sharpes: Sequence[float], capital: float = 1_000_000.0,
+                          periods_per_year: int = 252) -> float:
+    """
+    Probabilistic Sharpe of the selected strategy against the Sharpe the
+    best of len(trial_sharpes) unskilled trials would reach by luck
+    (Bailey & López de Prado, 2014). trial_sharpes are the annualized
+    Sharpes of every config tried, e.g. the `sharpe` column of sweep().
+    """
+    trials = np.asarray(trial_sharpes, dtype=np.float64)
+    trials = trials[np.isfinite(trials)]
+    N = len(trials)
+    if N < 2:
+        return probabilistic_sharpe_ratio(pnl, 0.0, capital, periods_per_year)
+    norm = NormalDist()
+    sd = trials.std(ddof=1)
+    expected_max = sd * ((1.0 - _EULER_GAMMA) * norm.inv_cdf(1.0 - 1.0 / N)
+                         + _EULER_GAMMA * norm.inv_cdf(1.0 - 1.0 / (N * math.e)))
+    return probabilistic_sharpe_ratio(pnl, expected_max, capital, periods_per_year)
@@ -0,0 +1,131 @@
+# Out-of-core (chunked) backtests over long multi-pair histories
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+try:
+    from .signal_generator import generate_signals_array
+    from .backtester import PairsBacktester
+    from .metrics import MetricsAccumulator
+    from .streaming import _rolling_zscore
+except ImportError:
+    from signal_generator import generate_signals_array
+    from backtester import PairsBacktester
+    from metrics import MetricsAccumulator
+    from streaming import _rolling_zscore
+
+# (index or None, A prices (t, N), B prices (t, N)) for consecutive bars
+Block = Tuple[Optional[np.ndarray], np.ndarray, np.ndarray]
+
+class ChunkedBacktest:
+    """
+    compute_spread -> zscore -> generate_signals -> PairsBacktester.simulate
+    for N pairs (fixed hedge ratios), fed consecutive blocks of bars.
+
+    Everything that crosses a block boundary is carried: the rolling z-score
+    window and its running sums, positions and cooldowns, pending (delayed)
+    signals, last prices, shares and equity. Concatenated block outputs are
+    identical to running the in-memory pipeline on the full history, while
+    memory stays proportional to the block size. Prices must be NaN-free.
+    """
+
+    def __init__(
+        self,
+        beta,
+        lookback: int = 60,
+        entry: float = 2.0,
+        exit: float = 0.0,
+        max_abs_z: Optional[float] = None,
+        cooldown: int = 0,
+        backtester: Optional[PairsBacktester] = None,
+    ):
+        self.beta = np.atleast_1d(np.asarray(beta, dtype=np.float64))
+        self.lookback = int(lookback)
+        self.entry, self.exit, self.max_abs_z, self.cooldown = entry, exit, max_abs_z, cooldown
+        self.bt = backtester if backtester is not None else PairsBacktester()
+        k = len(self.beta)
+        self._buf = np.full((self.lookback, k), np.nan)
+        self._zstate = np.zeros((11, k))
+        self._sig_state: dict = {}
+        self._carry: dict = {}
+        self.bars = 0
+
+    def step(self, pa, pb) -> Dict[str, np.ndarray]:
+        """
+        Advance by one block of A and B prices, (t, N) or (t,) for one pair.
+        Returns (t, N) arrays: spread, z, signal and the simulate keys.
+        """
+        pa = np.asarray(pa, dtype=np.float64).reshape(len(pa), -1)
+        pb = np.asarray(pb, dtype=np.float64).reshape(len(pb), -1)
+        if pa.shape != pb.shape or pa.shape[1] != len(self.beta):
+            raise ValueError(f"Shape mismatch: A {pa.shape}, B {pb.shape}, betas {self.beta.shape}")
+        if np.isnan(pa).any() or np.isnan(pb).any():
+            raise ValueError("ChunkedBacktest needs NaN-free prices on one index.")
+
+        spread = pa - self.beta * pb
+        z = _rolling_zscore(spread, self._buf, self._zstate, self.bars)
+        sig = generate_signals_array(z, self.entry, self.exit, self.max_abs_z, self.cooldown,
+                                     state=self._sig_state)
+        out = self.bt._simulate_arrays(pa, pb, sig, self.beta, carry=self._carry)
+        out.update(spread=spread, z=z, signal=sig)
+        self.bars += len(pa)
+        return out
+
+    def run(
+        self,
+        blocks: Iterable[Block],
+        sink: Optional[Callable[[Optional[np.ndarray], Dict[str, np.ndarray]], None]] = None,
+    ) -> dict:
+        """
+        Feed every block; sink(index, outputs) receives each block's results
+        (e.g. to append them to disk). Returns MetricsAccumulator statistics
+        per pair over the whole history.
+        """
+        acc = MetricsAccumulator(self.bt.capital, self.bt.ppy)
+        for index, pa, pb in blocks:
+            out = self.step(pa, pb)
+            acc.update(out["pnl"])
+            if sink is not None:
+                sink(index, out)
+        return acc.result()
+
+def iter_npy_blocks(
+    a_path: str,
+    b_path: str,
+    chunk_rows: int = 100_000,
+    index_path: Optional[str] = None,
+) -> Iterator[Block]:
+    """
+    Stream (T, N) A and B price matrices saved with np.save (plus an optional
+    1-D index) in blocks of chunk_rows bars, memory-mapped so only the
+    current block is read into RAM.
+    """
+    A = np.load(a_path, mmap_mode="r")
+    B = np.load(b_path, mmap_mode="r")
+    idx = np.load(index_path, mmap_mode="r") if index_path is not None else None
+    if A.shape != B.shape:
+        raise ValueError(f"Shape mismatch: A {A.shape}, B {B.shape}")
+    for lo in range(0, len(A), int(chunk_rows)):
+        hi = lo + int(chunk_rows)
+        yield (None if idx is None else np.array(idx[lo:hi]),
+               np.array(A[lo:hi], dtype=np.float64), np.array(B[lo:hi], dtype=np.float64))
+
+def iter_parquet_blocks(
+    path: str,
+    a_cols: List[str],
+    b_cols: List[str],
+    index_col: Optional[str] = None,
+) -> Iterator[Block]:
+    """
+    Stream a Parquet file one row group at a time; a_cols[i] and b_cols[i]
+    are the two legs of pair i. Needs pyarrow.
+    """
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    cols = list(a_cols) + list(b_cols) + ([index_col] if index_col else [])
+    for g in range(pf.num_row_groups):
+        tbl = pf.read_row_group(g, columns=cols)
+        A = np.column_stack([tbl.column(c).to_numpy() for c in a_cols]).astype(np.float64)
+        B = np.column_stack([tbl.column(c).to_numpy() for c in b_cols]).astype(np.float64)
+        yield (tbl.column(index_col).to_numpy() if index_col else None), A, B
@@ -0,0 +1,170 @@
+# Memoized cointegration results keyed by a fingerprint of the input prices
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# bump when a change to the test alters its numbers, so stale entries stop matching
+_VERSION = 2
+_FIELDS = ("beta", "pval", "adf_stat", "r2", "resid_std")
+
+def _digest(x: np.ndarray) -> bytes:
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    return hashlib.blake2b(x.view(np.uint8), digest_size=16).digest()
+
+def coint_key(a, b, engine: str = "loop", **params) -> str:
+    """
+    Cache key of an Engle–Granger test of A on B: hash of both float64
+    arrays, the engine that computed it ("loop": engle_granger, "batch":
+    the vectorized scan) and any test parameters.
+    """
+    return _pair_key(_digest(a), _digest(b), engine, params)
+
+def _pair_key(da: bytes, db: bytes, engine: str, params: dict) -> str:
+    head = json.dumps({"v": _VERSION, "engine": engine, "regression": "c", "autolag": "AIC", **params},
+                      sort_keys=True).encode()
+    return hashlib.blake2b(head + da + db, digest_size=16).hexdigest()
+
+class CointCache:
+    """
+    Two-tier memo of CointResult by coint_key: an in-process LRU of up to
+    maxsize entries in front of an optional SQLite file under `root` that
+    persists across runs and is shared by processes (worker pools, parallel
+    CLI jobs). stats counts hits (in memory or on disk), the disk_hits among
+    them, misses and disk writes. Safe for threads within one process.
+    """
+
+    def __init__(self, root: str | Path | None = None, maxsize: int = 100_000):
+        self.root = None if root is None else Path(root)
+        self.maxsize = maxsize
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        if self.root is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+
+    # ---- public API -------------------------------------------------------
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, res) -> None:
+        self.put_many([(key, res)])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, object]:
+        """
+        {key: CointResult} for the keys found; the rest count as misses.
+        """
+        try:
+            from .coint_test import CointResult
+        except ImportError:
+            from coint_test import CointResult
+
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, tuple] = {}
+        with self._lock:
+            for k in keys:
+                row = self._mem.get(k)
+                if row is not None:
+                    self._mem.move_to_end(k)
+                    found[k] = row
+            rest = [k for k in keys if k not in found]
+            if rest and self.root is not None:
+                disk = self._select(rest)
+                self.stats["disk_hits"] += len(disk)
+                self._remember(disk.items())
+                found.update(disk)
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return {k: CointResult(*row) for k, row in found.items()}
+
+    def put_many(self, items: Iterable[Tuple[str, object]]) -> None:
+        rows = [(k, tuple(float(getattr(res, f)) for f in _FIELDS)) for k, res in items]
+        if not rows:
+            return
+        with self._lock:
+            self._remember(rows)
+            if self.root is not None:
+                conn = self._connect()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO coint VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(k, *row) for k, row in rows])
+                self.stats["writes"] += len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self.root is not None:
+                conn = self._connect()
+                with conn:
+                    conn.execute("DELETE FROM coint")
+
+    def info(self) -> str:
+        s = self.stats
+        return (f"coint cache: {s['hits']} hits ({s['disk_hits']} from disk), {s['misses']} misses, "
+                f"{s['writes']} written")
+
+    def __len__(self) -> int:
+        if self.root is None:
+            return len(self._mem)
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM coint").fetchone()[0]
+
+    # ---- storage ----------------------------------------------------------
+    def _remember(self, rows) -> None:
+        for k, row in rows:
+            self._mem[k] = row
+            self._mem.move_to_end(k)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def _connect(self):
+        # one connection per process: a forked worker must not reuse the parent's
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3
+
+            self._conn = sqlite3.connect(self.root / "coint.sqlite", timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coint (key TEXT PRIMARY KEY, beta REAL, pval REAL, "
+                "adf_stat REAL, r2 REAL, resid_std REAL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def _select(self, keys: List[str]) -> Dict[str, tuple]:
+        conn, out = self._connect(), {}
+        for lo in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            part = keys[lo:lo + 500]
+            q = f"SELECT * FROM coint WHERE key IN ({','.join('?' * len(part))})"
+            for k, *row in conn.execute(q, part):
+                out[k] = tuple(row)
+        return out
+
+    def __getstate__(self):
+        # pickles (e.g. to worker processes) carry the location, not the memo or connection
+        return {"root": self.root, "maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"], state["maxsize"])
+
+_OPEN: Dict[Optional[str], CointCache] = {}
+
+def as_coint_cache(cache: Union[CointCache, str, Path, None]) -> Optional[CointCache]:
+    """
+    CointCache for a cache argument: instances pass through, a directory
+    maps to one shared instance per process (so its LRU survives between
+    calls), None stays None.
+    """
+    if cache is None or isinstance(cache, CointCache):
+        return cache
+    root = str(Path(cache).resolve())
+    if root not in _OPEN:
+        _OPEN[root] = CointCache(root)
+    return _OPEN[root]
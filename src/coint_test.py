@@ -1,10 +1,20 @@
 # Engle–Granger / ADF test
 from __future__ import annotations
+import os
+import warnings
 from dataclasses import dataclass
+from typing import Callable, Optional
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import adfuller
+
+try:
+    from .coint_cache import CointCache, as_coint_cache, coint_key, _digest, _pair_key
+    from .pair_filter import _candidate_index
+except ImportError:
+    from coint_cache import CointCache, as_coint_cache, coint_key, _digest, _pair_key
+    from pair_filter import _candidate_index
+
+# statsmodels' MacKinnon tables pull in scipy.stats (~0.5 s), so they load on first use
 
 @dataclass
 class CointResult:
@@ -14,50 +24,558 @@ class CointResult:
     r2: float
     resid_std: float
 
+def _ols(df: pd.DataFrame) -> tuple[float, float, float, np.ndarray]:
+    # A ~ alpha + beta*B from centered cross-products: (alpha, beta, r2, resid)
+    A = df["A"].to_numpy(dtype=np.float64)
+    B = df["B"].to_numpy(dtype=np.float64)
+    ma, mb = A.mean(), B.mean()
+    ac, bc = A - ma, B - mb
+    saa, sab, sbb = ac @ ac, ac @ bc, bc @ bc
+    with np.errstate(all="ignore"):
+        beta = sab / sbb
+        r2 = sab * sab / (saa * sbb)
+    return ma - beta * mb, beta, r2, ac - beta * bc
+
 def hedge_ratio_ols(df: pd.DataFrame) -> float:
     """
     Regress A on B (A ~ alpha + beta*B); return beta as hedge ratio.
     """
-    A = df["A"].values
-    B = sm.add_constant(df["B"].values)
-    res = sm.OLS(A, B).fit()
-    return float(res.params[1])
+    return float(_ols(df)[1])
 
-def engle_granger(df: pd.DataFrame) -> CointResult:
+_UNDEFINED_BETA = "hedge ratio is undefined: B is constant or not finite"
+
+def engle_granger(df: pd.DataFrame, cache: CointCache | str | None = None) -> CointResult:
     """
     2-step Engle–Granger:
     1) OLS A~B -> residuals
-    2) ADF test on residuals
+    2) ADF test on residuals (adf_test, matching statsmodels.adfuller(autolag="AIC"))
+
+    cache: CointCache or cache directory; identical A/B inputs are then
+    answered from memory or disk instead of being re-tested.
     """
-    A = df["A"]
-    B = sm.add_constant(df["B"])
-    ols = sm.OLS(A, B).fit()
-    resid = ols.resid
-    adf_stat, pval, *_ = adfuller(resid, autolag="AIC")
+    cache = as_coint_cache(cache)
+    if cache is not None:
+        key = coint_key(df["A"].to_numpy(dtype=np.float64), df["B"].to_numpy(dtype=np.float64))
+        res = cache.get(key)
+        if res is None:
+            res = engle_granger(df)
+            cache.put(key, res)
+        return res
+
+    _, beta, r2, resid = _ols(df)
+    if not np.isfinite(beta):
+        raise ValueError(_UNDEFINED_BETA)
+    adf_stat, pval, _, _ = adf_test(resid)
     return CointResult(
-        beta=float(ols.params[1]),
+        beta=float(beta),
         pval=float(pval),
         adf_stat=float(adf_stat),
-        r2=float(ols.rsquared),
+        r2=float(r2),
         resid_std=float(resid.std(ddof=1)),
     )
 
-def scan_pairs_for_coint(prices_wide: pd.DataFrame) -> pd.DataFrame:
+def _adf_maxlag(nobs: int) -> int:
+    # Schwert (1989) rule, capped as in statsmodels.adfuller with a constant
+    maxlag = int(np.ceil(12.0 * np.power(nobs / 100.0, 1 / 4.0)))
+    return min(nobs // 2 - 2, maxlag)
+
+def _mackinnonp(stat: np.ndarray) -> np.ndarray:
+    """
+    Vectorized statsmodels mackinnonp(stat, regression="c", N=1).
+    """
+    from scipy.special import ndtr
+    from statsmodels.tsa import adfvalues
+
+    stat = np.asarray(stat, dtype=float)
+    small = np.polyval(adfvalues._tau_smallps["c"][0][::-1], stat)
+    large = np.polyval(adfvalues._tau_largeps["c"][0][::-1], stat)
+    pval = ndtr(np.where(stat <= adfvalues._tau_stars["c"][0], small, large))
+    pval = np.where(stat > adfvalues._tau_maxs["c"][0], 1.0, pval)
+    return np.where(stat < adfvalues._tau_mins["c"][0], 0.0, pval)
+
+def adf_test(x, maxlag: Optional[int] = None) -> tuple[float, float, int, int]:
+    """
+    Augmented Dickey–Fuller test with a constant and the lag order chosen by
+    AIC; same statistic as statsmodels.adfuller(x, maxlag, autolag="AIC").
+    Returns (adf_stat, pval, usedlag, nobs).
+
+    One QR of the design with all maxlag lagged differences scores every
+    lag order: the first k columns of Q span the k-column model, so its SSR
+    is the full-model SSR plus the squared tail of Q'y. Only the chosen
+    order is refit on its own (longer) sample.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if not np.isfinite(x).all():
+        raise ValueError("x contains NaN or inf")
+    n = len(x)
+    if maxlag is None:
+        maxlag = _adf_maxlag(n)
+        if maxlag < 0:
+            raise ValueError("sample size is too short to use selected regression component")
+    elif maxlag > n // 2 - 2:
+        raise ValueError("maxlag must be less than (nobs/2 - 1 - ntrend) where n trend is the number "
+                         "of included deterministic regressors")
+
+    X, y = _adf_design(x[None], maxlag, maxlag)
+    X, y = X[0].T, y[0]
+    m = len(y)
+    Q, R = np.linalg.qr(X)
+    qy = Q.T @ y
+    e = y - Q @ qy
+    # ssr[j] = SSR with the first j + 2 columns ([const, level] + j lags)
+    tail = np.cumsum((qy * qy)[::-1])[::-1]
+    ssr = e @ e + np.append(tail[2:], 0.0)
+    k = np.arange(2, maxlag + 3)
+    with np.errstate(divide="ignore"):
+        aic = m * (np.log(2 * np.pi) + np.log(ssr / m) + 1.0) + 2.0 * k
+    lag = int(np.argmin(np.where(np.isnan(aic), np.inf, aic)))
+
+    if lag != maxlag:
+        X, y = _adf_design(x[None], lag, lag)
+        X, y = X[0].T, y[0]
+        m = len(y)
+        Q, R = np.linalg.qr(X)
+        qy = Q.T @ y
+        e = y - Q @ qy
+    k = lag + 2
+    b = np.linalg.solve(R, qy)
+    Rinv = np.linalg.solve(R, np.eye(k))
+    sigma2 = (e @ e) / (m - k)
+    stat = b[1] / np.sqrt(sigma2 * (Rinv[1] @ Rinv[1]))
+    return float(stat), float(_mackinnonp(stat)), lag, m
+
+def _pinv_batch(G: np.ndarray) -> np.ndarray:
+    # stacked inverse; degenerate (e.g. constant) series fall back to pinv
+    try:
+        return np.linalg.inv(G)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(G)
+
+def _adf_design(xt: np.ndarray, lag: int, maxlag: int):
+    """
+    Batched ADF regressors for residual rows xt (p, n) with `lag` lagged
+    differences, trimmed as if `maxlag` lags were present.
+    Returns (X, y) with X shaped (p, lag + 2, m): [const, level, dlag1..dlagL].
+    """
+    p, n = xt.shape
+    dx = np.diff(xt, axis=1)
+    m = n - 1 - maxlag
+    X = np.empty((p, lag + 2, m))
+    X[:, 0] = 1.0
+    X[:, 1] = xt[:, maxlag:n - 1]
+    for j in range(1, lag + 1):
+        X[:, j + 1] = dx[:, maxlag - j:n - 1 - j]
+    return X, dx[:, maxlag:]
+
+def _adf_batch(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ADF (constant, autolag="AIC") on every column of x (n, p) at once.
+    Mirrors statsmodels.adfuller: lag order picked by AIC on a common sample,
+    then the chosen model is refit on its own (longer) sample.
+    Returns (adf_stat, pval) arrays of length p.
+    """
+    n, p = x.shape
+    maxlag = _adf_maxlag(n)
+    if maxlag < 0:
+        raise ValueError("sample size is too short to use selected regression component")
+    xt = np.ascontiguousarray(x.T)
+
+    # lag selection: all candidate models share one Gram matrix, and its
+    # Cholesky factor L scores every lag at once (the leading k x k block of
+    # L factors the k-column model, so SSR_k = y'y - |L_k^-1 X_k'y|^2)
+    X, y = _adf_design(xt, maxlag, maxlag)
+    m = X.shape[2]
+    G = np.matmul(X, X.transpose(0, 2, 1))
+    Xy = np.matmul(X, y[:, :, None])[..., 0]
+    yy = np.einsum("pm,pm->p", y, y)
+    k = np.arange(2, maxlag + 3)
+    with np.errstate(all="ignore"):
+        try:
+            w = np.linalg.solve(np.linalg.cholesky(G), Xy[..., None])[..., 0]
+            ssr = yy[:, None] - np.cumsum(w * w, axis=1)[:, 1:]
+        except np.linalg.LinAlgError:  # degenerate (e.g. constant) series: per-lag pseudo-inverse
+            ssr = np.empty((p, maxlag + 1))
+            for lag in range(maxlag + 1):
+                b = np.einsum("pij,pj->pi", _pinv_batch(G[:, :lag + 2, :lag + 2]), Xy[:, :lag + 2])
+                ssr[:, lag] = yy - np.einsum("pk,pk->p", b, Xy[:, :lag + 2])
+        llf = -m / 2.0 * (np.log(2 * np.pi) + np.log(ssr / m) + 1.0)
+    aic = np.where(np.isfinite(llf), -2.0 * llf + 2.0 * k, np.inf)
+    bestlag = aic.argmin(axis=1)
+
+    # refit each pair with its chosen lag on the full available sample
+    stat = np.full(p, np.nan)
+    for lag in np.unique(bestlag):
+        cols = np.flatnonzero(bestlag == lag)
+        X, y = _adf_design(xt[cols], lag, lag)
+        k, m = X.shape[1], X.shape[2]
+        G = np.matmul(X, X.transpose(0, 2, 1))
+        Xy = np.matmul(X, y[:, :, None])[..., 0]
+        with np.errstate(all="ignore"):
+            Ginv = _pinv_batch(G)
+            b = np.einsum("pij,pj->pi", Ginv, Xy)
+            resid = y - np.matmul(b[:, None, :], X)[:, 0]
+            sigma2 = np.einsum("pm,pm->p", resid, resid) / (m - k)
+            stat[cols] = b[:, 1] / np.sqrt(sigma2 * Ginv[:, 1, 1])
+
+    return stat, _mackinnonp(stat)
+
+def _eg_batch(values: np.ndarray, pairs: np.ndarray, min_obs: int = 50,
+              block_bytes: int = 64 * 2**20) -> tuple[dict, list]:
+    """
+    Engle–Granger for many (A, B) column pairs of a (T, N) price matrix.
+    Pairs sharing the same jointly-observed rows are processed together: betas
+    come from one cross-product matrix, ADF regressions run on residual blocks.
+    Returns dict of arrays (idx into `pairs`, beta, pval, adf_stat, r2, resid_std)
+    and, like _eg_loop, (idx, error) for pairs whose beta or ADF statistic is
+    not finite (e.g. a constant leg).
+    """
+    valid = ~np.isnan(values)
+    col_masks, col_id = np.unique(valid.T, axis=0, return_inverse=True)
+    col_id = np.asarray(col_id).ravel()
+
+    # group pairs by the rows both legs observe (one group for a clean panel)
+    code = col_id[pairs[:, 0]] * len(col_masks) + col_id[pairs[:, 1]]
+    order = np.argsort(code, kind="stable")
+    groups: dict = {}
+    for sel in np.split(order, np.flatnonzero(np.diff(code[order])) + 1):
+        mask = col_masks[col_id[pairs[sel[0], 0]]] & col_masks[col_id[pairs[sel[0], 1]]]
+        groups.setdefault(mask.tobytes(), (mask, []))[1].append(sel)
+
+    out = {k: [] for k in ("idx", "beta", "pval", "adf_stat", "r2", "resid_std")}
+    failed = []
+    for mask, sels in groups.values():
+        n = int(mask.sum())
+        if n < min_obs:
+            continue
+        sel = np.sort(np.concatenate(sels))
+        cols, local = np.unique(pairs[sel], return_inverse=True)
+        local = local.reshape(-1, 2)
+        X = values[mask][:, cols]
+        Xc = X - X.mean(axis=0)
+        C = Xc.T @ Xc  # shared cross-products for every pair in the group
+        a, b = local[:, 0], local[:, 1]
+        with np.errstate(all="ignore"):
+            beta = C[a, b] / C[b, b]
+            r2 = C[a, b] ** 2 / (C[a, a] * C[b, b])
+        ok = np.isfinite(beta)
+        failed.extend((int(k), repr(ValueError(_UNDEFINED_BETA))) for k in sel[~ok])
+        sel, a, b, beta, r2 = sel[ok], a[ok], b[ok], beta[ok], r2[ok]
+
+        step = max(1, block_bytes // (8 * n * (_adf_maxlag(n) + 3)))
+        for lo in range(0, len(sel), step):
+            blk = slice(lo, lo + step)
+            resid = Xc[:, a[blk]] - beta[blk] * Xc[:, b[blk]]
+            stat, pval = _adf_batch(resid)
+            ok = np.isfinite(stat)
+            failed.extend((int(k), repr(ValueError("ADF statistic is undefined: residuals are degenerate")))
+                          for k in sel[blk][~ok])
+            out["idx"].append(sel[blk][ok])
+            out["beta"].append(beta[blk][ok])
+            out["r2"].append(r2[blk][ok])
+            out["resid_std"].append(resid.std(axis=0, ddof=1)[ok])
+            out["adf_stat"].append(stat[ok])
+            out["pval"].append(pval[ok])
+    return {k: np.concatenate(v) if v else np.empty(0) for k, v in out.items()}, sorted(failed)
+
+def _eg_loop(values: np.ndarray, pairs: np.ndarray, min_obs: int = 50) -> tuple[dict, list]:
+    """
+    Pair-by-pair engle_granger over a (T, N) price matrix; failures are collected.
+    """
+    out = {k: [] for k in ("idx", "beta", "pval", "adf_stat", "r2", "resid_std")}
+    failed = []
+    for k, (i, j) in enumerate(pairs):
+        df = pd.DataFrame({"A": values[:, i], "B": values[:, j]}).dropna()
+        if len(df) < min_obs:
+            continue
+        try:
+            res = engle_granger(df)
+        except Exception as e:
+            failed.append((k, repr(e)))
+            continue
+        out["idx"].append(k)
+        for name in ("beta", "pval", "adf_stat", "r2", "resid_std"):
+            out[name].append(getattr(res, name))
+    return {k: np.asarray(v, dtype=int if k == "idx" else float) for k, v in out.items()}, failed
+
+def _scan_slice(values: np.ndarray, pairs: np.ndarray, method: str) -> tuple[dict, list]:
+    # one slice of pairs; a batch that raises is rerun pair by pair to isolate the culprits
+    if method == "batch":
+        try:
+            return _eg_batch(values, pairs)
+        except Exception:
+            pass
+    return _eg_loop(values, pairs)
+
+def _scan_chunk(shm_name: str, shape: tuple, pairs: np.ndarray, method: str) -> tuple[dict, list]:
+    """
+    Worker: attach to the shared price matrix and scan one slice of pairs.
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        return _scan_slice(values, pairs, method)
+    finally:
+        values = None
+        shm.close()
+
+def _concat_parts(parts: list) -> dict:
+    keys = ("idx", "beta", "pval", "adf_stat", "r2", "resid_std")
+    return {k: np.concatenate([p[k] for p in parts]) if parts else np.empty(0) for k in keys}
+
+def _scan_serial(values: np.ndarray, pairs: np.ndarray, method: str, chunk_size: Optional[int],
+                 progress: Optional[Callable[[int, int], None]]) -> tuple[dict, list]:
+    # _scan_parallel's chunks and failure handling, in this process
+    total = len(pairs)
+    if chunk_size is None:
+        chunk_size = max(1, -(-total // 4))
+    parts, failed = [], []
+    for lo in range(0, total, chunk_size):
+        res, bad = _scan_slice(values, pairs[lo:lo + chunk_size], method)
+        res["idx"] = res["idx"].astype(int) + lo
+        parts.append(res)
+        failed.extend((k + lo, err) for k, err in bad)
+        if progress is not None:
+            progress(min(lo + chunk_size, total), total)
+    return _concat_parts(parts), failed
+
+def _scan_parallel(values: np.ndarray, pairs: np.ndarray, method: str, n_jobs: int,
+                   chunk_size: Optional[int], progress: Optional[Callable[[int, int], None]]) -> tuple[dict, list]:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from multiprocessing import shared_memory
+
+    total = len(pairs)
+    if chunk_size is None:
+        chunk_size = max(1, -(-total // (4 * n_jobs)))
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    parts, failed, done = [], [], 0
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            futs = {
+                ex.submit(_scan_chunk, shm.name, values.shape, pairs[lo:lo + chunk_size], method): lo
+                for lo in range(0, total, chunk_size)
+            }
+            for fut in as_completed(futs):
+                lo = futs[fut]
+                n = len(pairs[lo:lo + chunk_size])
+                try:
+                    res, bad = fut.result()
+                    res["idx"] = res["idx"].astype(int) + lo
+                    parts.append(res)
+                    failed.extend((k + lo, err) for k, err in bad)
+                except Exception as e:  # worker died: report the whole chunk
+                    failed.extend((k, repr(e)) for k in range(lo, lo + n))
+                done += n
+                if progress is not None:
+                    progress(done, total)
+    finally:
+        shm.close()
+        shm.unlink()
+    return _concat_parts(parts), failed
+
+def _scan_keys(values: np.ndarray, pairs: np.ndarray, engine: str) -> list:
+    """
+    coint_key of every pair over the rows both legs observe, hashing each
+    column once per distinct row mask rather than once per pair.
+    """
+    valid = ~np.isnan(values)
+    full = valid.all(axis=0)
+    digests: dict = {}
+
+    def col(c: int, mask) -> bytes:
+        k = (c, None if mask is None else mask.tobytes())
+        if k not in digests:
+            digests[k] = _digest(values[:, c] if mask is None else values[mask, c])
+        return digests[k]
+
+    keys = []
+    for i, j in pairs:
+        mask = None if full[i] and full[j] else valid[:, i] & valid[:, j]
+        keys.append(_pair_key(col(i, mask), col(j, mask), engine, {}))
+    return keys
+
+def scan_pairs_for_coint(
+    prices_wide: pd.DataFrame,
+    method: str = "loop",
+    n_jobs: int = 1,
+    chunk_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cache: CointCache | str | None = None,
+    prefilter: Optional[dict] = None,
+) -> pd.DataFrame:
     """
     Given a wide DataFrame of prices with ticker columns, compute EG p-values
     for every pair (i,j). Returns sorted DataFrame (best=lowest p-value).
+
+    method="loop" runs engle_granger pair by pair; method="batch" uses the
+    vectorized engine (same statistics within numerical tolerance).
+    Pairs are scanned in chunks of chunk_size (default: a quarter of the
+    pairs per worker); n_jobs > 1 (or <= 0 for all cores) spreads them over a
+    process pool that reads the price matrix from shared memory. With any
+    n_jobs, progress(done, total) is called as chunks finish, and pairs that
+    raise or are degenerate are listed in result.attrs["failed"] instead of
+    aborting the scan (a batch chunk that raises is rerun pair by pair).
+    With a cache (CointCache or directory) only pairs whose prices were not
+    tested before are computed; the others come from the cache, which is
+    shared with engle_granger(df, cache=...) for method="loop".
+    prefilter: keyword arguments of pair_filter.candidate_pairs (e.g.
+    {"min_corr": 0.6, "top_k": 10, "clusters": "hierarchical"}); only the
+    surviving pairs are tested and result.attrs["prefilter"] records how
+    many were pruned.
     """
+    if method not in ("loop", "batch"):
+        raise ValueError(f"Unknown scan method: {method}")
     cols = list(prices_wide.columns)
-    out = []
-    for i in range(len(cols)):
-        for j in range(i + 1, len(cols)):
-            Aname, Bname = cols[i], cols[j]
-            df = prices_wide[[Aname, Bname]].dropna().rename(columns={Aname: "A", Bname: "B"})
-            if len(df) < 50:
-                continue
-            res = engle_granger(df)
-            out.append({
-                "A": Aname, "B": Bname,
-                "pval": res.pval, "beta": res.beta, "r2": res.r2, "adf_stat": res.adf_stat
-            })
-    return pd.DataFrame(out).sort_values("pval", ascending=True).reset_index(drop=True)
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+
+    values = np.ascontiguousarray(prices_wide.to_numpy(dtype=np.float64))
+    if prefilter is not None:
+        pairs, _, pruned = _candidate_index(values, cols, **prefilter)
+    else:
+        pairs = np.column_stack(np.triu_indices(len(cols), k=1))
+    cache = as_coint_cache(cache)
+    todo, hits = np.arange(len(pairs)), {}
+    if cache is not None:
+        keys = _scan_keys(values, pairs, method)
+        hits = cache.get_many(keys)
+        todo = np.array([k for k, key in enumerate(keys) if key not in hits], dtype=int)
+
+    if n_jobs == 1 or len(todo) == 0:
+        res, failed = _scan_serial(values, pairs[todo], method, chunk_size, progress)
+    else:
+        res, failed = _scan_parallel(values, pairs[todo], method, n_jobs, chunk_size, progress)
+    res["idx"] = todo[res["idx"].astype(int)]
+    failed = [(int(todo[k]), err) for k, err in failed]
+
+    if cache is not None:
+        fields = ("beta", "pval", "adf_stat", "r2", "resid_std")
+        cache.put_many((keys[k], CointResult(*(float(res[f][n]) for f in fields)))
+                       for n, k in enumerate(res["idx"].astype(int)))
+        if hits:
+            got = [k for k, key in enumerate(keys) if key in hits]
+            res = {"idx": np.concatenate([res["idx"].astype(int), got]),
+                   **{f: np.concatenate([res[f], [getattr(hits[keys[k]], f) for k in got]]) for f in fields}}
+
+    order = np.argsort(res["idx"], kind="stable")
+    idx = res["idx"][order].astype(int)
+    names = np.asarray(cols, dtype=object)
+    out = pd.DataFrame({
+        "A": names[pairs[idx, 0]], "B": names[pairs[idx, 1]],
+        "pval": res["pval"][order], "beta": res["beta"][order],
+        "r2": res["r2"][order], "adf_stat": res["adf_stat"][order],
+    })
+    out = out.sort_values("pval", ascending=True).reset_index(drop=True)
+    out.attrs["failed"] = [
+        {"A": cols[pairs[k, 0]], "B": cols[pairs[k, 1]], "error": err} for k, err in sorted(failed)
+    ]
+    if prefilter is not None:
+        out.attrs["prefilter"] = pruned
+    if failed:
+        warnings.warn(
+            f"{len(failed)} of {len(pairs)} pairs failed during scan; see result.attrs['failed']",
+            stacklevel=2,
+        )
+    return out
+
+def _rolling_chunk(a: np.ndarray, b: np.ndarray, starts: np.ndarray, window: int,
+                   alpha: np.ndarray, beta: np.ndarray, block_bytes: int = 64 * 2**20) -> dict:
+    """
+    ADF on the residuals of the windows a[s:s + window] for each s in starts,
+    given each window's (alpha, beta). Returns dict of adf_stat, pval, resid_std.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    Aw, Bw = sliding_window_view(a, window), sliding_window_view(b, window)
+    out = {k: np.empty(len(starts)) for k in ("adf_stat", "pval", "resid_std")}
+    step = max(1, block_bytes // (8 * window * (_adf_maxlag(window) + 3)))
+    for lo in range(0, len(starts), step):
+        blk = slice(lo, lo + step)
+        s = starts[blk]
+        resid = (Aw[s] - alpha[blk, None] - beta[blk, None] * Bw[s]).T
+        out["adf_stat"][blk], out["pval"][blk] = _adf_batch(resid)
+        out["resid_std"][blk] = resid.std(axis=0, ddof=1)
+    return out
+
+def rolling_coint(
+    df: pd.DataFrame,
+    window: int = 252,
+    step: int = 21,
+    n_jobs: int = 1,
+    chunk_size: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Walk-forward Engle–Granger: re-test the pair on every trailing `window`
+    observations, advancing `step` bars at a time.
+
+    Window OLS fits come from running cross-products of A and B (each window
+    is a difference of prefix sums, no refit); ADF regressions on the window
+    residuals run batched, split across n_jobs processes (<= 0 for all cores).
+    Rows with a missing leg are dropped first, so windows count observations.
+    Returns one row per window, indexed by its last date (using data up to and
+    including it): start, beta, pval, adf_stat, r2, resid_std.
+    """
+    df = df[["A", "B"]].dropna()
+    window, step = int(window), int(step)
+    n = len(df)
+    ends = np.arange(window - 1, n, step)
+    cols = ["start", "beta", "pval", "adf_stat", "r2", "resid_std"]
+    if len(ends) == 0:
+        return pd.DataFrame(columns=cols, index=df.index[:0])
+    starts = ends - window + 1
+
+    # shift by the first bar so the prefix sums stay small
+    a = df["A"].to_numpy(dtype=np.float64)
+    b = df["B"].to_numpy(dtype=np.float64)
+    a, b = a - a[0], b - b[0]
+
+    def wsum(x: np.ndarray) -> np.ndarray:
+        c = np.concatenate(([0.0], np.cumsum(x)))
+        return c[ends + 1] - c[starts]
+
+    sa, sb = wsum(a), wsum(b)
+    caa = wsum(a * a) - sa * sa / window
+    cbb = wsum(b * b) - sb * sb / window
+    cab = wsum(a * b) - sa * sb / window
+    with np.errstate(all="ignore"):
+        beta = cab / cbb
+        r2 = cab * cab / (caa * cbb)
+    alpha = (sa - beta * sb) / window
+
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs == 1:
+        res = _rolling_chunk(a, b, starts, window, alpha, beta)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(ends) // (4 * n_jobs)))
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            futs = []
+            for lo in range(0, len(ends), chunk_size):
+                blk = slice(lo, lo + chunk_size)
+                first, last = starts[blk][0], ends[blk][-1] + 1
+                futs.append(ex.submit(_rolling_chunk, a[first:last], b[first:last],
+                                      starts[blk] - first, window, alpha[blk], beta[blk]))
+            parts = [f.result() for f in futs]
+        res = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    out = pd.DataFrame({
+        "start": df.index[starts], "beta": beta, "pval": res["pval"],
+        "adf_stat": res["adf_stat"], "r2": r2, "resid_std": res["resid_std"],
+    }, index=df.index[ends])
+    out.attrs["window"], out.attrs["step"] = window, step
+    return out
+
+def coint_gate(rolling: pd.DataFrame, index: pd.Index, pval: float = 0.05) -> pd.Series:
+    """
+    Boolean trading gate from rolling_coint output: True from each window end
+    whose p-value is below `pval` until the next re-test, False before the
+    first window. Pass as generate_signals(..., gate=...).
+    """
+    ok = (rolling["pval"] < pval).astype(float)
+    gate = ok.reindex(ok.index.union(index)).ffill().reindex(index)
+    return gate.fillna(0.0).astype(bool).rename("gate")
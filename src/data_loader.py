@@ -1,46 +1,156 @@
 from __future__ import annotations
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Union
+import numpy as np
 import pandas as pd
 
+try:
+    from .price_cache import PriceCache, Downloader
+except ImportError:
+    from price_cache import PriceCache, Downloader
+
 def _load_csv_series(path: str | Path, price_col: str = "Adj Close") -> pd.Series:
-    df = pd.read_csv(path, parse_dates=["Date"]).set_index("Date").sort_index()
-    if price_col not in df.columns:
-        raise ValueError(f"CSV {path} missing column '{price_col}'. Columns: {list(df.columns)}")
-    return df[price_col]
+    try:
+        df = pd.read_csv(path, usecols=["Date", price_col], parse_dates=["Date"])
+    except ValueError:
+        df = pd.read_csv(path, parse_dates=["Date"])
+        if price_col not in df.columns:
+            raise ValueError(f"CSV {path} missing column '{price_col}'. Columns: {list(df.columns)}")
+    return df.set_index("Date").sort_index()[price_col]
+
+def _download_yf(tickers: List[str], start, end, price_col: str = "Adj Close") -> pd.DataFrame:
+    import yfinance as yf
+
+    px_all = yf.download(list(tickers), start=start, end=end)  # auto_adjust=True
+    if isinstance(px_all.columns, pd.MultiIndex):
+        lvl0 = px_all.columns.get_level_values(0)
+        panel = price_col if price_col in lvl0 else "Close"
+        px = px_all[panel]
+    else:
+        panel = price_col if price_col in px_all.columns else "Close"
+        px = px_all[panel]
+    if isinstance(px, pd.Series):
+        px = px.to_frame(tickers[0])
+    return px
 
-def get_prices(data: Dict) -> pd.DataFrame:
+def get_prices(
+    data: Optional[Dict] = None,
+    cache: Union[PriceCache, str, Path, None] = None,
+    downloader: Optional[Downloader] = None,
+    **kwargs,
+) -> pd.DataFrame:
     """
-    Accepts CONFIG['data'] dict and returns 2-col DataFrame with columns ['A','B'].
+    Accepts CONFIG['data'] dict (or the same keys as keyword arguments) and
+    returns 2-col DataFrame with columns ['A','B'].
     Provide either tickers or csv paths (not both).
-    """
-    import yfinance as yf
 
+    cache: PriceCache or cache directory (also read from data['cache_dir']);
+    cached ranges are served from disk and only missing ranges are fetched.
+    downloader: stand-in for yf.download, called as (tickers, start, end, price_col).
+    dtype (data['dtype'], default float64): dtype of the returned prices;
+    float32 halves the memory of everything computed from them.
+    """
+    data = {**(data or {}), **kwargs}
     t1, t2 = data.get("ticker1"), data.get("ticker2")
     c1, c2 = data.get("csv1"), data.get("csv2")
     start, end = data.get("start"), data.get("end")
     price_col = data.get("price_col", "Adj Close")
     freq = data.get("freq", "B")
+    dtype = np.dtype(data.get("dtype") or np.float64)
 
     use_tickers = bool(t1) and bool(t2)
     use_csvs    = bool(c1) and bool(c2)
     if use_tickers == use_csvs:   # both True or both False -> invalid
         raise ValueError("Provide either both tickers or both csv paths (not both).")
 
+    if cache is None:
+        cache = data.get("cache_dir")
+    if cache is not None and not isinstance(cache, PriceCache):
+        cache = PriceCache(cache, max_bytes=data.get("cache_max_bytes"))
+
     if use_tickers:
-        px_all = yf.download([t1, t2], start=start, end=end)  # auto_adjust=True
-        if isinstance(px_all.columns, pd.MultiIndex):
-            lvl0 = px_all.columns.get_level_values(0)
-            panel = "Adj Close" if "Adj Close" in lvl0 else "Close"
-            px = px_all[panel]
+        fetch = downloader if downloader is not None else _download_yf
+        if cache is not None:
+            source = data.get("source") or "yfinance"
+            px = cache.get_downloaded([t1, t2], start, end, fetch, source=source, price_col=price_col)
         else:
-            panel = "Adj Close" if "Adj Close" in px_all.columns else "Close"
-            px = px_all[panel]
+            px = fetch([t1, t2], start, end, price_col)
         df = px.rename(columns={t1: "A", t2: "B"})
     else:
-        s1 = _load_csv_series(c1, price_col=price_col).rename("A")
-        s2 = _load_csv_series(c2, price_col=price_col).rename("B")
+        load = cache.get_csv if cache is not None else _load_csv_series
+        s1 = load(c1, price_col=price_col).rename("A")
+        s2 = load(c2, price_col=price_col).rename("B")
         df = pd.concat([s1, s2], axis=1)
 
-    return df.sort_index().asfreq(freq).ffill().dropna()[["A","B"]]
+    df = df[["A", "B"]].astype(dtype, copy=False)
+    return df.sort_index().asfreq(freq).ffill().dropna()
+
+def get_price_panel(
+    tickers: Optional[List[str]] = None,
+    csv_dir: Union[str, Path, None] = None,
+    start=None,
+    end=None,
+    price_col: str = "Adj Close",
+    freq: str = "B",
+    dtype=np.float64,
+    max_workers: int = 8,
+    batch_size: int = 100,
+    cache: Union[PriceCache, str, Path, None] = None,
+    downloader: Optional[Downloader] = None,
+) -> pd.DataFrame:
+    """
+    Wide (dates x tickers) price frame for scan_pairs_for_coint.
+
+    With csv_dir, loads <csv_dir>/<ticker>.csv for each ticker (every *.csv if
+    tickers is None); otherwise downloads tickers in batches of batch_size.
+    Files/batches load concurrently on a thread pool, go through the optional
+    cache, and are aligned like get_prices (asfreq(freq).ffill()). Rows are
+    only dropped when every ticker is missing, so late listings keep leading
+    NaNs. Both paths cover [start, end), end exclusive. Tickers the
+    downloader returned no prices for stay as all-NaN columns, with a
+    warning naming them (also listed in attrs["missing"]). Values are cast
+    to dtype (float32 halves memory). The frame's attrs carry "nbytes" and
+    "load_seconds".
+    """
+    t0 = time.perf_counter()
+    if cache is not None and not isinstance(cache, PriceCache):
+        cache = PriceCache(cache)
+
+    missing: List[str] = []
+    if csv_dir is not None:
+        csv_dir = Path(csv_dir)
+        paths = sorted(csv_dir.glob("*.csv")) if tickers is None else [csv_dir / f"{t}.csv" for t in tickers]
+        load = cache.get_csv if cache is not None else _load_csv_series
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            series = list(ex.map(lambda p: load(p, price_col=price_col), paths))
+        cols = {p.stem: s for p, s in zip(paths, series)}
+        px = pd.DataFrame(cols)
+        # [start, end) like the download path (yfinance's end is exclusive)
+        if start is not None:
+            px = px[px.index >= pd.Timestamp(start)]
+        if end is not None:
+            px = px[px.index < pd.Timestamp(end)]
+    elif tickers:
+        fetch = downloader if downloader is not None else _download_yf
+        batches = [list(tickers[i:i + batch_size]) for i in range(0, len(tickers), batch_size)]
+        if cache is not None:
+            get = lambda b: cache.get_downloaded(b, start, end, fetch, price_col=price_col)
+        else:
+            get = lambda b: fetch(b, start, end, price_col)
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            px = pd.concat(list(ex.map(get, batches)), axis=1)
+        px = px.loc[:, ~px.columns.duplicated()].reindex(columns=list(tickers))
+        missing = list(dict.fromkeys(px.columns[px.isna().all().to_numpy()]))
+        if missing:
+            warnings.warn(f"no prices for {len(missing)} of {len(tickers)} tickers: {missing}", stacklevel=2)
+    else:
+        raise ValueError("Provide tickers and/or csv_dir.")
 
+    panel = px.sort_index().asfreq(freq).ffill().dropna(how="all").astype(dtype)
+    panel.attrs["missing"] = missing
+    panel.attrs["nbytes"] = int(panel.memory_usage(index=True).sum())
+    panel.attrs["load_seconds"] = time.perf_counter() - t0
+    return panel
@@ -0,0 +1,86 @@
+# Time-varying hedge ratios (rolling OLS, Kalman filter)
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+def rolling_hedge_ratio(df: pd.DataFrame, window: int = 60, min_periods: Optional[int] = None) -> pd.Series:
+    """
+    Rolling OLS beta of A ~ alpha + beta*B over the trailing `window` bars.
+
+    O(n) from cumulative sums of B, A, B^2 and A*B (each window is a difference
+    of two prefix sums); bars with a missing leg are skipped. Values at t use
+    data up to and including t. NaN until min_periods (default window) valid bars.
+    """
+    window = int(window)
+    min_periods = window if min_periods is None else int(min_periods)
+    a = df["A"].to_numpy(dtype=np.float64)
+    b = df["B"].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(a) | np.isnan(b))
+    if valid.any():
+        # shift by the first observation so prefix sums stay small
+        first = np.argmax(valid)
+        a = a - a[first]
+        b = b - b[first]
+    a = np.where(valid, a, 0.0)
+    b = np.where(valid, b, 0.0)
+
+    def window_sum(x: np.ndarray) -> np.ndarray:
+        c = np.concatenate(([0.0], np.cumsum(x)))
+        lo = np.maximum(np.arange(1, len(x) + 1) - window, 0)
+        return c[1:] - c[lo]
+
+    n = window_sum(valid.astype(np.float64))
+    sb, sa = window_sum(b), window_sum(a)
+    sbb, sab = window_sum(b * b), window_sum(a * b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = (n * sab - sa * sb) / (n * sbb - sb * sb)
+    beta[n < max(min_periods, 2)] = np.nan
+    return pd.Series(beta, index=df.index, name="beta")
+
+def kalman_hedge_ratio(
+    df: pd.DataFrame,
+    delta: float = 1e-4,
+    obs_var: float = 1e-3,
+    return_alpha: bool = False,
+):
+    """
+    Kalman-filter estimate of a random-walk (beta, alpha) in A = alpha + beta*B + e.
+
+    delta sets the state drift (transition covariance delta/(1-delta) * I);
+    obs_var is the observation noise variance. One O(1) update per bar,
+    filtered estimates only (no look-ahead); bars with a missing leg carry
+    the previous state. Returns the beta Series, or (beta, alpha) with return_alpha.
+    """
+    a = df["A"].to_numpy(dtype=np.float64).tolist()
+    b = df["B"].to_numpy(dtype=np.float64).tolist()
+    q = delta / (1.0 - delta)
+    # state mean and covariance [[p00, p01], [p01, p11]] for (beta, alpha)
+    th0 = th1 = 0.0
+    p00 = p11 = 1.0
+    p01 = 0.0
+    betas = [np.nan] * len(a)
+    alphas = [np.nan] * len(a)
+    seen = False
+    for t, (y, x) in enumerate(zip(a, b)):
+        p00 += q
+        p11 += q
+        if y == y and x == x:
+            # innovation with observation vector h = [x, 1]
+            e = y - (th0 * x + th1)
+            ph0 = p00 * x + p01
+            ph1 = p01 * x + p11
+            s = x * ph0 + ph1 + obs_var
+            k0, k1 = ph0 / s, ph1 / s
+            th0 += k0 * e
+            th1 += k1 * e
+            p00 -= k0 * ph0
+            p01 -= k0 * ph1
+            p11 -= k1 * ph1
+            seen = True
+        if seen:
+            betas[t], alphas[t] = th0, th1
+    beta = pd.Series(betas, index=df.index, name="beta")
+    if return_alpha:
+        return beta, pd.Series(alphas, index=df.index, name="alpha")
+    return beta
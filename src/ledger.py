@@ -0,0 +1,125 @@
+# Compact per-trade ledger of a pairs backtest
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+_COLUMNS = ("side", "entry", "exit", "bars", "pnl", "costs", "borrow", "mae", "mfe")
+
+def round_trips(out: Dict[str, np.ndarray], pa: np.ndarray, pb: np.ndarray, cost_rate: float,
+                index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """
+    One row per round trip from single-column _simulate_arrays output.
+
+    A trade runs from the bar its position is first held (entry) to the bar
+    it is closed or flipped (exit; NaN while still open). It is charged its
+    entry cost, the mark-to-market PnL, borrow and rebalancing costs of the
+    bars it is held, and its exit cost; on a flip the bar's cost is split
+    between the closing and the opening trade. So the trade PnLs add up to
+    the backtest's total PnL. mae/mfe are the lowest/highest running PnL of
+    the trade. Computed over the signal change points without a Python loop.
+    """
+    A, B = out["A_shares"][:, 0], out["B_shares"][:, 0]
+    n = len(A)
+    side = np.sign(A)
+    change = np.flatnonzero(np.diff(side, prepend=0.0) != 0)
+    starts = change[side[change] != 0]
+    if len(starts) == 0:
+        return pd.DataFrame({c: pd.Series(dtype=float) for c in _COLUMNS}).rename_axis("trade")
+    nxt = np.searchsorted(change, starts, side="right")
+    closed = nxt < len(change)
+    ends = np.where(closed, change[np.minimum(nxt, len(change) - 1)], n - 1)
+
+    costs, borrow = out["costs"][:, 0], out["borrow"][:, 0]
+    pnl_pos = out["pnl"][:, 0] + costs + borrow
+    entry_cost = np.zeros(n)
+    # in float64 like the backtester's costs, whatever the share/price dtype
+    entry_cost[starts] = (np.multiply(np.abs(A[starts]), pa[starts], dtype=np.float64)
+                          + np.multiply(np.abs(B[starts]), pb[starts], dtype=np.float64)) * cost_rate
+    # a position already held on bar 0 (signal_delay=0) was never traded, so never charged
+    entry_cost[0] = min(entry_cost[0], costs[0])
+    exit_cost = costs - entry_cost  # at exit bars: the closing share of the bar's cost
+
+    # every trade's bars start..end laid end to end
+    lens = ends - starts + 1
+    offsets = np.concatenate([[0], np.cumsum(lens)[:-1]])
+    bar = np.arange(lens.sum()) - np.repeat(offsets - starts, lens)
+    first = np.zeros(len(bar), dtype=bool)
+    first[offsets] = True
+    last = np.zeros(len(bar), dtype=bool)
+    last[(offsets + lens - 1)[closed]] = True
+    held = ~first
+
+    c = np.where(first, entry_cost[bar], np.where(last, exit_cost[bar], costs[bar]))
+    b = np.where(held, borrow[bar], 0.0)
+    pnl = np.where(held, pnl_pos[bar], 0.0) - b - c
+
+    run = np.cumsum(pnl)
+    run -= np.repeat(run[offsets] - pnl[offsets], lens)  # running PnL since entry
+    labels = index if index is not None else pd.RangeIndex(n)
+    return pd.DataFrame({
+        "side": side[starts],
+        "entry": labels[starts],
+        "exit": pd.Series(labels[ends]).where(closed).to_numpy(),
+        "bars": ends - starts,
+        "pnl": np.add.reduceat(pnl, offsets),
+        "costs": np.add.reduceat(c, offsets),
+        "borrow": np.add.reduceat(b, offsets),
+        "mae": np.minimum.reduceat(run, offsets),
+        "mfe": np.maximum.reduceat(run, offsets),
+    }).rename_axis("trade")
+
+@dataclass
+class TradeLedger:
+    """
+    Compact result of PairsBacktester.simulate(..., compact=True): the round
+    trips (see round_trips) instead of full-length Series. series() (or
+    ledger["pnl"] etc.) rebuilds the full simulate() output on demand from
+    the inputs it keeps a reference to; a pickled ledger carries only the
+    trades.
+    """
+    trades: pd.DataFrame
+    bars: int
+    _inputs: Optional[tuple] = field(default=None, repr=False)
+    _series: Optional[dict] = field(default=None, repr=False)
+
+    def series(self) -> Dict[str, pd.Series]:
+        if self._series is None:
+            if self._inputs is None:
+                raise ValueError("This ledger no longer holds its inputs (e.g. it was unpickled); rerun simulate.")
+            bt, prices, signal, beta = self._inputs
+            self._series = bt.simulate(prices, signal, beta)
+        return self._series
+
+    def __getitem__(self, key: str) -> pd.Series:
+        return self.series()[key]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Round-trip statistics: number of trades, win rate per trade, average
+        PnL / win / loss, profit factor, average and longest hold in bars,
+        average MAE/MFE and total costs. Open trades count as they stand.
+        """
+        t = self.trades
+        pnl = t["pnl"].to_numpy(dtype=np.float64)
+        wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+        nan = float("nan")
+        return {
+            "n_trades": len(t),
+            "win_rate": float(len(wins) / len(pnl)) if len(pnl) else nan,
+            "avg_pnl": float(pnl.mean()) if len(pnl) else nan,
+            "avg_win": float(wins.mean()) if len(wins) else nan,
+            "avg_loss": float(losses.mean()) if len(losses) else nan,
+            "profit_factor": float(wins.sum() / -losses.sum()) if len(losses) else nan,
+            "avg_hold": float(t["bars"].mean()) if len(t) else nan,
+            "max_hold": int(t["bars"].max()) if len(t) else 0,
+            "avg_mae": float(t["mae"].mean()) if len(t) else nan,
+            "avg_mfe": float(t["mfe"].mean()) if len(t) else nan,
+            "total_costs": float(t["costs"].sum()),
+            "exposure": float(t["bars"].sum() / self.bars) if self.bars else nan,
+        }
+
+    def __getstate__(self):
+        # the trades only: the price inputs and materialized Series stay behind
+        return {"trades": self.trades, "bars": self.bars, "_inputs": None, "_series": None}
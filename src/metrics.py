@@ -31,3 +31,129 @@ def annual_return(pnl: pd.Series, capital: float = 1_000_000.0, periods_per_year
 def hit_rate(pnl: pd.Series) -> float:
     r = pnl.dropna()
     return float((r > 0).mean()) if len(r) else np.nan
+
+def _merge_moments(n, mean, m2, nb, mb, m2b):
+    # Chan et al. pairwise update of (count, mean, sum of squared deviations)
+    tot = n + nb
+    with np.errstate(invalid="ignore", divide="ignore"):
+        d = mb - mean
+        w = np.where(tot > 0, nb / tot, 0.0)
+        return tot, mean + d * w, m2 + m2b + d * d * n * w
+
+class MetricsAccumulator:
+    """
+    All of the metrics above in one pass with O(1) state per PnL column.
+
+    Feed PnL bar by bar (live mode) or in blocks of rows; blocks may be 2-D
+    (bars, columns) to track many strategies at once. Equity is cumulative
+    PnL, as in PairsBacktester. Accumulators over consecutive chunks combine
+    with merge() (e.g. results from worker processes, in time order).
+    result() gives the same statistics as the functions above, up to
+    floating-point rounding.
+    """
+
+    _block_bytes = 16 * 2**20  # temporaries per vectorized block in update()
+
+    def __init__(self, capital: float = 1_000_000.0, periods_per_year: int = 252):
+        self.capital = float(capital)
+        self.ppy = int(periods_per_year)
+        self._scalar = None  # set by the first update
+        self._state = None
+
+    @staticmethod
+    def _empty(k: int) -> dict:
+        z = np.zeros(k)
+        return {
+            "n": z.copy(), "mean": z.copy(), "m2": z.copy(),             # returns
+            "n_neg": z.copy(), "mean_neg": z.copy(), "m2_neg": z.copy(), # negative returns
+            "n_valid": z.copy(), "n_pos": z.copy(),                       # hit rate
+            "total": z.copy(), "peak": np.full(k, -np.inf),               # equity path
+            "trough": np.full(k, np.inf), "mdd": z.copy(),
+        }
+
+    def update(self, pnl) -> "MetricsAccumulator":
+        """
+        Add a scalar bar or a 1-D run of bars of a single series, or a
+        (bars, columns) block; a live multi-column bar is a (1, columns) block.
+        """
+        x = np.asarray(pnl, dtype=np.float64)
+        if self._scalar is None:
+            self._scalar = x.ndim < 2
+        if x.ndim < 2:
+            x = x.reshape(-1, 1)
+        if self._state is None:
+            self._state = self._empty(x.shape[1])
+        step = max(1, self._block_bytes // (64 * x.shape[1]))  # ~8 temporaries per block
+        for lo in range(0, len(x), step):
+            self._merge_state(self._chunk(x[lo:lo + step]))
+        return self
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """
+        Append another accumulator's bars (which follow this one's in time).
+        """
+        if other._state is None:
+            return self
+        if self._state is None:
+            self._scalar = other._scalar
+            self._state = self._empty(len(other._state["n"]))
+        self._merge_state(other._state)
+        return self
+
+    def _chunk(self, x: np.ndarray) -> dict:
+        p = np.nan_to_num(x, nan=0.0)
+        r = p / self.capital
+        n = np.full(x.shape[1], float(len(x)))
+        mean = r.mean(axis=0)
+        neg = r < 0
+        n_neg = neg.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_neg = np.where(n_neg > 0, np.where(neg, r, 0.0).sum(axis=0) / n_neg, 0.0)
+        eq = np.cumsum(p, axis=0)
+        return {
+            "n": n, "mean": mean, "m2": ((r - mean) ** 2).sum(axis=0),
+            "n_neg": n_neg, "mean_neg": mean_neg,
+            "m2_neg": np.where(neg, (r - mean_neg) ** 2, 0.0).sum(axis=0),
+            "n_valid": (~np.isnan(x)).sum(axis=0).astype(np.float64),
+            "n_pos": (x > 0).sum(axis=0).astype(np.float64),
+            "total": eq[-1], "peak": eq.max(axis=0), "trough": eq.min(axis=0),
+            "mdd": (eq - np.maximum.accumulate(eq, axis=0)).min(axis=0),
+        }
+
+    def _merge_state(self, b: dict) -> None:
+        a = self._state
+        # drawdown across the boundary: b's lowest equity against a's peak
+        cross = a["total"] + b["trough"] - a["peak"]
+        a["mdd"] = np.minimum(np.minimum(a["mdd"], b["mdd"]), cross)
+        a["peak"] = np.maximum(a["peak"], a["total"] + b["peak"])
+        a["trough"] = np.minimum(a["trough"], a["total"] + b["trough"])
+        a["total"] = a["total"] + b["total"]
+        a["n"], a["mean"], a["m2"] = _merge_moments(a["n"], a["mean"], a["m2"], b["n"], b["mean"], b["m2"])
+        a["n_neg"], a["mean_neg"], a["m2_neg"] = _merge_moments(
+            a["n_neg"], a["mean_neg"], a["m2_neg"], b["n_neg"], b["mean_neg"], b["m2_neg"])
+        a["n_valid"] = a["n_valid"] + b["n_valid"]
+        a["n_pos"] = a["n_pos"] + b["n_pos"]
+
+    def result(self) -> dict:
+        """
+        sharpe, sortino, annual_return, max_drawdown, hit_rate: floats for a
+        single series, (columns,) arrays for 2-D input.
+        """
+        s = self._state if self._state is not None else self._empty(1)
+        ppy = self.ppy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ann = np.where(s["n"] > 0, s["mean"] * ppy, np.nan)
+            sd = np.sqrt(s["m2"] / (s["n"] - 1)) * np.sqrt(ppy)
+            dd_sd = np.sqrt(s["m2_neg"] / (s["n_neg"] - 1)) * np.sqrt(ppy)
+            sd = np.where(s["n"] > 1, sd, np.nan)
+            dd_sd = np.where(s["n_neg"] > 1, dd_sd, np.nan)
+            out = {
+                "sharpe": np.where(sd > 0, ann / sd, np.nan),
+                "sortino": np.where(dd_sd > 0, ann / dd_sd, np.nan),
+                "annual_return": ann,
+                "max_drawdown": np.where(s["n"] > 0, s["mdd"], np.nan),
+                "hit_rate": np.where(s["n_valid"] > 0, s["n_pos"] / s["n_valid"], np.nan),
+            }
+        if self._scalar:
+            return {k: float(v[0]) for k, v in out.items()}
+        return out
@@ -0,0 +1,129 @@
+# Cheap pre-filtering of candidate pairs before cointegration tests
+from __future__ import annotations
+import time
+import warnings
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+
+def return_corr(values: np.ndarray, returns: str = "log") -> np.ndarray:
+    """
+    (N, N) correlation of the per-bar returns of a (T, N) price matrix.
+    A clean panel needs one matrix product; with missing bars each pair's
+    correlation uses the bars both tickers observe (standardized returns
+    are zero-filled and the products rescaled by a second product counting
+    the shared bars).
+    """
+    if returns == "log":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = np.diff(np.log(values), axis=0)
+    elif returns == "diff":
+        r = np.diff(values, axis=0)
+    else:
+        raise ValueError(f"Unknown returns: {returns!r} (expected log or diff)")
+    r[~np.isfinite(r)] = np.nan
+    valid = ~np.isnan(r)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        z = (r - np.nanmean(r, axis=0)) / np.nanstd(r, axis=0)
+    if valid.all():
+        C = (z.T @ z) / len(z)
+    else:
+        z = np.where(valid, z, 0.0)
+        v = valid.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            C = (z.T @ z) / (v.T @ v)
+    np.fill_diagonal(C, 1.0)
+    return np.clip(np.nan_to_num(C, nan=0.0), -1.0, 1.0)
+
+def _cluster_labels(C: np.ndarray, cols: list, clusters, n_clusters: Optional[int],
+                    cluster_dist: float) -> Optional[np.ndarray]:
+    if clusters is None:
+        return None
+    if isinstance(clusters, dict):
+        # sector map; unmapped tickers get a group of their own (no partners)
+        labels = {}
+        return np.array([labels.setdefault(clusters.get(c, ("unmapped", c)), len(labels)) for c in cols])
+    if clusters == "hierarchical":
+        from scipy.cluster.hierarchy import fcluster, linkage
+        from scipy.spatial.distance import squareform
+
+        if len(cols) < 2:
+            return np.zeros(len(cols), dtype=int)
+        D = 1.0 - C
+        np.fill_diagonal(D, 0.0)
+        Z = linkage(squareform(np.maximum(D, 0.0), checks=False), method="average")
+        if n_clusters is not None:
+            return fcluster(Z, n_clusters, criterion="maxclust")
+        return fcluster(Z, cluster_dist, criterion="distance")
+    raise ValueError(f"Unknown clusters: {clusters!r} (expected None, 'hierarchical' or a ticker->sector dict)")
+
+def _candidate_index(
+    values: np.ndarray,
+    cols: list,
+    min_corr: float = 0.5,
+    top_k: Optional[int] = None,
+    clusters: Union[str, Dict[str, str], None] = None,
+    n_clusters: Optional[int] = None,
+    cluster_dist: float = 0.7,
+    returns: str = "log",
+) -> tuple[np.ndarray, np.ndarray, dict]:
+    """
+    (pairs (M, 2) with i < j, their correlations, stats) surviving the filter.
+    """
+    t0 = time.perf_counter()
+    n = values.shape[1]
+    C = return_corr(values, returns)
+    keep = C >= min_corr
+    labels = _cluster_labels(C, cols, clusters, n_clusters, cluster_dist)
+    if labels is not None:
+        keep &= labels[:, None] == labels[None, :]
+    np.fill_diagonal(keep, False)
+    if top_k is not None and top_k < n - 1:
+        # each ticker nominates its top_k most correlated partners; a pair
+        # survives if either side nominates it
+        score = np.where(keep, C, -np.inf)
+        nominated = np.zeros_like(keep)
+        best = np.argpartition(-score, top_k - 1, axis=1)[:, :top_k] if top_k > 0 else np.empty((n, 0), int)
+        nominated[np.repeat(np.arange(n), best.shape[1]), best.ravel()] = True
+        keep &= nominated | nominated.T
+    i, j = np.nonzero(np.triu(keep, k=1))
+    pairs = np.column_stack([i, j])
+    total = n * (n - 1) // 2
+    stats = {
+        "pairs_total": total,
+        "pairs_kept": len(pairs),
+        "pruning_ratio": 1.0 - len(pairs) / total if total else 0.0,
+        "n_clusters": None if labels is None else int(len(np.unique(labels))),
+        "seconds": time.perf_counter() - t0,
+    }
+    return pairs, C[i, j], stats
+
+def candidate_pairs(
+    prices_wide: pd.DataFrame,
+    min_corr: float = 0.5,
+    top_k: Optional[int] = None,
+    clusters: Union[str, Dict[str, str], None] = None,
+    n_clusters: Optional[int] = None,
+    cluster_dist: float = 0.7,
+    returns: str = "log",
+) -> pd.DataFrame:
+    """
+    Pairs worth a cointegration test, from the return correlation matrix.
+
+    Keeps pairs whose return correlation is >= min_corr and, with clusters,
+    whose tickers share a cluster: "hierarchical" (average linkage on
+    1 - corr, cut at cluster_dist or into n_clusters groups) or a
+    {ticker: sector} map. top_k limits each ticker to its top_k most
+    correlated surviving partners. Returns columns A, B, corr (highest
+    first); attrs["prefilter"] holds pairs_total, pairs_kept,
+    pruning_ratio (share of pairs dropped), n_clusters and seconds.
+    """
+    cols = list(prices_wide.columns)
+    values = prices_wide.to_numpy(dtype=np.float64)
+    pairs, corr, stats = _candidate_index(values, cols, min_corr, top_k, clusters, n_clusters, cluster_dist, returns)
+    names = np.asarray(cols, dtype=object)
+    out = pd.DataFrame({"A": names[pairs[:, 0]], "B": names[pairs[:, 1]], "corr": corr})
+    out = out.sort_values("corr", ascending=False, kind="stable").reset_index(drop=True)
+    out.attrs["prefilter"] = stats
+    return out
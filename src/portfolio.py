@@ -0,0 +1,135 @@
+# Portfolio-level backtest: many pairs netted into one book
+from __future__ import annotations
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    from .backtester import PairsBacktester
+except ImportError:
+    from backtester import PairsBacktester
+
+class PortfolioBacktester:
+    """
+    Runs many pairs against one capital pool. Each pair's target shares
+    (sized as in PairsBacktester, with pair_capital per pair) are summed
+    into net positions per ticker, so a ticker shared by several pairs is
+    traded, charged and borrowed only on its net position. Optional caps on
+    the book's gross and net dollar exposure scale all positions of a bar
+    down together. Costs, borrow, delay and dtype are those of a
+    PairsBacktester built from the same settings.
+    """
+
+    def __init__(
+        self,
+        tc_bps: float = 1.0,
+        slippage_bps: float = 0.5,
+        short_borrow_apr: float = 0.02,
+        capital: float = 1_000_000.0,
+        signal_delay: int = 1,
+        periods_per_year: int = 252,
+        pair_capital: Optional[float] = None,  # default: capital split evenly across pairs
+        max_gross: Optional[float] = None,  # cap on the book's sum |shares| * price, dollars
+        max_net: Optional[float] = None,  # cap on |sum shares * price|, dollars
+        dtype=np.float64,  # prices/shares/trades; PnL, costs and equity stay float64
+    ):
+        # per-pair cost model; its own (per-pair) max_gross is left unset
+        self.pair_bt = PairsBacktester(tc_bps, slippage_bps, short_borrow_apr, capital,
+                                       signal_delay, periods_per_year, dtype=dtype)
+        self.capital = self.pair_bt.capital
+        self.signal_delay = self.pair_bt.signal_delay
+        self.dtype = self.pair_bt.dtype
+        self.pair_capital = pair_capital
+        self.max_gross = max_gross
+        self.max_net = max_net
+
+    def simulate(
+        self,
+        prices: pd.DataFrame,
+        pairs: Sequence[Tuple[str, str]],
+        signals,
+        betas,
+    ) -> Dict[str, pd.Series | pd.DataFrame]:
+        """
+        prices: wide DataFrame (bars x tickers); gaps are forward-filled and a
+        pair stays flat until both of its legs have a price.
+        pairs: P (A, B) ticker tuples; signals: (T, P) array or DataFrame in
+        the same order; betas: length-P or (T, P) hedge ratios.
+        Returns book-level pnl/equity/costs/borrow/gross/net/scale Series and
+        per-ticker shares/trades DataFrames.
+        """
+        prices = prices.ffill()
+        tickers = list(prices.columns)
+        col = {t: i for i, t in enumerate(tickers)}
+        try:
+            ia = np.array([col[a] for a, _ in pairs], dtype=np.int64)
+            ib = np.array([col[b] for _, b in pairs], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"Pair leg {e.args[0]!r} not in prices columns") from None
+        dt, f64 = self.dtype, np.float64
+        px = prices.to_numpy(dtype=dt)
+        T, N = px.shape
+        P = len(ia)
+
+        if isinstance(signals, pd.DataFrame):
+            signals = signals.reindex(prices.index)
+        sig = np.nan_to_num(np.asarray(signals, dtype=dt), nan=0.0)
+        beta = np.asarray(betas, dtype=dt)
+        if sig.shape != (T, P) or beta.shape not in ((P,), (T, P)):
+            raise ValueError(f"Shape mismatch: prices {px.shape}, pairs {P}, signals {sig.shape}, betas {beta.shape}")
+        if self.signal_delay > 0:
+            delayed = np.zeros_like(sig)
+            delayed[self.signal_delay:] = sig[:T - self.signal_delay]
+            sig = delayed
+
+        # per-pair target shares, flat while a leg or the hedge ratio is missing
+        pa, pb = px[:, ia], px[:, ib]
+        live = ~(np.isnan(pa) | np.isnan(pb) | np.isnan(beta))
+        sig = np.where(live, sig, 0.0)
+        leg = 0.5 * (self.pair_capital if self.pair_capital is not None else self.capital / max(P, 1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            A_sh = np.where(live, leg / pa * sig, 0.0)
+            B_sh = np.where(live, -leg / pb * np.nan_to_num(beta) * sig, 0.0)
+
+        # net per ticker: one bincount over (bar, ticker) slots for both legs
+        slots = (np.arange(T)[:, None] * N + np.concatenate([ia, ib])[None, :]).ravel()
+        net = np.bincount(slots, weights=np.concatenate([A_sh, B_sh], axis=1).ravel(), minlength=T * N)
+        net = net.reshape(T, N).astype(dt, copy=False)
+
+        p0 = np.nan_to_num(px, nan=0.0)
+        notional = np.multiply(net, p0, dtype=f64)
+        gross = np.abs(notional).sum(axis=1)
+        net_exp = notional.sum(axis=1)
+        scale = np.ones(T)
+        if self.max_gross is not None:
+            scale = np.minimum(scale, self.max_gross / np.maximum(gross, 1e-9))
+        if self.max_net is not None:
+            scale = np.minimum(scale, self.max_net / np.maximum(np.abs(net_exp), 1e-9))
+        net *= scale[:, None]
+        gross *= scale
+        net_exp *= scale
+
+        trades = np.zeros_like(net)
+        trades[1:] = net[1:] - net[:-1]
+        prev = np.zeros_like(net)
+        prev[1:] = net[:-1]
+        dp = np.zeros_like(p0)
+        dp[1:] = p0[1:] - p0[:-1]
+        # money is accumulated in float64 whatever the price/share dtype
+        pnl_pos = np.multiply(prev, dp, dtype=f64).sum(axis=1)
+        costs, borrow = self.pair_bt._charges(np.multiply(np.abs(trades), p0, dtype=f64).sum(axis=1),
+                                              np.multiply(np.maximum(-prev, 0.0), p0, dtype=f64).sum(axis=1))
+        pnl = pnl_pos - costs - borrow
+
+        idx = prices.index
+        return {
+            "pnl": pd.Series(pnl, index=idx, name="pnl"),
+            "equity": pd.Series(np.cumsum(pnl), index=idx, name="equity"),
+            "costs": pd.Series(costs, index=idx, name="costs"),
+            "borrow": pd.Series(borrow, index=idx, name="borrow_fee"),
+            "gross": pd.Series(gross, index=idx, name="gross"),
+            "net": pd.Series(net_exp, index=idx, name="net"),
+            "scale": pd.Series(scale, index=idx, name="scale"),
+            "shares": pd.DataFrame(net, index=idx, columns=tickers),
+            "trades": pd.DataFrame(trades, index=idx, columns=tickers),
+        }
@@ -0,0 +1,291 @@
+# On-disk columnar price cache
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# downloader(tickers, start, end, price_col) -> wide DataFrame (DatetimeIndex x tickers),
+# end exclusive; start None means from the first available bar
+Downloader = Callable[[List[str], Optional[pd.Timestamp], pd.Timestamp, str], pd.DataFrame]
+
+# one entry file: (date ns, price) records
+_ENTRY = np.dtype([("date", "<i8"), ("price", "<f8")])
+_COLUMNS = ("key", "source", "ticker", "price_col", "start", "end", "fingerprint", "nbytes", "last_access")
+
+class PriceCache:
+    """
+    Persistent per-series price store keyed by (source, ticker/path, price_col).
+
+    Each entry is one .npy file of (date, price) records read back
+    memory-mapped, plus a manifest row with the covered date range, size and
+    last access time. The manifest is a SQLite table under `root`, so
+    several processes can share a cache: every read-modify-write of an entry
+    runs inside one SQLite write transaction and entry files are replaced
+    atomically. Downloaded series are extended by fetching only the missing
+    head/tail ranges; CSV entries are re-parsed only when the file's
+    mtime/size change. With max_bytes set, least recently used entries are
+    evicted after each write. Downloads and CSV parsing run outside the
+    lock, so threads (and processes) fetch concurrently.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "evictions": 0}
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+
+    # ---- public API -------------------------------------------------------
+    def get_csv(self, path: str | Path, price_col: str = "Adj Close") -> pd.Series:
+        """
+        Series for price_col in a Date-indexed CSV, parsed once per file version.
+        """
+        try:
+            from .data_loader import _load_csv_series
+        except ImportError:
+            from data_loader import _load_csv_series
+
+        path = Path(path).resolve()
+        st = path.stat()
+        fingerprint = [st.st_mtime_ns, st.st_size]
+        key = self._key("csv", str(path), price_col)
+        with self._lock:
+            meta = self._meta([key]).get(key)
+            hit = meta is not None and meta["fingerprint"] == fingerprint
+            self.stats["hits" if hit else "misses"] += 1
+        # parse without holding the lock so other files load meanwhile
+        s = None if hit else _load_csv_series(path, price_col=price_col)
+        with self._locked():
+            if s is not None:
+                self._write(key, s, {
+                    "source": "csv", "ticker": str(path), "price_col": price_col,
+                    "fingerprint": fingerprint, "start": None, "end": None,
+                }, keep={key})
+            out = self._read(key, None, None).rename(price_col)
+            self._touch([key])
+            return out
+
+    def get_downloaded(
+        self,
+        tickers: List[str],
+        start,
+        end,
+        downloader: Downloader,
+        source: str = "yfinance",
+        price_col: str = "Adj Close",
+    ) -> pd.DataFrame:
+        """
+        Wide frame of tickers over [start, end), fetching only uncovered ranges.
+        Tickers missing the same range are fetched with one downloader call.
+        start=None is open-ended (full history) and is passed to the
+        downloader as None.
+        """
+        start = None if start is None else pd.Timestamp(start)
+        today = pd.Timestamp.today().normalize()
+        end = today + pd.Timedelta(days=1) if end is None else pd.Timestamp(end)
+
+        keys = {t: self._key(source, t, price_col) for t in tickers}
+        with self._lock:
+            metas = self._meta(keys.values())
+            missing: Dict[Tuple[Optional[pd.Timestamp], pd.Timestamp], List[str]] = {}
+            for t in tickers:
+                gaps = _missing_ranges(metas.get(keys[t]), start, end)
+                if gaps:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["hits"] += 1
+                for gap in gaps:
+                    missing.setdefault(gap, []).append(t)
+
+            self.stats["fetches"] += len(missing)
+
+        # download without holding the lock so concurrent callers (e.g.
+        # get_price_panel's batches, other processes) fetch in parallel;
+        # merge under it against the manifest as it is now, not as read above
+        for (lo, hi), group in missing.items():
+            px = downloader(group, lo, hi, price_col)
+            with self._locked():
+                metas = self._meta(keys[t] for t in group)
+                for t in group:
+                    key = keys[t]
+                    meta = metas.get(key)
+                    new = px[t].dropna() if t in px.columns else pd.Series(dtype=np.float64)
+                    old = self._read(key, None, None) if meta is not None else None
+                    merged = new if old is None else new.combine_first(old)
+                    # today's bar may still change, so coverage never extends past today
+                    cov_lo, cov_hi = _covered(meta, lo, min(hi, today))
+                    if cov_lo is not None:
+                        cov_hi = max(cov_lo, cov_hi)
+                    self._write(key, merged, {
+                        "source": source, "ticker": t, "price_col": price_col,
+                        "start": None if cov_lo is None else cov_lo.isoformat(), "end": cov_hi.isoformat(),
+                    }, keep=set(keys.values()))
+
+        with self._locked():
+            out = pd.DataFrame({t: self._read(keys[t], start, end) for t in tickers})
+            self._touch(keys.values())
+        return out
+
+    def invalidate(self, source: Optional[str] = None, ticker: Optional[str] = None,
+                   price_col: Optional[str] = None) -> int:
+        """
+        Drop entries matching every given field (all entries if none given).
+        Returns the number of entries removed.
+        """
+        with self._locked() as conn:
+            keys = [
+                k for k, m_source, m_ticker, m_col in conn.execute("SELECT key, source, ticker, price_col FROM entries")
+                if (source is None or m_source == source)
+                and (ticker is None or m_ticker in (ticker, str(Path(ticker).resolve())))
+                and (price_col is None or m_col == price_col)
+            ]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ---- storage ----------------------------------------------------------
+    @staticmethod
+    def _key(source: str, ticker: str, price_col: str) -> str:
+        return hashlib.sha1(f"{source}|{ticker}|{price_col}".encode()).hexdigest()[:20]
+
+    def _connect(self):
+        # one connection per process: a forked worker must not reuse the parent's
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3
+
+            # autocommit; writes go through the explicit transactions of _locked
+            self._conn = sqlite3.connect(self.root / "manifest.sqlite", timeout=60,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, source TEXT, ticker TEXT, "
+                "price_col TEXT, start TEXT, end TEXT, fingerprint TEXT, nbytes INTEGER, last_access REAL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _locked(self):
+        # thread lock plus a SQLite write transaction: one writer at a time
+        # across threads and processes; entry files are only read, replaced
+        # or removed inside it
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _meta(self, keys: Iterable[str]) -> Dict[str, dict]:
+        keys, conn, out = list(keys), self._connect(), {}
+        for lo in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            part = keys[lo:lo + 500]
+            q = f"SELECT {', '.join(_COLUMNS)} FROM entries WHERE key IN ({','.join('?' * len(part))})"
+            for row in conn.execute(q, part):
+                meta = dict(zip(_COLUMNS, row))
+                meta["fingerprint"] = None if meta["fingerprint"] is None else json.loads(meta["fingerprint"])
+                out[meta.pop("key")] = meta
+        return out
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npy"
+
+    def _read(self, key: str, start, end) -> pd.Series:
+        rec = np.load(self._path(key), mmap_mode="r")
+        idx = rec["date"]
+        lo = 0 if start is None else int(np.searchsorted(idx, pd.Timestamp(start).value, side="left"))
+        hi = len(idx) if end is None else int(np.searchsorted(idx, pd.Timestamp(end).value, side="left"))
+        return pd.Series(np.array(rec["price"][lo:hi]),
+                         index=pd.DatetimeIndex(np.array(idx[lo:hi]).view("datetime64[ns]"), name="Date"))
+
+    def _touch(self, keys: Iterable[str]) -> None:
+        # one last_access update per call, not one per entry read
+        now = time.time()
+        self._connect().executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, k) for k in keys])
+
+    def _write(self, key: str, s: pd.Series, meta: dict, keep: set) -> None:
+        s = s[~s.index.duplicated(keep="last")].sort_index()
+        rec = np.empty(len(s), dtype=_ENTRY)
+        rec["date"] = pd.DatetimeIndex(s.index).values.astype("datetime64[ns]").view(np.int64)
+        rec["price"] = s.to_numpy(dtype=np.float64)
+        path = self._path(key)
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, rec)
+        # atomic: readers see the old file or the new one, never neither
+        os.replace(tmp, path)
+        fp = meta.get("fingerprint")
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO entries ({', '.join(_COLUMNS)}) VALUES ({','.join('?' * len(_COLUMNS))})",
+            (key, meta["source"], meta["ticker"], meta["price_col"], meta["start"], meta["end"],
+             None if fp is None else json.dumps(fp), path.stat().st_size, time.time()))
+        self._evict(keep)
+
+    def _remove(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _evict(self, keep: set) -> None:
+        if self.max_bytes is None:
+            return
+        rows = self._connect().execute("SELECT key, nbytes FROM entries ORDER BY last_access").fetchall()
+        total = sum(n for _, n in rows)
+        for k, n in rows:
+            if total <= self.max_bytes:
+                break
+            if k not in keep:
+                self._remove(k)
+                total -= n
+                self.stats["evictions"] += 1
+
+def _ts(x) -> Optional[pd.Timestamp]:
+    return None if x is None else pd.Timestamp(x)
+
+def _covered(meta: Optional[dict], lo: Optional[pd.Timestamp],
+             hi: pd.Timestamp) -> Tuple[Optional[pd.Timestamp], pd.Timestamp]:
+    # coverage after fetching [lo, hi), lo=None being open-ended; a range that
+    # no longer touches the recorded one (another thread or process stored a
+    # disjoint range meanwhile) is kept as data but not counted as covered
+    if meta is None:
+        return lo, hi
+    old_lo, old_hi = _ts(meta["start"]), pd.Timestamp(meta["end"])
+    if (lo is not None and lo > old_hi) or (old_lo is not None and hi < old_lo):
+        return old_lo, old_hi
+    return (None if lo is None or old_lo is None else min(lo, old_lo)), max(hi, old_hi)
+
+def _missing_ranges(meta: Optional[dict], start: Optional[pd.Timestamp],
+                    end: pd.Timestamp) -> List[Tuple[Optional[pd.Timestamp], pd.Timestamp]]:
+    if meta is None:
+        return [(start, end)]
+    lo, hi = _ts(meta["start"]), pd.Timestamp(meta["end"])
+    # gaps reach the covered range even when the request does not, so the
+    # coverage recorded after fetching them stays one unbroken range
+    gaps = []
+    if lo is not None and (start is None or start < lo):
+        gaps.append((start, lo))
+    if end > hi:
+        gaps.append((hi, end))
+    return gaps
@@ -0,0 +1,186 @@
+# Opt-in per-stage timing and memory instrumentation
+from __future__ import annotations
+import functools
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+class _Stage:
+    """
+    Measurement record of one stage run; set .rows inside the block if the
+    row count is only known there.
+    """
+    __slots__ = ("name", "rows", "wall_s", "cpu_s", "peak_mb", "_t0", "_c0", "_mem0", "_carried", "_cprof")
+
+    def __init__(self, name: str, rows: Optional[int]):
+        self.name, self.rows = name, rows
+        self.wall_s = self.cpu_s = 0.0
+        self.peak_mb: Optional[float] = None
+        self._carried = 0
+        self._cprof = None
+
+class _NullStage:
+    # what a disabled profiler hands out: accepts .rows, measures nothing
+    __slots__ = ("rows",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullStage()
+
+class Profiler:
+    """
+    Records wall time, CPU time, peak traced memory and row counts per stage.
+
+        prof = Profiler()
+        with prof.stage("load") as st:
+            df = get_prices(...)
+            st.rows = len(df)
+        print(prof.table())
+
+    Stages may nest; each peak is measured from the memory in use when the
+    stage started. With cprofile=True every top-level stage also runs under
+    cProfile and dump_hottest() writes the slowest one's stats. A disabled
+    profiler (enabled=False) hands out a shared no-op context, so
+    instrumented code costs one attribute lookup and call per stage.
+    """
+
+    def __init__(self, enabled: bool = True, memory: bool = True, cprofile: bool = False):
+        self.enabled = enabled
+        self.memory = memory and enabled
+        self.cprofile = cprofile and enabled
+        self.records: List[_Stage] = []
+        self._stack: List[_Stage] = []
+        self._started_tracing = False
+        self._profiles: Dict[int, object] = {}
+
+    # ---- recording ---------------------------------------------------------
+    def stage(self, name: str, rows: Optional[int] = None):
+        """
+        Context manager timing the enclosed block as stage `name`.
+        """
+        if not self.enabled:
+            return _NULL
+        return _StageContext(self, _Stage(name, rows))
+
+    def wrap(self, name: Optional[str] = None, rows: Optional[Callable[..., int]] = None):
+        """
+        Decorator form of stage(); rows(result) may derive the row count.
+        """
+        def deco(fn):
+            label = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(label) as st:
+                    out = fn(*args, **kwargs)
+                    if rows is not None:
+                        st.rows = rows(out)
+                return out
+            return wrapper
+        return deco
+
+    def _enter(self, st: _Stage) -> None:
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent._carried = max(parent._carried, peak)
+            tracemalloc.reset_peak()
+            st._mem0 = cur
+        if self.cprofile and not self._stack:
+            import cProfile
+            st._cprof = cProfile.Profile()
+            st._cprof.enable()
+        self._stack.append(st)
+        st._c0 = time.process_time()
+        st._t0 = time.perf_counter()
+
+    def _exit(self, st: _Stage) -> None:
+        st.wall_s = time.perf_counter() - st._t0
+        st.cpu_s = time.process_time() - st._c0
+        self._stack.pop()
+        if st._cprof is not None:
+            st._cprof.disable()
+            self._profiles[id(st)] = st._cprof
+            st._cprof = None
+        if self.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, st._carried)
+            st.peak_mb = (peak - st._mem0) / 2**20
+            if self._stack:
+                parent = self._stack[-1]
+                parent._carried = max(parent._carried, peak)
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        self.records.append(st)
+
+    # ---- reporting ---------------------------------------------------------
+    def report(self) -> List[dict]:
+        """
+        One row per stage name (in first-run order): calls, wall/CPU seconds
+        summed over calls, largest peak MB, rows summed over calls.
+        """
+        rows: Dict[str, dict] = {}
+        for st in self.records:
+            r = rows.setdefault(st.name, {"stage": st.name, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                                          "peak_mb": None, "rows": None})
+            r["calls"] += 1
+            r["wall_s"] += st.wall_s
+            r["cpu_s"] += st.cpu_s
+            if st.peak_mb is not None:
+                r["peak_mb"] = st.peak_mb if r["peak_mb"] is None else max(r["peak_mb"], st.peak_mb)
+            if st.rows is not None:
+                r["rows"] = (r["rows"] or 0) + int(st.rows)
+        return list(rows.values())
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        text = json.dumps({"stages": self.report()}, indent=1)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+    def table(self) -> str:
+        lines = [f"{'stage':<18} {'calls':>5} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows':>10}"]
+        for r in self.report():
+            peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+            rows = "-" if r["rows"] is None else f"{r['rows']:,}"
+            lines.append(f"{r['stage']:<18} {r['calls']:>5} {r['wall_s']:>9.4f} {r['cpu_s']:>9.4f} {peak:>9} {rows:>10}")
+        return "\n".join(lines)
+
+    def dump_hottest(self, path: str) -> Optional[str]:
+        """
+        Write cProfile stats of the slowest top-level stage (needs cprofile=True);
+        returns that stage's name. Inspect with `python -m pstats path`.
+        """
+        profiled = [st for st in self.records if id(st) in self._profiles]
+        if not profiled:
+            return None
+        hottest = max(profiled, key=lambda st: st.wall_s)
+        self._profiles[id(hottest)].dump_stats(path)
+        return hottest.name
+
+class _StageContext:
+    __slots__ = ("_prof", "_st")
+
+    def __init__(self, prof: Profiler, st: _Stage):
+        self._prof, self._st = prof, st
+
+    def __enter__(self) -> _Stage:
+        self._prof._enter(self._st)
+        return self._st
+
+    def __exit__(self, *exc):
+        self._prof._exit(self._st)
+        return False
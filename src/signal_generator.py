@@ -1,16 +1,246 @@
 # Z-score signals, bands
 from __future__ import annotations
+import types
 import numpy as np
 import pandas as pd
 
-def compute_spread(df: pd.DataFrame, beta: float) -> pd.Series:
+def compute_spread(df: pd.DataFrame, beta: float | pd.Series) -> pd.Series:
+    # beta may be a time-varying Series (see hedge_ratio), aligned on the index
     return (df["A"] - beta * df["B"]).rename("spread")
 
-def zscore(series: pd.Series, lookback: int = 60) -> pd.Series:
-    m = series.rolling(lookback).mean()
-    s = series.rolling(lookback).std()
-    z = (series - m) / s
-    return z.rename("z")
+def basket_spread(prices: pd.DataFrame, weights) -> pd.Series:
+    # N-leg spread: prices (one column per leg) @ weights, e.g. a Johansen vector
+    w = np.asarray(weights, dtype=np.float64)
+    return pd.Series(prices.to_numpy(dtype=np.float64) @ w, index=prices.index, name="spread")
+
+def zscore(series: pd.Series, lookback: int = 60, dtype=None) -> pd.Series:
+    """
+    Rolling z-score (ddof=1). The rolling moments are accumulated in float64
+    whatever the input; the result has `dtype`, by default float32 for a
+    float32 series and float64 otherwise.
+    """
+    if dtype is None:
+        dtype = np.float32 if series.dtype == np.float32 else np.float64
+    roll = series.rolling(lookback)
+    z = series.to_numpy(dtype=np.float64) - roll.mean().to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):  # flat windows, as pandas would
+        np.divide(z, roll.std().to_numpy(), out=z)
+    return pd.Series(z.astype(dtype, copy=False), index=series.index, name="z")
+
+def _signal_step(prev: float, cd: int, zi: float, entry: float, exit: float,
+                 max_abs_z: float, cooldown: int) -> tuple[float, int]:
+    """
+    One bar of the hysteresis state machine: (previous position, cooldown
+    counter, z) -> (position, cooldown counter). max_abs_z=NaN disables the stop.
+    """
+    # stop trading during cooldown
+    if cd > 0:
+        return 0.0, cd - 1
+    # guard NaNs
+    if zi != zi:
+        return 0.0, cd
+    # optional hard stop-loss if z blows out
+    if abs(zi) >= max_abs_z:
+        return 0.0, cooldown
+
+    if prev == 0:
+        if zi <= -entry:
+            pos = 1.0
+        elif zi >= entry:
+            pos = -1.0
+        else:
+            pos = 0.0
+    elif prev == 1:
+        pos = 0.0 if zi >= exit else 1.0
+    else:
+        pos = 0.0 if zi <= -exit else -1.0
+
+    # enter cooldown after a fresh exit
+    if prev != 0 and pos == 0 and cooldown > 0:
+        cd = cooldown
+    return pos, cd
+
+def _signals_loop(Z: np.ndarray, entry: np.ndarray, exit: np.ndarray,
+                  max_abs_z: np.ndarray, cooldown: np.ndarray,
+                  prev0: np.ndarray, cd0: np.ndarray, start: int) -> np.ndarray:
+    # state (prev0, cd0) is read and updated in place; rows before `start` stay flat
+    n, k = Z.shape
+    pos = np.zeros((n, k), Z.dtype)
+    for j in range(k):
+        zj = Z[:, j]
+        e, x, m, c = entry[j], exit[j], max_abs_z[j], cooldown[j]
+        prev, cd = prev0[j], cd0[j]
+        for i in range(start, n):
+            prev, cd = _signal_step(prev, cd, zj[i], e, x, m, c)
+            pos[i, j] = prev
+        prev0[j], cd0[j] = prev, cd
+    return pos
+
+def _next(idx: np.ndarray, i: int) -> int:
+    # first index in the sorted array idx that is >= i, or -1
+    p = idx.searchsorted(i)
+    return int(idx[p]) if p < len(idx) else -1
+
+def _signals_events(Z: np.ndarray, entry: np.ndarray, exit: np.ndarray,
+                    max_abs_z: np.ndarray, cooldown: np.ndarray,
+                    prev0: np.ndarray, cd0: np.ndarray, start: int) -> np.ndarray:
+    """
+    Same state machine as _signal_step, one column at a time, jumping from
+    one state change to the next: the bars that can end the current state
+    (an entry while flat, an exit / stop / NaN while in a trade) are found
+    with vectorized masks, so the Python loop runs once per trade, not once
+    per bar.
+    """
+    n, k = Z.shape
+    pos = np.zeros((n, k), Z.dtype)
+    with np.errstate(invalid="ignore"):
+        for j in range(k):
+            zj = Z[start:, j]
+            e, x, m, c = entry[j], exit[j], max_abs_z[j], int(cooldown[j])
+            stop = np.abs(zj) >= m
+            long_in = (zj <= -e) & ~stop
+            enter = long_in | ((zj >= e) & ~stop)
+            if c > 0:
+                enter |= stop  # a stop while flat still starts a cooldown
+            gone = np.isnan(zj) | stop
+            events = {0.0: np.flatnonzero(enter),
+                      1.0: np.flatnonzero(gone | (zj >= x)),
+                      -1.0: np.flatnonzero(gone | (zj <= -x))}
+            col = pos[start:, j]
+            prev, cd = float(prev0[j]), int(cd0[j])
+            i, L = 0, len(zj)
+            while i < L:
+                if cd > 0:  # cooling down: flat, counter runs off
+                    skip = min(cd, L - i)
+                    i, cd, prev = i + skip, cd - skip, 0.0
+                    continue
+                t = _next(events[prev], i)
+                if prev == 0:
+                    if t < 0:
+                        break
+                    if stop[t]:
+                        cd = c
+                    else:
+                        prev = 1.0 if long_in[t] else -1.0
+                        col[t] = prev
+                else:
+                    if t < 0:
+                        col[i:] = prev
+                        break
+                    col[i:t] = prev
+                    # NaN exits without a cooldown; exits and stops start one
+                    prev, cd = 0.0, (0 if zj[t] != zj[t] else c)
+                i = t + 1
+            prev0[j], cd0[j] = prev, cd
+    return pos
+
+def _signals_numpy(Z: np.ndarray, entry: np.ndarray, exit: np.ndarray,
+                   max_abs_z: np.ndarray, cooldown: np.ndarray,
+                   prev0: np.ndarray, cd0: np.ndarray, start: int) -> np.ndarray:
+    """
+    Same state machine as _signal_step, stepped over time with every column
+    (pair / parameter set) updated at once.
+    """
+    n, k = Z.shape
+    if k <= 32:
+        # per-bar ufunc overhead dominates for narrow inputs
+        return _signals_events(Z, entry, exit, max_abs_z, cooldown, prev0, cd0, start)
+
+    pos = np.zeros((n, k), Z.dtype)
+    prev = prev0.copy()
+    cd = cd0.copy()
+    has_cd = cooldown > 0
+    with np.errstate(invalid="ignore"):
+        for i in range(start, n):
+            zi = Z[i]
+            cooling = cd > 0
+            skip = cooling | np.isnan(zi)
+            stop = ~skip & (np.abs(zi) >= max_abs_z)
+            flat = np.where(zi <= -entry, 1.0, np.where(zi >= entry, -1.0, 0.0))
+            held = np.where(prev == 1, np.where(zi >= exit, 0.0, 1.0), np.where(zi <= -exit, 0.0, -1.0))
+            new = np.where(skip | stop, 0.0, np.where(prev == 0, flat, held))
+            exited = ~skip & ~stop & (prev != 0) & (new == 0) & has_cd
+            cd = np.where(cooling, cd - 1, np.where(stop | exited, cooldown, cd))
+            pos[i] = prev = new
+    prev0[:], cd0[:] = prev, cd
+    return pos
+
+_signals_kernel = None
+_kernel_checked = False
+
+def _njit(fn, **callees):
+    """
+    numba.njit(cache=True) of a copy of fn whose global names `callees`
+    resolve to the given compiled functions; fn itself and the module
+    globals stay plain Python.
+    """
+    import numba
+    copy = types.FunctionType(fn.__code__, {**fn.__globals__, **callees},
+                              fn.__name__, fn.__defaults__, fn.__closure__)
+    copy.__qualname__ = fn.__qualname__
+    return numba.njit(cache=True)(copy)
+
+def _get_signals_kernel():
+    """
+    numba-compiled _signals_loop, or None without numba (optional
+    accelerator). numba is imported on first use, not at module import.
+    """
+    global _signals_kernel, _kernel_checked
+    if not _kernel_checked:
+        _kernel_checked = True
+        try:
+            import numba  # noqa: F401
+        except ImportError:
+            return None
+        _signals_kernel = _njit(_signals_loop, _signal_step=_njit(_signal_step))
+    return _signals_kernel
+
+def generate_signals_array(
+    z: np.ndarray,
+    entry=2.0,
+    exit=0.0,
+    max_abs_z=None,
+    cooldown=0,
+    gate=None,
+    state: dict | None = None,
+) -> np.ndarray:
+    """
+    Array form of generate_signals on a 1-D z vector or a 2-D (bars, columns)
+    z matrix. entry/exit/max_abs_z/cooldown may be scalars or one value per
+    column, so many pairs or threshold sets run in one call. gate is an
+    optional boolean array broadcastable to z. float32 z stays float32 (as
+    does the output); anything else runs in float64.
+
+    state carries positions and cooldowns across consecutive blocks of bars:
+    pass the same dict (initially empty) with each block and the concatenated
+    output equals one call on the full history.
+    """
+    Z = np.asarray(z)
+    if Z.dtype != np.float32:
+        Z = Z.astype(np.float64, copy=False)
+    if gate is not None:
+        # closed gate behaves like a missing z: flat, no new entries
+        Z = np.where(np.asarray(gate, dtype=bool), Z, np.nan)
+    one_d = Z.ndim == 1
+    if one_d:
+        Z = Z[:, None]
+    k = Z.shape[1]
+    entry = np.broadcast_to(np.asarray(entry, dtype=np.float64), (k,))
+    exit = np.broadcast_to(np.asarray(exit, dtype=np.float64), (k,))
+    max_abs_z = np.broadcast_to(np.asarray(np.nan if max_abs_z is None else max_abs_z, dtype=np.float64), (k,))
+    cooldown = np.broadcast_to(np.asarray(cooldown, dtype=np.int64), (k,))
+    state = {} if state is None or len(Z) == 0 else state
+    # the first bar of a history is always flat
+    start = 0 if "prev" in state else 1
+    prev = state.setdefault("prev", np.zeros(k))
+    cd = state.setdefault("cd", np.zeros(k, dtype=np.int64))
+    kernel = _get_signals_kernel()
+    if kernel is not None:
+        pos = kernel(np.ascontiguousarray(Z), entry.copy(), exit.copy(), max_abs_z.copy(), cooldown.copy(),
+                              prev, cd, start)
+    else:
+        pos = _signals_numpy(Z, entry, exit, max_abs_z, cooldown, prev, cd, start)
+    return pos[:, 0] if one_d else pos
 
 def generate_signals(
     z: pd.Series,
@@ -18,50 +248,14 @@ def generate_signals(
     exit: float = 0.0,
     max_abs_z: float | None = None,
     cooldown: int = 0,
+    gate: pd.Series | None = None,
 ) -> pd.Series:
     """
     Returns {-1,0,+1} with hysteresis. Optional stop-loss via max_abs_z and cooldown days after exit.
     +1 = long spread (long A, short B), -1 = short spread.
+    Optional boolean gate (e.g. coint_gate): bars where it is False are forced flat.
     """
-    z = z.copy()
-    pos = np.zeros(len(z), dtype=float)
-    cd = 0  # cooldown counter
-
-    for i in range(1, len(z)):
-        prev = pos[i - 1]
-
-        # stop trading during cooldown
-        if cd > 0:
-            pos[i] = 0.0
-            cd -= 1
-            continue
-
-        zi = z.iloc[i]
-        # guard NaNs
-        if np.isnan(zi):
-            pos[i] = 0.0
-            continue
-
-        # optional hard stop-loss if z blows out
-        if max_abs_z is not None and abs(zi) >= max_abs_z:
-            pos[i] = 0.0
-            cd = cooldown
-            continue
-
-        if prev == 0:
-            if zi <= -entry:
-                pos[i] = +1
-            elif zi >= +entry:
-                pos[i] = -1
-            else:
-                pos[i] = 0
-        elif prev == +1:
-            pos[i] = 0 if zi >= exit else +1
-        elif prev == -1:
-            pos[i] = 0 if zi <= -exit else -1
-
-        # enter cooldown after a fresh exit
-        if prev != 0 and pos[i] == 0 and cooldown > 0:
-            cd = cooldown
-
+    if gate is not None:
+        gate = gate.reindex(z.index, fill_value=False).to_numpy(dtype=bool)
+    pos = generate_signals_array(z.to_numpy(), entry, exit, max_abs_z, cooldown, gate)
     return pd.Series(pos, index=z.index, name="signal")
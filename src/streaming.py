@@ -0,0 +1,216 @@
+# Incremental (one bar at a time) spread, z-score and signals
+from __future__ import annotations
+import math
+from typing import Optional
+import numpy as np
+
+try:
+    from .signal_generator import _njit, _signal_step
+except ImportError:
+    from signal_generator import _njit, _signal_step
+
+def _div(a: float, b: float) -> float:
+    # IEEE division as numpy does it (x/0 -> +-inf, 0/0 -> nan)
+    if b == 0.0:
+        if a != a or a == 0.0:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+# rows of the rolling z-score state matrix, one column per series
+_SUM, _COMP_ADD, _COMP_RM, _NEG, _MEAN, _SSQ, _VCOMP_ADD, _VCOMP_RM, _NOBS, _SAME, _PREV = range(11)
+
+def _window_moments(st: np.ndarray, j: int, L: int) -> tuple:
+    """
+    (mean, std) of column j's full window from the state matrix, NaN until
+    `L` values are in it, with pandas' special cases: a window of one
+    repeated value has that mean and zero std, a mean of the wrong sign
+    for all-positive/all-negative values is clamped to 0.
+    """
+    n = st[_NOBS, j]
+    if n < L or n == 0.0:
+        return math.nan, math.nan
+    if st[_SAME, j] >= n:
+        return st[_PREV, j], (0.0 if n > 1.0 else math.nan)
+    mean = st[_SUM, j] / n
+    if (st[_NEG, j] == 0.0 and mean < 0) or (st[_NEG, j] == n and mean > 0):
+        mean = 0.0
+    if n <= 1.0:
+        return mean, math.nan
+    var = st[_SSQ, j] / (n - 1.0)
+    return mean, (math.sqrt(var) if var >= 0 else 0.0)
+
+def _zscore_loop(X: np.ndarray, buf: np.ndarray, st: np.ndarray, count: int) -> np.ndarray:
+    """
+    Rolling z-scores of X (t, k), continuing from the ring buffer buf (L, k),
+    state st (11, k) and `count` bars already seen; buf and st are updated in
+    place. The mean is a Kahan-compensated running sum and the variance a
+    compensated Welford recurrence, with the same add/remove steps as pandas'
+    rolling mean/std so the output matches the batch series.
+    """
+    t, k = X.shape
+    L = buf.shape[0]
+    Z = np.empty((t, k))
+    for j in range(k):
+        for i in range(t):
+            x = X[i, j]
+            if math.isinf(x):
+                x = math.nan  # pandas treats inf as missing inside rolling windows
+            c = count + i
+            slot = c % L
+            if c == 0 or L <= 1:
+                for f in range(11):
+                    st[f, j] = 0.0
+                st[_PREV, j] = x
+            elif c >= L:
+                r = buf[slot, j]
+                if r == r:
+                    st[_NOBS, j] -= 1.0
+                    y = -r - st[_COMP_RM, j]
+                    s = st[_SUM, j] + y
+                    st[_COMP_RM, j] = s - st[_SUM, j] - y
+                    st[_SUM, j] = s
+                    if math.copysign(1.0, r) < 0:
+                        st[_NEG, j] -= 1.0
+                    if st[_NOBS, j] != 0.0:
+                        prev_mean = st[_MEAN, j] - st[_VCOMP_RM, j]
+                        y = r - st[_VCOMP_RM, j]
+                        s = y - st[_MEAN, j]
+                        st[_VCOMP_RM, j] = s + st[_MEAN, j] - y
+                        st[_MEAN, j] = st[_MEAN, j] - s / st[_NOBS, j]
+                        st[_SSQ, j] = st[_SSQ, j] - (r - prev_mean) * (r - st[_MEAN, j])
+                    else:
+                        st[_MEAN, j] = 0.0
+                        st[_SSQ, j] = 0.0
+            buf[slot, j] = x
+            if x == x:
+                st[_NOBS, j] += 1.0
+                y = x - st[_COMP_ADD, j]
+                s = st[_SUM, j] + y
+                st[_COMP_ADD, j] = s - st[_SUM, j] - y
+                st[_SUM, j] = s
+                if math.copysign(1.0, x) < 0:
+                    st[_NEG, j] += 1.0
+                # values repeated across the whole window give an exact mean / zero variance
+                if x == st[_PREV, j]:
+                    st[_SAME, j] += 1.0
+                else:
+                    st[_SAME, j] = 1.0
+                st[_PREV, j] = x
+                prev_mean = st[_MEAN, j] - st[_VCOMP_ADD, j]
+                y = x - st[_VCOMP_ADD, j]
+                s = y - st[_MEAN, j]
+                st[_VCOMP_ADD, j] = s + st[_MEAN, j] - y
+                st[_MEAN, j] = st[_MEAN, j] + s / st[_NOBS, j]
+                st[_SSQ, j] = st[_SSQ, j] + (x - prev_mean) * (x - st[_MEAN, j])
+                mean, std = _window_moments(st, j, L)
+                Z[i, j] = _div(x - mean, std)
+            else:
+                Z[i, j] = math.nan
+    return Z
+
+_zscore_kernel = None
+_kernel_checked = False
+
+def _get_zscore_kernel():
+    # numba-compiled _zscore_loop (optional accelerator), imported on first use
+    # (_div / _window_moments stay plain Python for the fallback and RollingZScore)
+    global _zscore_kernel, _kernel_checked
+    if not _kernel_checked:
+        _kernel_checked = True
+        try:
+            import numba  # noqa: F401
+        except ImportError:
+            return None
+        _zscore_kernel = _njit(_zscore_loop, _div=_njit(_div), _window_moments=_njit(_window_moments))
+    return _zscore_kernel
+
+def _rolling_zscore(X: np.ndarray, buf: np.ndarray, st: np.ndarray, count: int) -> np.ndarray:
+    kernel = _get_zscore_kernel()
+    if kernel is not None:
+        return kernel(np.ascontiguousarray(X, dtype=np.float64), buf, st, count)
+    return _zscore_loop(X, buf, st, count)
+
+class RollingZScore:
+    """
+    O(1)-per-bar equivalent of zscore(series, lookback).
+
+    Keeps the last `lookback` values in a ring buffer and the running sums
+    of the rolling mean and variance; each update is one step of the same
+    kernel ChunkedBacktest runs over blocks (see _zscore_loop), so replayed
+    output matches the batch series.
+    """
+
+    def __init__(self, lookback: int = 60):
+        self.lookback = int(lookback)
+        self._buf = np.full((self.lookback, 1), np.nan)
+        self._state = np.zeros((11, 1))
+        self._n = 0  # values seen
+
+    def update(self, x: float) -> float:
+        """
+        Push one value; returns its z-score (NaN until the window is full).
+        """
+        z = _rolling_zscore(np.array([[float(x)]]), self._buf, self._state, self._n)
+        self._n += 1
+        return float(z[0, 0])
+
+    @property
+    def mean(self) -> float:
+        return float(_window_moments(self._state, 0, self.lookback)[0])
+
+    @property
+    def std(self) -> float:
+        return float(_window_moments(self._state, 0, self.lookback)[1])
+
+class StreamingSignal:
+    """
+    Live counterpart of compute_spread -> zscore -> generate_signals for a
+    fixed hedge ratio. Feed bars with update(a, b); each call returns the new
+    position (+1 long spread, -1 short spread, 0 flat). Replaying a history
+    bar by bar reproduces generate_signals on the full series exactly.
+    """
+
+    def __init__(
+        self,
+        beta: float,
+        lookback: int = 60,
+        entry: float = 2.0,
+        exit: float = 0.0,
+        max_abs_z: Optional[float] = None,
+        cooldown: int = 0,
+    ):
+        self.beta = float(beta)
+        self.entry = float(entry)
+        self.exit = float(exit)
+        self.max_abs_z = math.nan if max_abs_z is None else float(max_abs_z)
+        self.cooldown = int(cooldown)
+        self.zscore = RollingZScore(lookback)
+        self.position = 0.0
+        self.z = math.nan
+        self.spread = math.nan
+        self._cd = 0
+        self._bars = 0
+
+    def update(self, a: float, b: float) -> float:
+        self.spread = float(a) - self.beta * float(b)
+        return self.update_spread(self.spread)
+
+    def update_spread(self, spread: float) -> float:
+        """
+        Same as update() for a precomputed spread value.
+        """
+        self.spread = float(spread)
+        self.z = self.zscore.update(self.spread)
+        if self._bars > 0:  # the batch loop leaves the first bar flat
+            self.position, self._cd = _signal_step(
+                self.position, self._cd, self.z, self.entry, self.exit, self.max_abs_z, self.cooldown
+            )
+        self._bars += 1
+        return self.position
+
+    def update_many(self, a, b) -> np.ndarray:
+        """
+        Feed arrays of bars in order; returns the position after each bar.
+        """
+        return np.array([self.update(x, y) for x, y in zip(np.asarray(a, dtype=float), np.asarray(b, dtype=float))])
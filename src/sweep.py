@@ -0,0 +1,75 @@
+# Parameter-grid sweeps over one pair
+from __future__ import annotations
+from itertools import product
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from .coint_test import engle_granger
+    from .signal_generator import compute_spread, zscore, generate_signals_array
+    from .backtester import PairsBacktester
+    from .metrics import MetricsAccumulator
+except ImportError:
+    from coint_test import engle_granger
+    from signal_generator import compute_spread, zscore, generate_signals_array
+    from backtester import PairsBacktester
+    from metrics import MetricsAccumulator
+
+def sweep(
+    df: pd.DataFrame,
+    lookback: Iterable[int] = (60,),
+    entry: Iterable[float] = (2.0,),
+    exit: Iterable[float] = (0.0,),
+    max_abs_z: Iterable[Optional[float]] = (None,),
+    cooldown: Iterable[int] = (0,),
+    beta: Optional[float | pd.Series] = None,
+    backtester: Optional[PairsBacktester] = None,
+    block_bytes: int = 16 * 2**20,
+) -> pd.DataFrame:
+    """
+    Evaluate every lookback x entry x exit x max_abs_z x cooldown combination
+    of the zscore -> generate_signals -> PairsBacktester.simulate pipeline.
+
+    The spread is built once, each lookback's rolling z-score once, and all
+    threshold combinations for that lookback go through one batched signal and
+    backtest pass. beta defaults to the Engle–Granger hedge ratio of df; a
+    time-varying Series (see hedge_ratio) is also accepted.
+    Returns one row per combination with the metrics module's statistics.
+    """
+    df = df[["A", "B"]].dropna()
+    bt = backtester if backtester is not None else PairsBacktester()
+    if beta is None:
+        beta = engle_granger(df).beta
+
+    spread = compute_spread(df, beta)
+    if isinstance(beta, pd.Series):
+        beta = beta.reindex(df.index).to_numpy(dtype=np.float64)[:, None]
+    pa, pb = df["A"].to_numpy(dtype=np.float64), df["B"].to_numpy(dtype=np.float64)
+    zs = ((L, zscore(spread, L).to_numpy(dtype=np.float64)) for L in lookback)
+    return _sweep_arrays(pa, pb, beta, zs, list(product(entry, exit, max_abs_z, cooldown)), bt, block_bytes)
+
+def _sweep_arrays(pa: np.ndarray, pb: np.ndarray, beta, zs: Iterable[tuple[int, np.ndarray]], grid: list,
+                  bt: PairsBacktester, block_bytes: int = 16 * 2**20) -> pd.DataFrame:
+    """
+    Core of sweep on arrays: zs yields (lookback, z-score array) and grid
+    holds (entry, exit, max_abs_z, cooldown) tuples.
+    """
+    E, X, M, C = (np.array(v, dtype=float) for v in zip(*grid))  # None -> NaN (no stop)
+    C = C.astype(np.int64)
+    n = len(pa)
+    step = max(1, block_bytes // (8 * 12 * max(n, 1)))  # ~12 (n, k) arrays live per block
+
+    frames = []
+    for L, z in zs:
+        for lo in range(0, len(grid), step):
+            cols = slice(lo, lo + step)
+            k = len(E[cols])
+            sig = generate_signals_array(np.broadcast_to(z[:, None], (n, k)), E[cols], X[cols], M[cols], C[cols])
+            pnl = bt._simulate_arrays(pa, pb, sig, beta)["pnl"]
+            stats = MetricsAccumulator(bt.capital, bt.ppy).update(pnl).result()
+            frames.append(pd.DataFrame({
+                "lookback": L, "entry": E[cols], "exit": X[cols],
+                "max_abs_z": M[cols], "cooldown": C[cols], **stats,
+            }))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,197 @@
+# Walk-forward optimization: fit on a train window, trade the test window after it
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from .coint_test import engle_granger
+    from .coint_cache import CointCache
+    from .signal_generator import generate_signals_array
+    from .backtester import PairsBacktester
+    from .metrics import MetricsAccumulator
+    from .sweep import _sweep_arrays
+except ImportError:
+    from coint_test import engle_granger
+    from coint_cache import CointCache
+    from signal_generator import generate_signals_array
+    from backtester import PairsBacktester
+    from metrics import MetricsAccumulator
+    from sweep import _sweep_arrays
+
+_PARAMS = ("lookback", "entry", "exit", "max_abs_z", "cooldown")
+
+def walk_forward_folds(n: int, train: int, test: int, mode: str = "rolling") -> List[tuple[int, int, int, int]]:
+    """
+    (train_start, train_end, test_start, test_end) bar ranges (end exclusive).
+    Test windows of `test` bars tile the history after the first `train`
+    bars (the last one may be shorter). Each is preceded by its train
+    window: the `train` bars right before it (mode="rolling") or every bar
+    since the start (mode="expanding").
+    """
+    if mode not in ("rolling", "expanding"):
+        raise ValueError(f"Unknown mode: {mode!r} (expected rolling or expanding)")
+    if train < 2 or test < 1:
+        raise ValueError(f"need train >= 2 and test >= 1 bars, got train={train}, test={test}")
+    return [(0 if mode == "expanding" else lo - train, lo, lo, min(lo + test, n)) for lo in range(train, n, test)]
+
+def rolling_moments(pa: np.ndarray, pb: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    (T, 5) rolling means of A and B, their variances and covariance (ddof=1)
+    over `lookback` bars. For any constant beta the spread A - beta*B has
+    rolling mean mean_a - beta*mean_b and variance
+    var_a + beta^2*var_b - 2*beta*cov_ab, so one table gives every fold's
+    z-score whatever hedge ratio the fold fits.
+    """
+    a, b = pd.Series(pa), pd.Series(pb)
+    ra, rb = a.rolling(lookback), b.rolling(lookback)
+    return np.column_stack([ra.mean(), rb.mean(), ra.var(), rb.var(), ra.cov(b)])
+
+def _zscore_from_moments(pa: np.ndarray, pb: np.ndarray, mom: np.ndarray, beta: float) -> np.ndarray:
+    # zscore(compute_spread(df, beta), lookback) from the rolling_moments table
+    mean = mom[:, 0] - beta * mom[:, 1]
+    var = mom[:, 2] + beta * beta * mom[:, 3] - 2.0 * beta * mom[:, 4]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (pa - beta * pb - mean) / np.sqrt(np.maximum(var, 0.0))
+
+def _fit_fold(values: np.ndarray, fold: tuple, lookbacks: tuple, grid: list, bt: PairsBacktester,
+              objective: str, cache) -> dict:
+    """
+    Engle–Granger beta and the best grid point (by objective) on the train
+    window, then that fit's z-score over the test window (signals are
+    generated by the caller, in fold order). values holds the A and B
+    prices followed by one rolling_moments table per lookback.
+    """
+    tr0, tr1, te0, te1 = fold
+    pa, pb = values[:, 0], values[:, 1]
+    mom = {L: values[:, 2 + 5 * i:7 + 5 * i] for i, L in enumerate(lookbacks)}
+    train = pd.DataFrame({"A": pa[tr0:tr1], "B": pb[tr0:tr1]})
+    eg = engle_granger(train, cache=cache)
+    beta = eg.beta
+
+    zs = ((L, _zscore_from_moments(pa[tr0:tr1], pb[tr0:tr1], mom[L][tr0:tr1], beta)) for L in lookbacks)
+    res = _sweep_arrays(pa[tr0:tr1], pb[tr0:tr1], beta, zs, grid, bt)
+    score = res[objective]
+    best = res.loc[score.idxmax() if score.notna().any() else 0]  # nothing traded: first grid point
+
+    L = int(best["lookback"])
+    z = _zscore_from_moments(pa[te0:te1], pb[te0:te1], mom[L][te0:te1], beta)
+    params = {k: float(best[k]) for k in _PARAMS}
+    params.update(lookback=L, cooldown=int(best["cooldown"]))
+    return {"beta": beta, "eg_pval": eg.pval, **params,
+            "train_score": float(best[objective]), "z": z}
+
+def _fit_chunk(shm_name: str, shape: tuple, folds: list, args: tuple) -> List[dict]:
+    """
+    Worker: attach to the shared price/moments matrix and fit some folds.
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        return [_fit_fold(values, f, *args) for f in folds]
+    finally:
+        values = None
+        shm.close()
+
+def _fit_parallel(values: np.ndarray, folds: list, args: tuple, n_jobs: int) -> List[dict]:
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            futs = [ex.submit(_fit_chunk, shm.name, values.shape, [f], args) for f in folds]
+            return [r for fut in futs for r in fut.result()]
+    finally:
+        shm.close()
+        shm.unlink()
+
+@dataclass
+class WalkForwardResult:
+    folds: pd.DataFrame          # one row per fold: windows, fitted beta/params, train score, test metrics
+    oos: Dict[str, pd.Series]    # stitched out-of-sample simulate() output, plus signal and beta
+    metrics: Dict[str, float]    # metrics of the stitched out-of-sample PnL
+
+def walk_forward(
+    df: pd.DataFrame,
+    train: int = 504,
+    test: int = 126,
+    mode: str = "rolling",
+    lookback: Iterable[int] = (60,),
+    entry: Iterable[float] = (2.0,),
+    exit: Iterable[float] = (0.0,),
+    max_abs_z: Iterable[Optional[float]] = (None,),
+    cooldown: Iterable[int] = (0,),
+    objective: str = "sharpe",
+    backtester: Optional[PairsBacktester] = None,
+    n_jobs: int = 1,
+    cache: CointCache | str | None = None,
+) -> WalkForwardResult:
+    """
+    Out-of-sample evaluation of the strategy with parameters refitted per fold.
+
+    For every fold (see walk_forward_folds) the Engle–Granger hedge ratio is
+    fitted and the lookback x entry x exit x max_abs_z x cooldown grid swept
+    (see sweep) on the train window; the grid point with the highest
+    `objective` (a sweep metric column) then trades the test window, its
+    z-score warmed up on the bars before it. Test windows are stitched into
+    one simulate() pass over the out-of-sample span. Signals are generated
+    fold by fold with the position and cooldown carried across boundaries,
+    so a trade open at the end of one test window continues (rebalanced,
+    and charged, at the new hedge ratio) until the next fit's exit rule
+    closes it.
+
+    Rolling moments of A and B are computed once per lookback over the whole
+    history and shared by all folds (see rolling_moments), so overlapping
+    windows are not recomputed. n_jobs > 1 (<= 0: all cores) fits folds in
+    a process pool over one shared-memory copy of prices and moments;
+    cache memoizes the per-fold Engle–Granger tests (see CointCache).
+    """
+    df = df[["A", "B"]].dropna()
+    bt = backtester if backtester is not None else PairsBacktester()
+    lookbacks = tuple(int(L) for L in lookback)
+    if max(lookbacks) >= train:
+        raise ValueError(f"train window ({train} bars) must be longer than the longest lookback ({max(lookbacks)})")
+    folds = walk_forward_folds(len(df), train, test, mode)
+    if not folds:
+        raise ValueError(f"need more than train={train} bars, got {len(df)}")
+
+    pa, pb = df["A"].to_numpy(dtype=np.float64), df["B"].to_numpy(dtype=np.float64)
+    values = np.column_stack([pa, pb, *(rolling_moments(pa, pb, L) for L in lookbacks)])
+    args = (lookbacks, list(product(entry, exit, max_abs_z, cooldown)), bt, objective, cache)
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs == 1 or len(folds) == 1:
+        fits = [_fit_fold(values, f, *args) for f in folds]
+    else:
+        fits = _fit_parallel(values, folds, args, n_jobs)
+
+    lo, hi = folds[0][2], folds[-1][3]
+    state: dict = {}  # position / cooldown carried from each test window into the next
+    sig = np.concatenate([
+        generate_signals_array(f["z"], f["entry"], f["exit"], f["max_abs_z"], f["cooldown"], state=state)
+        for f in fits
+    ])
+    beta = np.concatenate([np.full(te1 - te0, f["beta"]) for (_, _, te0, te1), f in zip(folds, fits)])
+    out = bt._simulate_arrays(pa[lo:hi], pb[lo:hi], sig[:, None], beta[:, None])
+    index = df.index[lo:hi]
+    oos = {k: pd.Series(v[:, 0], index=index, name=k) for k, v in out.items()}
+    oos["signal"] = pd.Series(sig, index=index, name="signal")
+    oos["beta"] = pd.Series(beta, index=index, name="beta")
+
+    rows = []
+    for k, ((tr0, tr1, te0, te1), f) in enumerate(zip(folds, fits)):
+        stats = MetricsAccumulator(bt.capital, bt.ppy).update(out["pnl"][te0 - lo:te1 - lo, 0]).result()
+        rows.append({
+            "fold": k, "train_start": df.index[tr0], "train_end": df.index[tr1 - 1],
+            "test_start": df.index[te0], "test_end": df.index[te1 - 1],
+            **{c: f[c] for c in ("beta", "eg_pval", *_PARAMS, "train_score")}, **stats,
+        })
+    metrics = MetricsAccumulator(bt.capital, bt.ppy).update(out["pnl"][:, 0]).result()
+    return WalkForwardResult(folds=pd.DataFrame(rows), oos=oos, metrics=metrics)
@@ -58,3 +58,57 @@ def test_signal_delay():
     assert bt["A_shares"].iloc[1] == 0
     # Third day should have position (signal from day 2, applied on day 3, signal is 1)
     assert bt["A_shares"].iloc[2] != 0
+
+def test_simulate_many_matches_simulate():
+    """Test that the vectorized multi-pair backtest reproduces simulate pair by pair."""
+    rng = np.random.default_rng(3)
+    idx = pd.date_range("2022-01-01", periods=300, freq="B")
+    pairs = ["P0", "P1", "P2", "P3"]
+    betas = np.array([0.8, 1.2, 0.5, 1.0])
+    legs = {}
+    for p in pairs:
+        legs[(p, "A")] = 50 + np.cumsum(rng.normal(0, 1, len(idx))) + 50
+        legs[(p, "B")] = 80 + np.cumsum(rng.normal(0, 1, len(idx))) + 20
+    prices = pd.DataFrame(legs, index=idx)
+    signals = pd.DataFrame(rng.choice([-1.0, 0.0, 1.0], size=(len(idx), len(pairs)), p=[0.2, 0.6, 0.2]),
+                           index=idx, columns=pairs)
+
+    bt = PairsBacktester(signal_delay=2, max_gross=900_000)
+    many = bt.simulate_many(prices, signals, betas)
+    for p, beta in zip(pairs, betas):
+        one = bt.simulate(prices[p], signals[p], beta)
+        for key, series in one.items():
+            np.testing.assert_allclose(many[key][p].to_numpy(), series.to_numpy(), rtol=1e-12, atol=1e-9)
+
+    # plain (T, N, 2) array input gives the same numbers
+    arr = np.stack([prices.xs("A", axis=1, level=1), prices.xs("B", axis=1, level=1)], axis=-1)
+    raw = bt.simulate_many(arr, signals.to_numpy(), betas)
+    np.testing.assert_allclose(raw["equity"].to_numpy(), many["equity"].to_numpy())
+
+def test_float32_mode_error_bounds():
+    """Test float32 prices/z/signals against the float64 path: small error, float64 money."""
+    from signal_generator import compute_spread, zscore, generate_signals
+
+    rng = np.random.default_rng(0)
+    n = 200_000
+    B = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    A = 5 + 0.8 * B + rng.normal(0, 0.3, n)
+    df64 = pd.DataFrame({"A": A, "B": B})
+    df32 = df64.astype(np.float32)
+
+    def run(df, dtype):
+        z = zscore(compute_spread(df, 0.8), 60)
+        sig = generate_signals(z, entry=2.0, exit=0.0, max_abs_z=4.0, cooldown=2)
+        return z, sig, PairsBacktester(dtype=dtype).simulate(df, sig, 0.8)
+
+    z64, s64, o64 = run(df64, np.float64)
+    z32, s32, o32 = run(df32, np.float32)
+    assert z32.dtype == s32.dtype == o32["A_shares"].dtype == np.float32
+    assert o32["pnl"].dtype == o32["equity"].dtype == np.float64
+    assert np.nanmax(np.abs(z32.to_numpy(np.float64) - z64.to_numpy())) < 1e-3
+    assert (s32.to_numpy() != s64.to_numpy()).mean() < 1e-4  # only z's within ~1e-4 of a threshold flip
+
+    # same signals: only the float32 prices/shares differ
+    same = PairsBacktester(dtype=np.float32).simulate(df32, s64, 0.8)
+    assert np.abs(same["pnl"] - o64["pnl"]).max() < 1e-6 * 1_000_000
+    assert abs(same["equity"].iloc[-1] - o64["equity"].iloc[-1]) < 1e-4 * o64["costs"].sum()
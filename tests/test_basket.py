@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from basket import johansen, basket_search
+from signal_generator import basket_spread, zscore, generate_signals
+from backtester import PairsBacktester
+
+def _panel(n=1200, seed=0):
+    # X0..X2 share two stochastic trends (one cointegrating vector); X3, X4 are random walks
+    rng = np.random.default_rng(seed)
+    c, d = np.cumsum(rng.normal(size=(2, n)), axis=1)
+    cols = {
+        "X0": 250 + c + rng.normal(size=n),
+        "X1": 230 + 0.5 * c + 0.8 * d + rng.normal(size=n),
+        "X2": 240 + d + rng.normal(size=n),
+        "X3": 260 + np.cumsum(rng.normal(size=n)),
+        "X4": 270 + np.cumsum(rng.normal(size=n)),
+    }
+    return pd.DataFrame(cols, index=pd.date_range("2020-01-01", periods=n, freq="B"))
+
+def test_johansen_matches_statsmodels():
+    """Test eigenvalues, statistics, critical values and weights against coint_johansen."""
+    from statsmodels.tsa.vector_ar.vecm import coint_johansen
+
+    px = _panel()[["X0", "X1", "X2"]]
+    for det_order, k in [(-1, 1), (0, 1), (0, 3), (1, 0)]:
+        res = johansen(px, det_order, k)
+        ref = coint_johansen(px.to_numpy(), det_order, k)
+        np.testing.assert_allclose(res.eig, ref.eig, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(res.trace_stat, ref.lr1, rtol=1e-9)
+        np.testing.assert_allclose(res.max_eig_stat, ref.lr2, rtol=1e-9)
+        np.testing.assert_allclose(res.trace_crit, ref.cvt)
+        np.testing.assert_allclose(res.weights, ref.evec[:, 0] / ref.evec[0, 0], rtol=1e-8)
+    assert johansen(px).rank == 1
+
+def test_basket_search_uses_submatrices():
+    """Test that every searched basket equals a standalone Johansen test and the planted one ranks first."""
+    px = _panel()
+    res = basket_search(px, size=3)
+    assert len(res) == 10
+    assert res.loc[0, "legs"] == ("X0", "X1", "X2") and res.loc[0, "rank"] == 1
+    for _, row in res.iterrows():
+        ref = johansen(px[list(row["legs"])])
+        np.testing.assert_allclose(row["trace_stat"], ref.trace_stat[0], rtol=1e-9)
+        np.testing.assert_allclose(row["weights"], ref.weights, rtol=1e-8)
+
+    mixed = basket_search(px, groups=[["X2", "X0"], ["X0", "X1", "X2", "X3"]])
+    assert sorted(len(g) for g in mixed["legs"]) == [2, 4]
+
+def test_simulate_basket_pnl_is_spread_change():
+    """Test that without costs the basket PnL is position units times the spread change."""
+    px = _panel()[["X0", "X1", "X2"]]
+    w = johansen(px).weights
+    spread = basket_spread(px, w)
+    sig = generate_signals(zscore(spread, 40), entry=1.5, exit=0.0)
+    bt = PairsBacktester(tc_bps=0.0, slippage_bps=0.0, short_borrow_apr=0.0)
+    out = bt.simulate_basket(px, sig, w)
+
+    units = (bt.capital / (px.to_numpy() @ np.abs(w))) * sig.shift(1).fillna(0.0).to_numpy()
+    expected = np.concatenate([[0.0], units[:-1] * np.diff(spread.to_numpy())])
+    np.testing.assert_allclose(out["pnl"].to_numpy(), expected, atol=1e-6)
+    np.testing.assert_allclose(out["shares"].to_numpy(), units[:, None] * w)
+
+    costly = PairsBacktester().simulate_basket(px, sig, w)
+    assert (costly["costs"] >= 0).all() and costly["costs"].sum() > 0 and costly["borrow"].sum() > 0
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from bootstrap import resample_indices, bootstrap_metrics, probabilistic_sharpe_ratio, deflated_sharpe_ratio
+from metrics import sharpe_ratio, max_drawdown
+
+def _pnl(n=750, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.normal(300, 5000, n))
+
+def test_resample_indices_blocks():
+    """Test index range, fixed block runs and the mean stationary block length."""
+    n, R = 500, 400
+    fixed = resample_indices(n, R, 10, "block", np.random.default_rng(1))
+    assert fixed.shape == (n, R) and fixed.min() >= 0 and fixed.max() < n
+    steps = np.diff(fixed, axis=0)
+    inside = np.arange(1, n) % 10 != 0
+    assert ((steps[inside] == 1) | (steps[inside] == 1 - n)).all()
+
+    stat = resample_indices(n, R, 10, "stationary", np.random.default_rng(1))
+    assert stat.min() >= 0 and stat.max() < n
+    breaks = ~np.isin(np.diff(stat, axis=0), (1, 1 - n))
+    assert abs(n / (1 + breaks.sum(axis=0).mean()) - 10) < 1.0
+
+def test_bootstrap_reproducible_and_consistent():
+    """Test estimate vs the metric functions, CI bracketing and seed reproducibility across n_jobs."""
+    pnl = _pnl()
+    res = bootstrap_metrics(pnl, n_resamples=600, seed=7, batch_bytes=8 * len(pnl) * 100)
+    assert res.samples.shape == (600, 5)
+    np.testing.assert_allclose(res.estimate["sharpe"], sharpe_ratio(pnl), rtol=1e-10)
+    np.testing.assert_allclose(res.estimate["max_drawdown"], max_drawdown(pnl.cumsum()), rtol=1e-10)
+
+    ci = res.ci(0.9)
+    assert (ci["lo"] <= ci["hi"]).all()
+    assert ci.loc["sharpe", "lo"] < ci.loc["sharpe", "estimate"] < ci.loc["sharpe", "hi"]
+
+    again = bootstrap_metrics(pnl, n_resamples=600, seed=7, batch_bytes=8 * len(pnl) * 100, n_jobs=2)
+    pd.testing.assert_frame_equal(res.samples, again.samples)
+
+def test_deflated_sharpe_below_probabilistic():
+    """Test that PSR is in (0, 1) and deflating for many trials lowers it."""
+    pnl = _pnl(1000, seed=3)
+    psr = probabilistic_sharpe_ratio(pnl)
+    trials = np.random.default_rng(0).normal(0.0, 0.5, 200)
+    dsr = deflated_sharpe_ratio(pnl, trials)
+    assert 0.0 < dsr < psr < 1.0
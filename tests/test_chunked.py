@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from chunked import ChunkedBacktest, iter_npy_blocks, iter_parquet_blocks
+from streaming import _zscore_loop, _rolling_zscore
+from signal_generator import compute_spread, zscore, generate_signals
+from backtester import PairsBacktester
+from metrics import MetricsAccumulator
+
+def _panel(T=600, N=4, seed=0):
+    rng = np.random.default_rng(seed)
+    B = 50 + np.cumsum(rng.normal(size=(T, N)), axis=0)
+    A = 1.3 * B + np.cumsum(rng.normal(0, 0.3, (T, N)), axis=0) + 5
+    A[100:140, 1], B[100:140, 1] = A[99, 1], B[99, 1]  # flat stretch -> zero std
+    return A, B, np.linspace(1.1, 1.5, N)
+
+def _in_memory(A, B, betas, bt):
+    out = {"z": [], "signal": [], "pnl": [], "equity": []}
+    for j in range(A.shape[1]):
+        df = pd.DataFrame({"A": A[:, j], "B": B[:, j]})
+        z = zscore(compute_spread(df, betas[j]), 30)
+        sig = generate_signals(z, entry=1.5, exit=0.2, max_abs_z=3.5, cooldown=2)
+        res = bt.simulate(df, sig, betas[j])
+        for k, v in (("z", z), ("signal", sig), ("pnl", res["pnl"]), ("equity", res["equity"])):
+            out[k].append(v.to_numpy())
+    return {k: np.column_stack(v) for k, v in out.items()}
+
+def test_chunked_matches_in_memory():
+    """Test that any block size reproduces the full-history pipeline exactly."""
+    A, B, betas = _panel()
+    bt = PairsBacktester(max_gross=1.5e6)
+    expected = _in_memory(A, B, betas, bt)
+    for rows in (1, 29, 30, 97, 600):
+        cb = ChunkedBacktest(betas, lookback=30, entry=1.5, exit=0.2, max_abs_z=3.5, cooldown=2, backtester=bt)
+        blocks = [cb.step(A[lo:lo + rows], B[lo:lo + rows]) for lo in range(0, len(A), rows)]
+        for k, v in expected.items():
+            np.testing.assert_array_equal(np.vstack([b[k] for b in blocks]), v, err_msg=f"{k} rows={rows}")
+
+def test_chunked_run_from_npy(tmp_path):
+    """Test streaming memory-mapped .npy blocks through run() with a sink."""
+    A, B, betas = _panel(seed=1)
+    np.save(tmp_path / "A.npy", A)
+    np.save(tmp_path / "B.npy", B)
+    bt = PairsBacktester()
+    expected = _in_memory(A, B, betas, bt)
+
+    pnl = []
+    cb = ChunkedBacktest(betas, lookback=30, entry=1.5, exit=0.2, max_abs_z=3.5, cooldown=2, backtester=bt)
+    stats = cb.run(iter_npy_blocks(tmp_path / "A.npy", tmp_path / "B.npy", chunk_rows=128),
+                   sink=lambda idx, out: pnl.append(out["pnl"]))
+    np.testing.assert_array_equal(np.vstack(pnl), expected["pnl"])
+    ref = MetricsAccumulator().update(expected["pnl"]).result()
+    for k in ref:
+        np.testing.assert_allclose(stats[k], ref[k], rtol=1e-10)
+
+def test_chunked_run_from_parquet(tmp_path):
+    """Test streaming a Parquet file one row group at a time."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    A, B, betas = _panel(seed=3)
+    cols = {**{f"A{j}": A[:, j] for j in range(4)}, **{f"B{j}": B[:, j] for j in range(4)}}
+    cols["t"] = np.arange(len(A))
+    pq.write_table(pa.table(cols), tmp_path / "px.parquet", row_group_size=100)
+    bt = PairsBacktester()
+    expected = _in_memory(A, B, betas, bt)
+
+    pnl, index = [], []
+    blocks = iter_parquet_blocks(tmp_path / "px.parquet", [f"A{j}" for j in range(4)],
+                                 [f"B{j}" for j in range(4)], index_col="t")
+    cb = ChunkedBacktest(betas, lookback=30, entry=1.5, exit=0.2, max_abs_z=3.5, cooldown=2, backtester=bt)
+    cb.run(blocks, sink=lambda idx, out: (index.append(idx), pnl.append(out["pnl"])))
+    assert len(pnl) == 6
+    np.testing.assert_array_equal(np.concatenate(index), np.arange(len(A)))
+    np.testing.assert_array_equal(np.vstack(pnl), expected["pnl"])
+
+def test_block_zscore_matches_zscore():
+    """Test that the block z-score kernel (Python and compiled) matches zscore() per column."""
+    A, B, betas = _panel(T=300, N=40, seed=2)
+    S = A - betas * B
+    S[50:60, 3] = np.nan
+    expected = np.column_stack([zscore(pd.Series(S[:, j]), 30).to_numpy() for j in range(40)])
+    for fn in (_zscore_loop, _rolling_zscore):
+        buf, st = np.full((30, 40), np.nan), np.zeros((11, 40))
+        z = np.vstack([fn(S[lo:lo + 45], buf, st, lo) for lo in range(0, 300, 45)])
+        np.testing.assert_array_equal(z, expected)
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from cli import expand_configs, run_batch, main
+
+def _write_pair(tmp_path, n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="B")
+    B = 100 + np.cumsum(rng.normal(size=n))
+    A = 10 + 0.8 * B + rng.normal(scale=1.0, size=n)
+    for name, px in (("a", A), ("b", B)):
+        pd.DataFrame({"Date": idx, "Adj Close": px}).to_csv(tmp_path / f"{name}.csv", index=False)
+
+def _config(tmp_path, **strategy):
+    return {
+        "data": {"source": "csv", "csv1": str(tmp_path / "a.csv"), "csv2": str(tmp_path / "b.csv"),
+                 "start": None, "end": None},
+        "strategy": {"lookback": 30, "entry": 2.0, "exit": 0.0, "max_abs_z": 4.0, "cooldown": 0, **strategy},
+        "execution": {"tc_bps": 1.0, "slippage_bps": 0.5, "short_borrow_apr": 0.02, "capital": 1_000_000,
+                      "signal_delay": 1},
+    }
+
+def test_batch_runs_configs_once_per_dataset(tmp_path):
+    """Test batch expansion (dir + strategies list), shared loads, error rows and serial == pool results."""
+    _write_pair(tmp_path)
+    cdir = tmp_path / "configs"
+    cdir.mkdir()
+    with open(cdir / "single.yaml", "w") as f:
+        yaml.safe_dump(_config(tmp_path, hedge_ratio="rolling"), f)
+    multi = _config(tmp_path)
+    multi["strategies"] = [{"name": "fast", "lookback": 10}, {"execution": {"tc_bps": 20.0}},
+                           {"name": "bad", "data": {"csv1": str(tmp_path / "missing.csv")}}]
+    with open(cdir / "multi.yaml", "w") as f:
+        yaml.safe_dump(multi, f)
+
+    runs = expand_configs([str(cdir)])
+    assert [r[0] for r in runs] == ["fast", "multi[1]", "bad", "single"]
+    assert runs[0][2]["strategy"]["lookback"] == 10 and runs[1][2]["execution"]["tc_bps"] == 20.0
+
+    res = run_batch(runs)
+    assert res.attrs["datasets"] == 2
+    assert res["error"].notna().tolist() == [False, False, True, False]
+    ok = res[res["error"].isna()]
+    assert ok["eg_pval"].nunique() == 1 and (ok["bars"] == 400).all()
+    assert np.isfinite(ok[["sharpe", "sortino", "max_drawdown", "hit_rate"]].to_numpy()).all()
+
+    par = run_batch(runs, n_jobs=2, chunk_size=1)
+    pd.testing.assert_frame_equal(res, par)
+
+def test_batch_cli_progress(tmp_path, capsys):
+    """Test that `batch --progress` reports finished runs on stderr."""
+    _write_pair(tmp_path)
+    cfg = _config(tmp_path)
+    cfg["strategies"] = [{"lookback": 10}, {"lookback": 20}, {"lookback": 30}]
+    with open(tmp_path / "grid.yaml", "w") as f:
+        yaml.safe_dump(cfg, f)
+
+    assert main(["batch", str(tmp_path / "grid.yaml"), "--progress"]) == 0
+    err = capsys.readouterr().err
+    assert "\r3/3 runs\n" in err and "1/3 runs" in err
@@ -1,12 +1,15 @@
 import numpy as np
 import pandas as pd
+import pytest
 import sys
 from pathlib import Path
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from coint_test import hedge_ratio_ols, engle_granger, scan_pairs_for_coint
+from coint_test import hedge_ratio_ols, engle_granger, scan_pairs_for_coint, rolling_coint, coint_gate, adf_test
+from coint_cache import CointCache
+from pair_filter import candidate_pairs
 
 def test_beta_close_to_true():
     """Test that OLS hedge ratio is close to true relationship."""
@@ -36,6 +39,25 @@ def test_eg_pval_high_on_non_coint():
     res = engle_granger(df)
     assert res.pval > 0.05, f"P-value {res.pval} should be > 0.05 for non-cointegrated series"
 
+def test_adf_matches_statsmodels():
+    """Test adf_test against statsmodels.adfuller(autolag="AIC") across lengths and persistence."""
+    from statsmodels.tsa.stattools import adfuller
+
+    rng = np.random.default_rng(5)
+    for n in (60, 500, 3000):
+        for phi in (0.3, 0.95, 1.0):
+            e = rng.standard_t(5, n)
+            x = np.full(n, 20.0)
+            for t in range(1, n):
+                x[t] = 20.0 + phi * (x[t - 1] - 20.0) + e[t]
+            stat, pval, usedlag, nobs = adf_test(x)
+            ref = adfuller(x, autolag="AIC")
+            assert (usedlag, nobs) == (ref[2], ref[3])
+            np.testing.assert_allclose(stat, ref[0], rtol=1e-9)
+            np.testing.assert_allclose(pval, ref[1], rtol=1e-9, atol=1e-12)
+    with pytest.raises(ValueError):
+        adf_test(np.arange(3.0))
+
 def test_scan_pairs():
     """Test pair scanning functionality."""
     # Create test data with one cointegrated pair
@@ -63,3 +85,153 @@ def test_scan_pairs():
     assert len(results) > 0, "No pairs found"
     assert results.iloc[0]["A"] == "STOCK_A" or results.iloc[0]["B"] == "STOCK_A", "Cointegrated pair not found first"
     assert results.iloc[0]["pval"] < 0.05, "Best pair should be cointegrated"
+
+def test_scan_pairs_batch_matches_loop():
+    """Test that the batched scan reproduces the pair-by-pair Engle-Granger results."""
+    rng = np.random.default_rng(1)
+    n = 400
+    B = np.cumsum(rng.normal(size=n))
+    df = pd.DataFrame({
+        "A": 1.5 * B + rng.normal(scale=0.5, size=n),
+        "B": B,
+        "C": np.cumsum(rng.normal(size=n)),
+        "D": 0.5 * B + rng.normal(scale=0.3, size=n),
+        "E": np.cumsum(rng.normal(size=n)),
+    })
+    df.iloc[:30, 2] = np.nan   # late listing
+    df.iloc[200:210, 3] = np.nan  # data gap
+    df.iloc[:370, 4] = np.nan  # too short -> skipped
+
+    loop = scan_pairs_for_coint(df)
+    batch = scan_pairs_for_coint(df, method="batch")
+
+    assert len(batch) == len(loop) == 6
+    merged = loop.merge(batch, on=["A", "B"], suffixes=("_loop", "_batch"))
+    for col in ["pval", "beta", "r2", "adf_stat"]:
+        np.testing.assert_allclose(merged[f"{col}_batch"], merged[f"{col}_loop"], rtol=1e-8, atol=1e-10)
+
+def test_scan_pairs_parallel():
+    """Test that the process-pool scan merges chunks and reports failing pairs."""
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(np.cumsum(rng.normal(size=(300, 6)), axis=0), columns=list("ABCDEF"))
+    df["FLAT"] = 1.0  # engle_granger cannot fit a constant leg
+
+    with pytest.warns(UserWarning):
+        serial = scan_pairs_for_coint(df, method="batch")
+    seen = []
+    with pytest.warns(UserWarning):
+        par = scan_pairs_for_coint(df, method="batch", n_jobs=2, chunk_size=4,
+                                   progress=lambda done, total: seen.append((done, total)))
+    pd.testing.assert_frame_equal(par, serial)
+    assert seen[-1] == (21, 21)
+
+    with pytest.warns(UserWarning):
+        loop = scan_pairs_for_coint(df, n_jobs=2)
+    assert len(loop) == len(serial) == 15
+    assert loop.attrs["failed"] == serial.attrs["failed"] == par.attrs["failed"]
+    assert [(f["A"], f["B"]) for f in loop.attrs["failed"]] == [(c, "FLAT") for c in "ABCDEF"]
+
+def test_scan_pairs_serial_loop_reports_failures():
+    """Test that the default serial scan lists failing pairs instead of raising."""
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(np.cumsum(rng.normal(size=(300, 4)), axis=0), columns=list("ABCD"))
+    df["FLAT"] = 1.0
+
+    with pytest.warns(UserWarning):
+        out = scan_pairs_for_coint(df)
+    pd.testing.assert_frame_equal(out, scan_pairs_for_coint(df.drop(columns="FLAT")))
+    assert [(f["A"], f["B"]) for f in out.attrs["failed"]] == [(c, "FLAT") for c in "ABCD"]
+
+def test_scan_serial_batch_isolates_failures(monkeypatch):
+    """Test that a serial batch chunk that raises is rerun pair by pair, with progress per chunk."""
+    import coint_test
+
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(np.cumsum(rng.normal(size=(300, 5)), axis=0), columns=list("ABCDE"))
+    expected = scan_pairs_for_coint(df, method="batch")
+
+    def broken(values, pairs, **kw):
+        raise np.linalg.LinAlgError("boom")
+    monkeypatch.setattr(coint_test, "_eg_batch", broken)
+    seen = []
+    out = scan_pairs_for_coint(df, method="batch", chunk_size=3, progress=lambda d, t: seen.append((d, t)))
+    pd.testing.assert_frame_equal(out[["A", "B"]], expected[["A", "B"]])
+    np.testing.assert_allclose(out["pval"], expected["pval"], rtol=1e-8, atol=1e-10)
+    assert out.attrs["failed"] == []
+    assert seen == [(3, 10), (6, 10), (9, 10), (10, 10)]
+
+def test_rolling_coint_matches_window_refits():
+    """Test that walk-forward windows reproduce engle_granger on each slice."""
+    rng = np.random.default_rng(3)
+    n = 700
+    idx = pd.date_range("2015-01-01", periods=n, freq="B")
+    B = 50 + np.cumsum(rng.normal(size=n))
+    A = 10 + 1.5 * B + rng.normal(scale=0.5, size=n)
+    A[400:] += np.cumsum(rng.normal(size=n - 400))  # relationship breaks down
+    df = pd.DataFrame({"A": A, "B": B}, index=idx)
+
+    roll = rolling_coint(df, window=200, step=50)
+    assert list(roll.index) == list(idx[199::50])
+    for end, row in roll.iterrows():
+        ref = engle_granger(df.loc[row["start"]:end])
+        for col in ["beta", "pval", "adf_stat", "r2", "resid_std"]:
+            assert abs(row[col] - getattr(ref, col)) < 1e-8
+
+    par = rolling_coint(df, window=200, step=50, n_jobs=2, chunk_size=3)
+    pd.testing.assert_frame_equal(par, roll)
+
+    gate = coint_gate(roll, idx)
+    assert not gate.iloc[:199].any()
+    assert gate.iloc[199] and not gate.iloc[-1]
+
+def test_coint_cache_reuses_results(tmp_path):
+    """Test cached scans match uncached ones, persist to disk and are shared with engle_granger."""
+    rng = np.random.default_rng(3)
+    n = 400
+    common = np.cumsum(rng.normal(size=n))
+    px = pd.DataFrame({f"S{i}": (1 + i / 4) * common + rng.normal(scale=0.5 + i / 4, size=n) for i in range(5)})
+    px.iloc[:30, 2] = np.nan
+
+    base = scan_pairs_for_coint(px)
+    cache = CointCache(tmp_path)
+    pd.testing.assert_frame_equal(scan_pairs_for_coint(px, cache=cache), base)
+    assert cache.stats == {"hits": 0, "disk_hits": 0, "misses": 10, "writes": 10}
+    pd.testing.assert_frame_equal(scan_pairs_for_coint(px, cache=cache), base)
+    assert cache.stats["hits"] == 10 and cache.stats["disk_hits"] == 0
+
+    fresh = CointCache(tmp_path)  # new process: memory tier empty, disk tier warm
+    pd.testing.assert_frame_equal(scan_pairs_for_coint(px, cache=fresh, n_jobs=2), base)
+    assert fresh.stats["disk_hits"] == 10 and fresh.stats["misses"] == 0
+
+    df = px[["S0", "S2"]].dropna().rename(columns={"S0": "A", "S2": "B"})
+    assert engle_granger(df, cache=fresh) == engle_granger(df)
+    assert fresh.stats["hits"] == 11 and len(fresh) == 10
+    # the batch engine is keyed separately from engle_granger
+    scan_pairs_for_coint(px, method="batch", cache=fresh)
+    assert fresh.stats["misses"] == 10 and len(fresh) == 20
+
+def test_scan_prefilter_prunes_unrelated_pairs():
+    """Test correlation/cluster pre-filtering keeps related pairs, matches the full scan on them and records pruning."""
+    rng = np.random.default_rng(4)
+    n = 500
+    f1, f2 = np.cumsum(rng.normal(size=(2, n)), axis=1) + 100
+    px = pd.DataFrame({
+        "A1": f1 + rng.normal(scale=0.3, size=n), "A2": 1.2 * f1 + rng.normal(scale=0.3, size=n),
+        "A3": 0.8 * f1 + rng.normal(scale=0.3, size=n),
+        "B1": f2 + rng.normal(scale=0.3, size=n), "B2": 1.5 * f2 + rng.normal(scale=0.3, size=n),
+    })
+    full = scan_pairs_for_coint(px)
+
+    for kw in ({"min_corr": 0.3}, {"min_corr": -1.0, "clusters": "hierarchical", "n_clusters": 2},
+               {"min_corr": -1.0, "clusters": {"A1": "x", "A2": "x", "A3": "x", "B1": "y", "B2": "y"}}):
+        res = scan_pairs_for_coint(px, prefilter=kw)
+        assert {tuple(sorted(p)) for p in res[["A", "B"]].values} == \
+            {("A1", "A2"), ("A1", "A3"), ("A2", "A3"), ("B1", "B2")}
+        merged = res.merge(full, on=["A", "B"], suffixes=("", "_full"))
+        np.testing.assert_allclose(merged["pval"], merged["pval_full"])
+        assert res.attrs["prefilter"]["pairs_total"] == 10
+        assert res.attrs["prefilter"]["pruning_ratio"] == pytest.approx(0.6)
+
+    top1 = candidate_pairs(px, min_corr=0.3, top_k=1)
+    assert len(top1) <= 4 and top1.attrs["prefilter"]["pairs_kept"] == len(top1)
+    assert top1["corr"].is_monotonic_decreasing
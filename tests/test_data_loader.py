@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from data_loader import get_prices, get_price_panel
+from price_cache import PriceCache
+
+class StubDownloader:
+    """Deterministic offline stand-in for yf.download that records its calls."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start, end, price_col):
+        self.calls.append((tuple(tickers), None if start is None else pd.Timestamp(start), pd.Timestamp(end)))
+        first = pd.Timestamp("2019-01-01") if start is None else start  # start=None: full history
+        idx = pd.bdate_range(first, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        base = (idx - pd.Timestamp("2020-01-01")).days.to_numpy(dtype=float)
+        return pd.DataFrame({t: 100.0 + k + base for k, t in enumerate(tickers)}, index=idx)
+
+def _write_csv(path, n=30, offset=0.0):
+    idx = pd.bdate_range("2021-01-01", periods=n)
+    pd.DataFrame({"Date": idx, "Adj Close": np.arange(n) + offset, "Close": 1.0}).to_csv(path, index=False)
+
+def test_cache_fetches_only_missing_ranges(tmp_path):
+    """Test that extending a cached range downloads only the uncovered tail."""
+    stub = StubDownloader()
+    cfg = {"ticker1": "XOM", "ticker2": "CVX", "start": "2020-01-01", "end": "2020-03-01"}
+    cache = PriceCache(tmp_path)
+
+    first = get_prices(cfg, cache=cache, downloader=stub)
+    assert stub.calls == [(("XOM", "CVX"), pd.Timestamp("2020-01-01"), pd.Timestamp("2020-03-01"))]
+
+    again = get_prices(cfg, cache=PriceCache(tmp_path), downloader=stub)  # reloads manifest from disk
+    pd.testing.assert_frame_equal(first, again)
+    assert len(stub.calls) == 1
+
+    longer = get_prices({**cfg, "end": "2020-05-01"}, cache=cache, downloader=stub)
+    assert stub.calls[-1] == (("XOM", "CVX"), pd.Timestamp("2020-03-01"), pd.Timestamp("2020-05-01"))
+    uncached = get_prices({**cfg, "end": "2020-05-01"}, downloader=stub)
+    pd.testing.assert_frame_equal(longer, uncached)
+
+def test_cache_disjoint_requests_leave_no_hole(tmp_path):
+    """Test that requests before or after the cached range also fetch the gap between."""
+    stub = StubDownloader()
+    cfg = {"ticker1": "XOM", "ticker2": "CVX"}
+    cache = PriceCache(tmp_path)
+    get_prices(cfg, start="2020-01-01", end="2020-02-01", cache=cache, downloader=stub)
+    get_prices(cfg, start="2020-06-01", end="2020-07-01", cache=cache, downloader=stub)
+    assert stub.calls[-1][1:] == (pd.Timestamp("2020-02-01"), pd.Timestamp("2020-07-01"))
+
+    full = get_prices(cfg, start="2020-01-01", end="2020-07-01", cache=cache, downloader=stub)
+    assert len(stub.calls) == 2
+    pd.testing.assert_index_equal(full.index, pd.bdate_range("2020-01-01", "2020-06-30"), check_names=False)
+
+    get_prices(cfg, start="2019-01-01", end="2019-02-01", cache=cache, downloader=stub)
+    assert stub.calls[-1][1:] == (pd.Timestamp("2019-01-01"), pd.Timestamp("2020-01-01"))
+    assert len(get_prices(cfg, start="2019-01-01", end="2020-07-01", cache=cache, downloader=stub)) == len(
+        pd.bdate_range("2019-01-01", "2020-06-30"))
+    assert len(stub.calls) == 3
+
+def test_cache_csv_invalidation_and_lru(tmp_path):
+    """Test CSV re-parsing on file change, explicit invalidation and LRU eviction."""
+    c1, c2 = tmp_path / "a.csv", tmp_path / "b.csv"
+    _write_csv(c1)
+    _write_csv(c2, offset=5.0)
+    cache = PriceCache(tmp_path / "cache")
+
+    df = get_prices(csv1=str(c1), csv2=str(c2), cache=cache)
+    assert cache.stats["misses"] == 2
+    get_prices(csv1=str(c1), csv2=str(c2), cache=cache)
+    assert cache.stats["hits"] == 2
+    np.testing.assert_array_equal(df["B"].to_numpy(), np.arange(30) + 5.0)
+
+    _write_csv(c1, n=40, offset=1.0)  # file changed -> re-parsed
+    df = get_prices(csv1=str(c1), csv2=str(c2), cache=cache)
+    assert cache.stats["misses"] == 3
+    assert df["A"].iloc[0] == 1.0
+
+    assert cache.invalidate(ticker=str(c2)) == 1
+    get_prices(csv1=str(c1), csv2=str(c2), cache=cache)
+    assert cache.stats["misses"] == 4
+
+    small = PriceCache(tmp_path / "small", max_bytes=1)  # room for the entries in use only
+    small.get_csv(c1)
+    small.get_csv(c2)
+    assert small.stats["evictions"] == 1
+    assert len(small) == 1
+
+def test_cache_open_start_passes_none(tmp_path):
+    """Test that start=None stays open-ended: passed to the downloader as None, then served from cache."""
+    stub = StubDownloader()
+    cache = PriceCache(tmp_path)
+    full = cache.get_downloaded(["XOM"], None, "2020-02-01", stub)
+    assert stub.calls == [(("XOM",), None, pd.Timestamp("2020-02-01"))]
+    assert full.index[0] == pd.Timestamp("2019-01-01")
+    part = cache.get_downloaded(["XOM"], "2019-06-03", "2020-02-01", stub)
+    pd.testing.assert_frame_equal(part, full.loc["2019-06-03":])
+    cache.get_downloaded(["XOM"], None, "2020-03-02", stub)
+    assert stub.calls[-1] == (("XOM",), pd.Timestamp("2020-02-01"), pd.Timestamp("2020-03-02"))
+    assert len(stub.calls) == 2
+
+def _fill_cache(root, tickers):
+    return PriceCache(root).get_downloaded(tickers, "2020-01-01", "2020-03-01", StubDownloader()).shape
+
+def test_cache_shared_between_processes(tmp_path):
+    """Test that processes writing one cache directory at once keep every entry."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    groups = [[f"T{i}{j}" for j in range(3)] for i in range(4)]
+    with ProcessPoolExecutor(4) as ex:
+        list(ex.map(_fill_cache, [tmp_path] * len(groups), groups))
+    cache = PriceCache(tmp_path)
+    assert len(cache) == 12
+    stub = StubDownloader()
+    cache.get_downloaded(sum(groups, []), "2020-01-01", "2020-03-01", stub)
+    assert stub.calls == [] and cache.stats["hits"] == 12
+
+def test_get_prices_dtype(tmp_path):
+    """Test that get_prices returns prices in the requested dtype (float64 by default)."""
+    c1, c2 = tmp_path / "a.csv", tmp_path / "b.csv"
+    _write_csv(c1)
+    _write_csv(c2, offset=5.0)
+
+    assert (get_prices(csv1=str(c1), csv2=str(c2)).dtypes == np.float64).all()
+    df = get_prices({"csv1": str(c1), "csv2": str(c2), "dtype": "float32"})
+    assert (df.dtypes == np.float32).all()
+    np.testing.assert_array_equal(df["B"].to_numpy(), np.arange(30, dtype=np.float32) + 5.0)
+
+def test_price_panel_from_csv_dir(tmp_path):
+    """Test that a CSV directory loads into one aligned, forward-filled wide panel."""
+    _write_csv(tmp_path / "AAA.csv", n=30)
+    _write_csv(tmp_path / "BBB.csv", n=30, offset=10.0)
+    late = pd.read_csv(tmp_path / "BBB.csv").iloc[10:].drop(index=15)  # late listing + one gap
+    late.to_csv(tmp_path / "CCC.csv", index=False)
+
+    panel = get_price_panel(csv_dir=tmp_path, dtype=np.float32)
+    assert list(panel.columns) == ["AAA", "BBB", "CCC"]
+    assert panel.dtypes.eq(np.float32).all()
+    assert len(panel) == 30
+    assert panel["CCC"].iloc[:10].isna().all()
+    assert panel["CCC"].iloc[5 + 10] == panel["CCC"].iloc[4 + 10]  # gap forward-filled
+    assert panel.attrs["nbytes"] == panel.memory_usage(index=True).sum()
+
+    pair = get_prices(csv1=str(tmp_path / "AAA.csv"), csv2=str(tmp_path / "BBB.csv"))
+    np.testing.assert_allclose(panel[["AAA", "BBB"]].to_numpy(), pair.to_numpy())
+
+    # end is exclusive, as on the download path
+    window = get_price_panel(csv_dir=tmp_path, start="2021-01-05", end="2021-01-08")
+    pd.testing.assert_index_equal(window.index, pd.bdate_range("2021-01-05", "2021-01-07"), check_names=False)
+
+def test_price_panel_batched_download():
+    """Test that tickers are downloaded in batches and returned in request order."""
+    stub = StubDownloader()
+    tickers = [f"T{i}" for i in range(7)]
+    panel = get_price_panel(tickers, start="2020-01-01", end="2020-02-01", downloader=stub, batch_size=3)
+    assert list(panel.columns) == tickers
+    assert sorted(len(c[0]) for c in stub.calls) == [1, 3, 3]
+
+def test_price_panel_warns_on_missing_tickers():
+    """Test that tickers the downloader returns nothing for become NaN columns with a warning naming them."""
+    stub = StubDownloader()
+
+    def partial(tickers, start, end, price_col):
+        return stub([t for t in tickers if t != "GONE"], start, end, price_col)
+
+    with pytest.warns(UserWarning, match=r"\['GONE'\]"):
+        panel = get_price_panel(["T0", "GONE", "T1"], start="2020-01-01", end="2020-02-01",
+                                downloader=partial, batch_size=2)
+    assert list(panel.columns) == ["T0", "GONE", "T1"]
+    assert panel["GONE"].isna().all() and panel.attrs["missing"] == ["GONE"]
+    assert panel[["T0", "T1"]].notna().all().all()
+
+def test_price_panel_cached_batches_download_concurrently(tmp_path):
+    """Test that the cache does not serialize batch downloads (both must be in flight at once)."""
+    import threading
+
+    stub = StubDownloader()
+    barrier = threading.Barrier(2, timeout=10)
+
+    def fetch(tickers, start, end, price_col):
+        barrier.wait()  # raises BrokenBarrierError if the other batch cannot start
+        return stub(tickers, start, end, price_col)
+
+    tickers = ["T0", "T1", "T2", "T3"]
+    panel = get_price_panel(tickers, start="2020-01-01", end="2020-02-01", downloader=fetch,
+                            batch_size=2, cache=PriceCache(tmp_path))
+    assert list(panel.columns) == tickers and len(stub.calls) == 2
+    again = get_price_panel(tickers, start="2020-01-01", end="2020-02-01", downloader=stub,
+                            batch_size=2, cache=PriceCache(tmp_path))
+    pd.testing.assert_frame_equal(panel, again, check_freq=False)
+    assert len(stub.calls) == 2
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from hedge_ratio import rolling_hedge_ratio, kalman_hedge_ratio
+from coint_test import hedge_ratio_ols
+from backtester import PairsBacktester
+
+def _pair(n=500, beta=1.5, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="B")
+    B = 50 + np.cumsum(rng.normal(0, 1, n))
+    beta = np.broadcast_to(np.asarray(beta, dtype=float), (n,))
+    A = 10 + beta * B + rng.normal(0, 0.5, n)
+    return pd.DataFrame({"A": A, "B": B}, index=idx)
+
+def test_rolling_hedge_ratio_matches_ols():
+    """Rolling beta equals OLS on each trailing window, with a missing bar skipped."""
+    df = _pair(300)
+    df.iloc[120, 0] = np.nan
+    beta = rolling_hedge_ratio(df, window=60, min_periods=50)
+    assert beta.iloc[:49].isna().all()
+    for t in (59, 100, 150, 299):
+        expected = hedge_ratio_ols(df.iloc[t - 59:t + 1].dropna())
+        assert abs(beta.iloc[t] - expected) < 1e-8
+
+def test_kalman_hedge_ratio_tracks_beta():
+    """Kalman beta converges to the true ratio and follows a step change."""
+    n = 1000
+    true = np.where(np.arange(n) < 500, 1.0, 2.0)
+    df = _pair(n, beta=true, seed=1)
+    beta, alpha = kalman_hedge_ratio(df, return_alpha=True)
+    assert abs(beta.iloc[450:500].mean() - 1.0) < 0.1
+    assert abs(beta.iloc[-50:].mean() - 2.0) < 0.1
+    assert beta.notna().all() and alpha.notna().all()
+
+def test_simulate_with_series_beta():
+    """Constant Series beta matches the scalar run; NaN warm-up stays flat."""
+    df = _pair(200)
+    sig = pd.Series(np.sign(np.sin(np.arange(200) / 7.0)), index=df.index)
+    bt = PairsBacktester()
+    ref = bt.simulate(df, sig, 1.5)
+    out = bt.simulate(df, sig, pd.Series(1.5, index=df.index))
+    assert np.allclose(ref["pnl"], out["pnl"])
+
+    beta = rolling_hedge_ratio(df, window=30)
+    out = bt.simulate(df, sig, beta)
+    assert (out["A_shares"].iloc[:29] == 0).all()
+    many = bt.simulate_many(df.to_numpy()[:, None, :], sig.to_numpy()[:, None], beta.to_numpy()[:, None])
+    assert np.allclose(many["pnl"].iloc[:, 0], out["pnl"])
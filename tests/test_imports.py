@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+def _run(code: str) -> str:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return out.stdout.rstrip("\n")
+
+def test_package_import_is_lazy():
+    """Test `import src` loads no heavy dependency and exports still resolve on access."""
+    heavy = ["pandas", "scipy", "statsmodels", "numba", "matplotlib"]
+    code = (
+        "import sys, src\n"
+        f"print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+        "assert set(src.__all__) <= set(dir(src))\n"
+        "print(src.zscore.__module__, src.PairsBacktester.__name__)\n"
+        f"print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+    )
+    before, names, after = _run(code).splitlines()
+    assert before == ""
+    assert names == "src.signal_generator PairsBacktester"
+    assert "statsmodels" not in after and "matplotlib" not in after
+
+def test_cli_skips_plot_imports():
+    """Test the CLI module and --help do not import statsmodels or matplotlib."""
+    code = (
+        "import sys\n"
+        "sys.path.insert(0, 'src')\n"
+        "import cli\n"
+        "try:\n    cli.main(['--help'])\nexcept SystemExit:\n    pass\n"
+        "print('|' + ','.join(m for m in ('statsmodels', 'matplotlib', 'numba') if m in sys.modules))\n"
+    )
+    assert _run(code).splitlines()[-1] == "|"
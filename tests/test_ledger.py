@@ -0,0 +1,107 @@
+import pickle
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from backtester import PairsBacktester
+from signal_generator import compute_spread, zscore, generate_signals
+from hedge_ratio import rolling_hedge_ratio
+
+def _pair(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="B")
+    B = 100 + np.cumsum(rng.normal(size=n))
+    A = 10 + 0.8 * B + rng.normal(scale=1.0, size=n)
+    return pd.DataFrame({"A": A, "B": B}, index=idx)
+
+def _reference_trades(full: dict, cost_rate: float, prices: pd.DataFrame) -> list:
+    # bar-by-bar walk over the full simulate() output
+    A, B = full["A_shares"].to_numpy(), full["B_shares"].to_numpy()
+    pa, pb = prices["A"].to_numpy(), prices["B"].to_numpy()
+    pnl = full["pnl"].to_numpy()
+    trades, cur, prev_side = [], None, 0.0
+    for t in range(len(A)):
+        side = np.sign(A[t])
+        if side != prev_side:
+            entry = (abs(A[t]) * pa[t] + abs(B[t]) * pb[t]) * cost_rate if side != 0 else 0.0
+            if cur is not None:
+                cur["pnl"] += pnl[t] + entry  # the opening trade pays its own entry cost
+                cur["path"].append(cur["pnl"])
+                trades.append(cur)
+            cur = None
+            if side != 0:
+                cur = {"side": side, "start": t, "pnl": -entry, "path": [-entry]}
+        elif cur is not None:
+            cur["pnl"] += pnl[t]
+            cur["path"].append(cur["pnl"])
+        prev_side = side
+    if cur is not None:
+        trades.append(cur)
+    return trades
+
+def test_ledger_matches_bar_walk():
+    """Test per-trade PnL, MAE/MFE and totals against a bar-by-bar walk of simulate()."""
+    df = _pair()
+    beta = rolling_hedge_ratio(df, window=60)
+    sig = generate_signals(zscore(compute_spread(df, beta), 30), entry=1.0, exit=-0.5, max_abs_z=3.0)
+    bt = PairsBacktester(tc_bps=2.0)
+    led = bt.simulate(df, sig, beta, compact=True)
+    full = bt.simulate(df, sig, beta)
+
+    ref = _reference_trades(full, (bt.tc_bps + bt.slippage_bps) / 10_000.0, df)
+    t = led.trades
+    assert len(t) == len(ref) > 10 and (t["side"] == -t["side"].shift()).any()  # some flips
+    np.testing.assert_allclose(t["pnl"], [r["pnl"] for r in ref], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(t["mae"], [min(r["path"]) for r in ref], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(t["mfe"], [max(r["path"]) for r in ref], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(t["pnl"].sum(), full["pnl"].sum(), rtol=1e-10)
+    np.testing.assert_allclose(t["costs"].sum(), full["costs"].sum(), rtol=1e-10)
+    np.testing.assert_allclose(t["borrow"].sum(), full["borrow"].sum(), rtol=1e-10)
+    assert list(t["entry"]) == [df.index[r["start"]] for r in ref]
+
+def test_ledger_totals_with_position_on_first_bar():
+    """Test that trade PnLs still sum to the total when signal_delay=0 opens a position on bar 0."""
+    df = _pair(n=300)
+    sig = pd.Series(np.sign(np.sin(np.arange(len(df)) / 15.0 + 0.5)), index=df.index)
+    assert sig.iloc[0] != 0
+    bt = PairsBacktester(tc_bps=2.0, signal_delay=0)
+    led = bt.simulate(df, sig, 0.8, compact=True)
+    full = bt.simulate(df, sig, 0.8)
+    t = led.trades
+    assert t["entry"].iloc[0] == df.index[0]
+    np.testing.assert_allclose(t["pnl"].sum(), full["pnl"].sum(), rtol=1e-10)
+    np.testing.assert_allclose(t["costs"].sum(), full["costs"].sum(), rtol=1e-10)
+
+def test_ledger_lazy_series_and_stats():
+    """Test on-demand Series, compact pickles and round-trip statistics."""
+    df = _pair()
+    sig = generate_signals(zscore(compute_spread(df, 0.8), 30), entry=1.5, exit=0.0)
+    bt = PairsBacktester()
+    led = bt.simulate(df, sig, 0.8, compact=True)
+    pd.testing.assert_series_equal(led["pnl"], bt.simulate(df, sig, 0.8)["pnl"])
+
+    back = pickle.loads(pickle.dumps(led))
+    pd.testing.assert_frame_equal(back.trades, led.trades)
+    assert back._inputs is None
+    assert len(pickle.dumps(led)) < len(pickle.dumps(bt.simulate(df, sig, 0.8))) / 5
+
+    s = led.stats()
+    pnl = led.trades["pnl"]
+    assert s["n_trades"] == len(pnl)
+    np.testing.assert_allclose(s["win_rate"], (pnl > 0).mean())
+    np.testing.assert_allclose(s["avg_hold"], led.trades["bars"].mean())
+    assert 0.0 < s["exposure"] < 1.0
+
+def test_ledger_totals_in_float32_mode():
+    """Test that trade costs and PnL still add up to the bar totals with float32 shares/prices."""
+    df = _pair().astype(np.float32)
+    sig = generate_signals(zscore(compute_spread(df, 0.8), 30), entry=1.0, exit=-0.5, max_abs_z=3.0)
+    bt = PairsBacktester(tc_bps=2.0, dtype=np.float32)
+    t = bt.simulate(df, sig, 0.8, compact=True).trades
+    full = bt.simulate(df, sig, 0.8)
+    np.testing.assert_allclose(t["costs"].sum(), full["costs"].sum(), rtol=1e-12)
+    np.testing.assert_allclose(t["pnl"].sum(), full["pnl"].sum(), rtol=1e-10)
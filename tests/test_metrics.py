@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from metrics import sharpe_ratio, sortino_ratio, max_drawdown, annual_return, hit_rate, MetricsAccumulator
+
+def _reference(pnl: pd.Series) -> dict:
+    return {
+        "sharpe": sharpe_ratio(pnl),
+        "sortino": sortino_ratio(pnl),
+        "annual_return": annual_return(pnl),
+        "max_drawdown": max_drawdown(pnl.fillna(0.0).cumsum()),
+        "hit_rate": hit_rate(pnl),
+    }
+
+def _assert_close(got: dict, expected: dict):
+    for k, v in expected.items():
+        np.testing.assert_allclose(got[k], v, rtol=1e-10, err_msg=k)
+
+def test_accumulator_matches_functions():
+    """Test one pass, bar-by-bar and merged-chunk results against the metric functions."""
+    rng = np.random.default_rng(0)
+    pnl = pd.Series(rng.normal(200, 5000, 2000))
+    pnl.iloc[[5, 700]] = np.nan
+    expected = _reference(pnl)
+
+    _assert_close(MetricsAccumulator().update(pnl).result(), expected)
+
+    live = MetricsAccumulator()
+    for x in pnl:
+        live.update(x)
+    _assert_close(live.result(), expected)
+
+    merged = MetricsAccumulator()
+    for lo in range(0, len(pnl), 333):
+        merged.merge(MetricsAccumulator().update(pnl.iloc[lo:lo + 333]))
+    _assert_close(merged.result(), expected)
+
+def test_accumulator_batched_columns():
+    """Test that a (bars, columns) block gives each column's metrics."""
+    rng = np.random.default_rng(1)
+    pnl = rng.normal(0, 1000, (500, 4))
+    pnl[:50, 2] = 0.0  # flat start
+    res = MetricsAccumulator().update(pnl[:200]).update(pnl[200:]).result()
+    for j in range(pnl.shape[1]):
+        _assert_close({k: v[j] for k, v in res.items()}, _reference(pd.Series(pnl[:, j])))
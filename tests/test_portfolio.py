@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from portfolio import PortfolioBacktester
+from backtester import PairsBacktester
+
+def _prices(T=300, tickers=("XOM", "CVX", "COP"), seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2022-01-03", periods=T, freq="B")
+    return pd.DataFrame(100 + np.cumsum(rng.normal(size=(T, len(tickers))), axis=0), index=idx, columns=list(tickers))
+
+def test_single_pair_matches_pairs_backtester():
+    """Test that one pair with its own capital reproduces PairsBacktester."""
+    px = _prices()
+    sig = pd.Series(np.sign(np.sin(np.arange(len(px)) / 9.0)), index=px.index)
+    kw = dict(tc_bps=2.0, slippage_bps=1.0, capital=1_000_000.0)
+
+    ref = PairsBacktester(short_borrow_apr=0.0, **kw).simulate(px[["XOM", "CVX"]].set_axis(["A", "B"], axis=1), sig, 0.8)
+    out = PortfolioBacktester(short_borrow_apr=0.0, **kw).simulate(px, [("XOM", "CVX")], sig.to_frame(), [0.8])
+    np.testing.assert_allclose(out["pnl"], ref["pnl"], rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(out["shares"]["XOM"], ref["A_shares"], rtol=1e-12)
+    assert (out["shares"]["COP"] == 0).all()
+
+    # with only long-spread signals the short leg is always B, as PairsBacktester assumes
+    long_only = sig.clip(lower=0)
+    ref = PairsBacktester(**kw).simulate(px[["XOM", "CVX"]].set_axis(["A", "B"], axis=1), long_only, 0.8)
+    out = PortfolioBacktester(**kw).simulate(px, [("XOM", "CVX")], long_only.to_frame(), [0.8])
+    np.testing.assert_allclose(out["borrow"], ref["borrow"], rtol=1e-12)
+
+def test_overlapping_legs_are_netted():
+    """Test that offsetting pairs on a shared ticker trade only the net position."""
+    px = _prices()
+    pairs = [("XOM", "CVX"), ("COP", "XOM")]
+    sig = np.zeros((len(px), 2))
+    sig[50:150] = 1.0  # long XOM in pair 0, short XOM in pair 1
+    bt = PortfolioBacktester(pair_capital=1_000_000.0)
+    out = bt.simulate(px, pairs, sig, [1.0, px["COP"].iloc[0] / px["XOM"].iloc[0]])
+
+    xom = out["shares"]["XOM"].iloc[51:151]
+    A_sh = 500_000.0 / px["XOM"].iloc[51:151]
+    B_sh = 500_000.0 / px["XOM"].iloc[51:151] * px["COP"].iloc[0] / px["XOM"].iloc[0]
+    np.testing.assert_allclose(xom, A_sh - B_sh)
+    separate = sum(
+        PortfolioBacktester(pair_capital=1_000_000.0).simulate(px, [p], sig[:, [j]], [b])["costs"].sum()
+        for j, (p, b) in enumerate(zip(pairs, [1.0, px["COP"].iloc[0] / px["XOM"].iloc[0]]))
+    )
+    assert out["costs"].sum() < separate
+
+def test_gross_and_net_caps():
+    """Test that book exposure never exceeds the gross and net caps."""
+    px = _prices(tickers=[f"T{i}" for i in range(8)], seed=3)
+    rng = np.random.default_rng(4)
+    pairs = [(f"T{i}", f"T{j}") for i in range(8) for j in range(i + 1, 8)]
+    sig = rng.choice([-1.0, 0.0, 1.0], size=(len(px), len(pairs)))
+    out = PortfolioBacktester(max_gross=200_000, max_net=20_000).simulate(px, pairs, sig, np.ones(len(pairs)))
+    assert (out["gross"] <= 200_000 * (1 + 1e-9)).all()
+    assert (out["net"].abs() <= 20_000 * (1 + 1e-9)).all()
+    assert (out["scale"] < 1).any()
+    # the book cap is not passed on as PairsBacktester's per-pair max_gross
+    assert PortfolioBacktester(max_gross=200_000).pair_bt.max_gross is None
+    assert not isinstance(PortfolioBacktester(), PairsBacktester)
+    notional = (out["shares"] * px).sum(axis=1)
+    np.testing.assert_allclose(notional, out["net"], atol=1e-6)
+
+def test_float32_book_keeps_float64_money():
+    """Test that the backtester's dtype applies to the book, with PnL still float64."""
+    px = _prices()
+    pairs = [("XOM", "CVX"), ("COP", "XOM")]
+    sig = np.sign(np.sin(np.arange(len(px))[:, None] / np.array([9.0, 13.0])))
+    ref = PortfolioBacktester(max_net=50_000).simulate(px, pairs, sig, [0.8, 1.1])
+    out = PortfolioBacktester(max_net=50_000, dtype=np.float32).simulate(px, pairs, sig, [0.8, 1.1])
+    assert (out["shares"].dtypes == np.float32).all()
+    assert out["pnl"].dtype == out["equity"].dtype == np.float64
+    np.testing.assert_allclose(out["equity"], ref["equity"], rtol=0, atol=1e-6 * 1_000_000)
@@ -0,0 +1,48 @@
+import json
+import pstats
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from profiling import Profiler
+
+def test_profiler_records_stages(tmp_path):
+    """Test wall/CPU/peak memory/rows per stage, nesting, decorator and cProfile dump."""
+    prof = Profiler(cprofile=True)
+
+    @prof.wrap("alloc", rows=len)
+    def alloc(n):
+        return np.ones(n)
+
+    with prof.stage("outer") as st:
+        small = alloc(1_000)
+        big = alloc(2_000_000)  # ~15 MB
+        del big
+        st.rows = len(small)
+    with prof.stage("quick", rows=3):
+        pass
+
+    report = {r["stage"]: r for r in prof.report()}
+    assert list(report) == ["alloc", "outer", "quick"]
+    assert report["alloc"]["calls"] == 2 and report["alloc"]["rows"] == 2_001_000
+    assert report["alloc"]["peak_mb"] > 14
+    assert report["outer"]["peak_mb"] >= report["alloc"]["peak_mb"]  # child peak counts for the parent
+    assert report["outer"]["wall_s"] >= report["alloc"]["wall_s"]
+    assert report["quick"]["rows"] == 3
+    assert json.loads(prof.to_json(tmp_path / "r.json"))["stages"][1]["stage"] == "outer"
+    assert "outer" in prof.table()
+
+    assert prof.dump_hottest(str(tmp_path / "hot.prof")) == "outer"
+    pstats.Stats(str(tmp_path / "hot.prof"))  # readable stats file
+
+def test_disabled_profiler_is_noop():
+    """Test that a disabled profiler records nothing and passes results through."""
+    prof = Profiler(enabled=False)
+    with prof.stage("x") as st:
+        st.rows = 5
+    assert prof.wrap("f")(lambda a: a + 1)(1) == 2
+    assert prof.report() == [] and prof.dump_hottest("unused.prof") is None
@@ -6,7 +6,10 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from signal_generator import generate_signals, compute_spread, zscore
+import types
+
+import signal_generator
+from signal_generator import generate_signals, generate_signals_array, compute_spread, zscore, _signals_numpy
 
 def test_signals_hysteresis():
     """Test that signals have proper hysteresis (no whipsawing)."""
@@ -64,3 +67,79 @@ def test_zscore():
     
     # Last value should be 0 (mean of [1,2,3,4,5] is 3, std is ~1.58, so 5-3/1.58 ≈ 1.26)
     assert not pd.isna(z.iloc[4])
+
+def _noisy_z(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    z = np.convolve(rng.normal(size=n + 19), np.ones(20) / np.sqrt(20), "valid") * 1.5
+    z[rng.integers(0, n, 50)] = np.nan
+    return z
+
+def test_signals_array_matches_series():
+    """Test that the 2-D kernel reproduces generate_signals column by column."""
+    z = _noisy_z()
+    params = [(2.0, 0.0, None, 0), (1.5, 0.5, 3.0, 2), (1.0, -0.3, 2.5, 5), (2.0, 0.0, 4.0, 1)]
+    Z = np.column_stack([z] * len(params))
+    entry, exit, max_abs_z, cooldown = zip(*params)
+    max_abs_z = [np.nan if m is None else m for m in max_abs_z]
+
+    batch = generate_signals_array(Z, entry, exit, max_abs_z, cooldown)
+    for j, (e, x, m, c) in enumerate(params):
+        sig = generate_signals(pd.Series(z), entry=e, exit=x, max_abs_z=m, cooldown=c)
+        np.testing.assert_array_equal(batch[:, j], sig.to_numpy())
+
+def test_signals_numpy_fallback_matches_kernel():
+    """Test that the NumPy fallback (narrow and wide paths) matches the default kernel."""
+    z = _noisy_z(seed=1)
+    k = 40
+    entry = np.linspace(0.5, 2.5, k)
+    exit = np.tile([0.0, 0.5, -0.5, 0.2], k // 4)
+    max_abs_z = np.where(np.arange(k) % 3 == 0, np.nan, 3.0)
+    cooldown = np.arange(k) % 4
+    Z = np.repeat(z[:, None], k, axis=1)
+
+    def fresh(k):
+        return np.zeros(k), np.zeros(k, dtype=np.int64), 1
+
+    expected = generate_signals_array(Z, entry, exit, max_abs_z, cooldown)
+    np.testing.assert_array_equal(_signals_numpy(Z, entry, exit, max_abs_z, cooldown, *fresh(k)), expected)
+    np.testing.assert_array_equal(
+        _signals_numpy(Z[:, :3], entry[:3], exit[:3], max_abs_z[:3], cooldown[:3], *fresh(3)), expected[:, :3]
+    )
+
+def test_signals_events_match_bar_loop():
+    """Test that the event-driven fallback matches the bar-by-bar state machine, carried state included."""
+    rng = np.random.default_rng(3)
+    Z = np.column_stack([_noisy_z(seed=s) for s in range(4)])
+    Z[rng.random(Z.shape) < 0.05] = np.nan
+    args = (np.array([1.0, 1.5, 2.0, 1.5]), np.array([0.0, 0.5, -0.3, 0.0]),
+            np.array([np.nan, 3.0, 2.5, np.nan]), np.array([0, 2, 1, 3]))
+    for Zd in (Z, Z.astype(np.float32)):
+        a = np.array([1.0, -1.0, 0.0, 0.0]), np.array([0, 0, 2, 0])
+        b = a[0].copy(), a[1].copy()
+        expected = signal_generator._signals_loop(Zd, *args, *a, 0)
+        got = signal_generator._signals_events(Zd, *args, *b, 0)
+        assert got.dtype == Zd.dtype
+        np.testing.assert_array_equal(got, expected)
+        np.testing.assert_array_equal(b[0], a[0])
+        np.testing.assert_array_equal(b[1], a[1])
+
+def test_signals_kernel_leaves_python_functions():
+    """Test that loading the compiled kernel does not rebind the Python state machine."""
+    signal_generator._get_signals_kernel()
+    assert isinstance(signal_generator._signal_step, types.FunctionType)
+    assert isinstance(signal_generator._signals_loop, types.FunctionType)
+
+def test_signals_state_across_blocks():
+    """Test that carrying state across blocks reproduces the one-shot signals."""
+    Z = np.column_stack([_noisy_z(seed=s) for s in range(3)])
+    expected = generate_signals_array(Z, 1.5, 0.0, 3.0, 2)
+    state = {}
+    blocks = [generate_signals_array(Z[lo:lo + 7], 1.5, 0.0, 3.0, 2, state=state) for lo in range(0, len(Z), 7)]
+    np.testing.assert_array_equal(np.vstack(blocks), expected)
+
+def test_signals_gate():
+    """Test that a closed gate forces the position flat and blocks entries."""
+    z = pd.Series([0, -2.5, -1, -0.5, -3, -2, 0.1])
+    gate = pd.Series([True, True, True, False, False, True, True])
+    sig = generate_signals(z, entry=2.0, exit=0.0, gate=gate)
+    assert list(sig) == [0, 1, 1, 0, 0, 1, 0]
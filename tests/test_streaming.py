@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import types
+
+import streaming
+from streaming import RollingZScore, StreamingSignal
+from signal_generator import compute_spread, zscore, generate_signals
+
+def _prices(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    B = 100 + np.cumsum(rng.normal(size=n))
+    A = 10 + 0.8 * B + np.convolve(rng.normal(size=n + 29), np.ones(30) / 5, "valid")
+    A[rng.integers(0, n, 20)] = np.nan   # missing bars
+    A[400:450], B[400:450] = A[399], B[399]  # flat stretch (zero variance)
+    return pd.DataFrame({"A": A, "B": B})
+
+def test_rolling_zscore_replay_matches_batch():
+    """Test that the O(1) rolling z-score reproduces zscore() bit for bit."""
+    spread = compute_spread(_prices(), 0.8)
+    for lookback in (1, 2, 20, 60):
+        rz = RollingZScore(lookback)
+        live = np.array([rz.update(x) for x in spread])
+        np.testing.assert_array_equal(live, zscore(spread, lookback).to_numpy())
+
+def test_zscore_fallback_matches_batch():
+    """Test that the plain-Python z-score loop matches zscore() whether or not the kernel is loaded."""
+    streaming._get_zscore_kernel()
+    for f in (streaming._div, streaming._window_moments, streaming._zscore_loop):
+        assert isinstance(f, types.FunctionType)
+    spread = compute_spread(_prices(n=600, seed=2), 0.8)
+    X = spread.to_numpy()[:, None]
+    L = 20
+    buf, st = np.full((L, 1), np.nan), np.zeros((11, 1))
+    # two blocks, continuing from the carried ring buffer and state
+    z = np.vstack([streaming._zscore_loop(X[:250], buf, st, 0), streaming._zscore_loop(X[250:], buf, st, 250)])
+    np.testing.assert_array_equal(z[:, 0], zscore(spread, L).to_numpy())
+
+def test_streaming_signal_replay_matches_batch():
+    """Test that replaying bars reproduces generate_signals exactly."""
+    df = _prices(seed=1)
+    for lookback, kw in [(60, {}), (30, dict(entry=1.5, exit=0.3, max_abs_z=3.0, cooldown=3))]:
+        batch = generate_signals(zscore(compute_spread(df, 0.8), lookback), **kw)
+        live = StreamingSignal(0.8, lookback, **kw)
+        positions = [live.update(a, b) for a, b in zip(df["A"], df["B"])]
+        np.testing.assert_array_equal(np.array(positions), batch.to_numpy())
+        assert np.count_nonzero(positions) > 0
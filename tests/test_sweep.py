@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from sweep import sweep
+from signal_generator import compute_spread, zscore, generate_signals
+from backtester import PairsBacktester
+from metrics import sharpe_ratio, sortino_ratio, max_drawdown, annual_return, hit_rate
+
+def _pair(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="B")
+    B = 100 + np.cumsum(rng.normal(size=n))
+    A = 10 + 0.8 * B + rng.normal(scale=1.0, size=n)
+    return pd.DataFrame({"A": A, "B": B}, index=idx)
+
+def test_sweep_matches_pipeline():
+    """Test that every grid point equals a full zscore/signals/simulate/metrics run."""
+    df = _pair()
+    bt = PairsBacktester(tc_bps=2.0, signal_delay=1)
+    res = sweep(df, lookback=[20, 50], entry=[1.5, 2.0], exit=[0.0, 0.5],
+                max_abs_z=[None, 3.0], cooldown=[0, 2], beta=0.8, backtester=bt)
+    assert len(res) == 32
+
+    for _, row in res.sample(8, random_state=0).iterrows():
+        z = zscore(compute_spread(df, 0.8), int(row["lookback"]))
+        mz = None if np.isnan(row["max_abs_z"]) else row["max_abs_z"]
+        sig = generate_signals(z, row["entry"], row["exit"], mz, int(row["cooldown"]))
+        out = bt.simulate(df, sig, 0.8)
+        np.testing.assert_allclose(row["sharpe"], sharpe_ratio(out["pnl"]), rtol=1e-9)
+        np.testing.assert_allclose(row["sortino"], sortino_ratio(out["pnl"]), rtol=1e-9)
+        np.testing.assert_allclose(row["annual_return"], annual_return(out["pnl"]), rtol=1e-9)
+        np.testing.assert_allclose(row["max_drawdown"], max_drawdown(out["equity"]), rtol=1e-9)
+        np.testing.assert_allclose(row["hit_rate"], hit_rate(out["pnl"]), rtol=1e-12)
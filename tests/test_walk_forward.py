@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from walk_forward import walk_forward, walk_forward_folds, rolling_moments, _zscore_from_moments
+from signal_generator import compute_spread, zscore, generate_signals_array
+
+def _pair(n=900, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2020-01-01", periods=n, freq="B")
+    B = 100 + np.cumsum(rng.normal(size=n))
+    A = 10 + 0.8 * B + rng.normal(scale=1.0, size=n)
+    return pd.DataFrame({"A": A, "B": B}, index=idx)
+
+def test_folds_and_cached_zscore():
+    """Test rolling/expanding fold ranges and z-scores rebuilt from cached rolling moments."""
+    assert walk_forward_folds(10, 4, 3) == [(0, 4, 4, 7), (3, 7, 7, 10)]
+    assert walk_forward_folds(11, 4, 3, "expanding") == [(0, 4, 4, 7), (0, 7, 7, 10), (0, 10, 10, 11)]
+
+    df = _pair()
+    pa, pb = df["A"].to_numpy(), df["B"].to_numpy()
+    z = _zscore_from_moments(pa, pb, rolling_moments(pa, pb, 40), 0.83)
+    np.testing.assert_allclose(z, zscore(compute_spread(df, 0.83), 40).to_numpy(), rtol=1e-8, atol=1e-9)
+
+def test_walk_forward_out_of_sample():
+    """Test stitching, that folds never see later bars, and identical results across n_jobs."""
+    df = _pair()
+    grid = dict(lookback=[20, 40], entry=[1.5, 2.0], exit=[0.0, 0.5], max_abs_z=[None, 3.5])
+    res = walk_forward(df, train=250, test=100, **grid)
+    assert len(res.folds) == 7
+    assert res.oos["pnl"].index[0] == df.index[250] and res.oos["pnl"].index[-1] == df.index[-1]
+    np.testing.assert_allclose(res.oos["equity"].iloc[-1], res.oos["pnl"].sum())
+    assert (res.folds["train_end"] < res.folds["test_start"]).all()
+
+    # dropping the last fold's bars leaves the earlier folds' fits and trades unchanged
+    short = walk_forward(df.iloc[:750], train=250, test=100, **grid)
+    cols = ["beta", "lookback", "entry", "exit", "max_abs_z", "train_score", "sharpe"]
+    pd.testing.assert_frame_equal(short.folds[cols], res.folds[cols].iloc[:5])
+
+    par = walk_forward(df, train=250, test=100, n_jobs=2, **grid)
+    pd.testing.assert_frame_equal(par.folds, res.folds)
+    assert par.metrics == res.metrics
+
+def test_walk_forward_carries_positions_across_folds():
+    """Test that positions continue across fold boundaries instead of being forced flat."""
+    df = _pair(n=600, seed=2)
+    res = walk_forward(df, train=250, test=25, lookback=[40], entry=[1.0], exit=[0.0], cooldown=[2])
+    folds = walk_forward_folds(len(df), 250, 25)
+    pa, pb = df["A"].to_numpy(), df["B"].to_numpy()
+    mom = rolling_moments(pa, pb, 40)
+    # one parameter set: the stitched signal is one pass over the stitched per-fold z-scores
+    z = np.concatenate([_zscore_from_moments(pa[te0:te1], pb[te0:te1], mom[te0:te1], beta)
+                        for (_, _, te0, te1), beta in zip(folds, res.folds["beta"])])
+    np.testing.assert_array_equal(res.oos["signal"].to_numpy(), generate_signals_array(z, 1.0, 0.0, cooldown=2))
+    sig = res.oos["signal"].to_numpy()
+    starts = [te0 - 250 for _, _, te0, _ in folds[1:]]
+    assert any(sig[i - 1] != 0 and sig[i] != 0 for i in starts)